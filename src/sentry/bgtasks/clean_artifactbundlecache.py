@@ -0,0 +1,7 @@
+from sentry.bgtasks.api import bgtask
+from sentry.models import ArtifactBundle
+
+
+@bgtask()
+def clean_artifactbundlecache():
+    ArtifactBundle.cache.clear_old_entries()
@@ -0,0 +1,184 @@
+"""
+Applies the buffered increments of many rows of a model at once.
+
+Flushing a buffer key by key costs one ``UPDATE`` round-trip per row. For keys
+that target a single row through a unique field, the increments and extra
+values of all keys sharing the same columns are instead applied with one
+``UPDATE ... FROM (VALUES ...)`` statement per chunk of rows.
+"""
+
+from typing import Any, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router
+from django.db.models import Model
+from django.db.models.signals import post_save
+from psycopg2.extras import execute_values
+
+from sentry.utils.dates import to_timestamp
+
+BULK_UPDATE_PAGE_SIZE = 500
+
+
+class BufferedIncr(NamedTuple):
+    model: Type[Model]
+    columns: Mapping[str, int]
+    filters: Mapping[str, Any]
+    extra: Optional[Mapping[str, Any]]
+    signal_only: Optional[bool]
+
+
+class BulkUpdateShape(NamedTuple):
+    model: Type[Model]
+    filter_name: str
+    column_names: Tuple[str, ...]
+    extra_names: Tuple[str, ...]
+
+
+def _get_field(model, name):
+    if name == "pk":
+        return model._meta.pk
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def get_bulk_update_shape(incr: BufferedIncr) -> Optional[BulkUpdateShape]:
+    """
+    Returns the shape of the statement that can apply ``incr`` together with
+    other increments, or ``None`` if it needs to be processed on its own.
+    """
+    if incr.signal_only or len(incr.filters) != 1:
+        return None
+
+    extra = incr.extra or {}
+    if not incr.columns and not extra:
+        return None
+
+    ((filter_name, filter_value),) = incr.filters.items()
+    filter_field = _get_field(incr.model, filter_name)
+    if (
+        filter_field is None
+        or filter_field.is_relation
+        or not (filter_field.primary_key or filter_field.unique)
+        or isinstance(filter_value, Model)
+    ):
+        return None
+
+    connection = connections[router.db_for_write(incr.model)]
+    for name in [*incr.columns, *extra]:
+        field = _get_field(incr.model, name)
+        if (
+            field is None
+            or not field.concrete
+            or field.primary_key
+            or field.db_type(connection) is None
+        ):
+            return None
+
+    if not all(isinstance(value, int) for value in incr.columns.values()):
+        return None
+    # Expressions can't be passed as parameters.
+    if any(hasattr(value, "resolve_expression") for value in extra.values()):
+        return None
+
+    return BulkUpdateShape(
+        model=incr.model,
+        filter_name=filter_field.name,
+        column_names=tuple(sorted(incr.columns)),
+        extra_names=tuple(sorted(extra)),
+    )
+
+
+def _has_score(shape: BulkUpdateShape) -> bool:
+    from sentry.models import Group
+
+    # Mirrors the `ScoreClause` hack in `Buffer.process`.
+    return (
+        shape.model is Group
+        and "times_seen" in shape.column_names
+        and "last_seen" in shape.extra_names
+    )
+
+
+def bulk_update(shape: BulkUpdateShape, incrs: Sequence[BufferedIncr]) -> List[BufferedIncr]:
+    """
+    Applies ``incrs``, which must all have the given shape. Returns the
+    increments that were not applied, either because their row does not exist
+    or because another increment in the batch targets the same row.
+    """
+    from sentry.models import Group
+
+    model = shape.model
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+
+    table = qn(model._meta.db_table)
+    filter_field = model._meta.get_field(shape.filter_name)
+    filter_column = qn(filter_field.column)
+
+    data_columns = ["f"]
+    assignments = []
+    for name in shape.column_names:
+        column = qn(model._meta.get_field(name).column)
+        data_columns.append(qn(f"i_{name}"))
+        assignments.append(f"{column} = {table}.{column} + data.{qn(f'i_{name}')}")
+    for name in shape.extra_names:
+        field = model._meta.get_field(name)
+        data_columns.append(qn(f"e_{name}"))
+        assignments.append(
+            f"{qn(field.column)} = data.{qn(f'e_{name}')}::{field.db_type(connection)}"
+        )
+
+    has_score = _has_score(shape)
+    if has_score:
+        data_columns.append("score_ts")
+        assignments.append(
+            f"{qn('score')} = log({table}.{qn('times_seen')} + data.{qn('i_times_seen')}) * 600"
+            " + data.score_ts"
+        )
+
+    query = f"""
+        UPDATE {table}
+        SET {", ".join(assignments)}
+        FROM (VALUES %s) AS data ({", ".join(data_columns)})
+        WHERE {table}.{filter_column} = data.f
+        RETURNING {table}.{filter_column}
+    """
+
+    rows = []
+    pending = {}
+    skipped = []
+    for incr in incrs:
+        (filter_value,) = incr.filters.values()
+        filter_value = filter_field.get_db_prep_value(filter_value, connection)
+        if filter_value in pending:
+            skipped.append(incr)
+            continue
+        pending[filter_value] = incr
+
+        row = [filter_value]
+        row.extend(incr.columns[name] for name in shape.column_names)
+        for name in shape.extra_names:
+            field = model._meta.get_field(name)
+            row.append(field.get_db_prep_save(incr.extra[name], connection))
+        if has_score:
+            row.append(int(to_timestamp(incr.extra["last_seen"])))
+        rows.append(tuple(row))
+
+    with connection.cursor() as cursor:
+        updated = execute_values(cursor, query, rows, page_size=BULK_UPDATE_PAGE_SIZE, fetch=True)
+
+    updated_values = {filter_value for (filter_value,) in updated}
+
+    if model is Group and updated_values:
+        # `Buffer.process` uses `Group.update` so that the group cache is
+        # updated by `post_save`, do the same for the whole batch.
+        for group in Group.objects.filter(**{f"{shape.filter_name}__in": updated_values}):
+            post_save.send(sender=Group, instance=group, created=False)
+
+    skipped.extend(
+        incr for filter_value, incr in pending.items() if filter_value not in updated_values
+    )
+    return skipped
@@ -1,3 +1,5 @@
+import atexit
+import logging
 import pickle
 import threading
 from datetime import datetime
@@ -8,7 +10,9 @@ from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 
 from sentry.buffer import Buffer
+from sentry.buffer.bulk import BufferedIncr, bulk_update, get_bulk_update_shape
 from sentry.exceptions import InvalidConfiguration
+from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr, process_pending
 from sentry.utils import json, metrics
 from sentry.utils.compat import crc32
@@ -16,6 +20,8 @@ from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
 from sentry.utils.redis import get_cluster_from_options
 
+logger = logging.getLogger(__name__)
+
 _local_buffers = None
 _local_buffers_lock = threading.Lock()
 
@@ -47,17 +53,72 @@ class PendingBuffer:
         return rv
 
 
+class PendingIncr:
+    """
+    The sum of all increments of a single buffer key that have not been
+    written to Redis yet.
+    """
+
+    def __init__(self, model, filters):
+        self.model = model
+        self.filters = filters
+        self.columns = {}
+        self.extra = {}
+        self.signal_only = None
+
+    def add(self, columns, extra=None, signal_only=None):
+        for column, amount in columns.items():
+            self.columns[column] = self.columns.get(column, 0) + amount
+        if extra:
+            # Last write wins, as with `hset` in Redis.
+            self.extra.update(extra)
+        if signal_only is True:
+            self.signal_only = True
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self,
+        pending_partitions=1,
+        incr_batch_size=2,
+        incr_coalesce_window=0,
+        incr_coalesce_size=1000,
+        incr_bulk_flush=False,
+        incr_bulk_batch_size=500,
+        **options,
+    ):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
 
+        # When `incr_coalesce_window` (in seconds) is set, increments are
+        # summed up in process and written to Redis at the latest after the
+        # window has passed or once `incr_coalesce_size` distinct keys are
+        # pending, using one pipeline per Redis host.
+        self.incr_coalesce_window = incr_coalesce_window
+        assert self.incr_coalesce_window >= 0
+        self._pending_incrs = {}
+        self._pending_incr_keys = PendingBuffer(incr_coalesce_size)
+        self._pending_incr_count = 0
+        self._pending_incr_since = None
+        self._pending_incr_lock = threading.Lock()
+        self._pending_incr_timer = None
+        if self.incr_coalesce_window > 0:
+            atexit.register(self.flush_incrs)
+
+        # With `incr_bulk_flush`, `process_pending` hands out chunks of
+        # `incr_bulk_batch_size` keys and each chunk is read with one pipeline
+        # per Redis host and written with one statement per model and set of
+        # columns (see `sentry.buffer.bulk`).
+        self.incr_bulk_flush = incr_bulk_flush
+        self.incr_bulk_batch_size = incr_bulk_batch_size
+        assert self.incr_bulk_batch_size > 0
+
     def validate(self):
         try:
             # wait 10 seconds at most
@@ -157,8 +218,13 @@ class RedisBuffer(Buffer):
             pipe.hget(key, f"i+{col}")
         results = pipe.execute()
 
+        with self._pending_incr_lock:
+            pending = self._pending_incrs.get(key)
+            pending_columns = dict(pending.columns) if pending is not None else {}
+
         return {
-            col: (int(results[i]) if results[i] is not None else 0) for i, col in enumerate(columns)
+            col: (int(results[i]) if results[i] is not None else 0) + pending_columns.get(col, 0)
+            for i, col in enumerate(columns)
         }
 
     def incr(self, model, columns, filters, extra=None, signal_only=None, return_incr_results=True):
@@ -170,17 +236,34 @@ class RedisBuffer(Buffer):
             - Perform a set (last write wins) on extra
             - Perform a set on signal_only (only if True)
         - Add hashmap key to pending flushes
+
+        If `incr_coalesce_window` is set, the increment is only summed up in
+        process and written to Redis by `flush_incrs`.
         """
 
+        key = self._make_key(model, filters)
+
+        if self.incr_coalesce_window > 0:
+            self._coalesce_incr(key, model, columns, filters, extra, signal_only)
+        else:
+            # We can't use conn.map() due to wanting to support multiple pending
+            # keys (one per Redis partition)
+            conn = self.cluster.get_local_client_for_key(key)
+            pipe = conn.pipeline()
+            self._add_incr_to_pipeline(pipe, key, model, columns, filters, extra, signal_only)
+            pipe.execute()
+
+        metrics.incr(
+            "buffer.incr",
+            skip_internal=True,
+            tags={"module": model.__module__, "model": model.__name__},
+        )
+
+    def _add_incr_to_pipeline(self, pipe, key, model, columns, filters, extra, signal_only):
         # TODO(dcramer): longer term we'd rather not have to serialize values
         # here (unless it's to JSON)
-        key = self._make_key(model, filters)
         pending_key = self._make_pending_key_from_key(key)
-        # We can't use conn.map() due to wanting to support multiple pending
-        # keys (one per Redis partition)
-        conn = self.cluster.get_local_client_for_key(key)
 
-        pipe = conn.pipeline()
         pipe.hsetnx(key, "m", f"{model.__module__}.{model.__name__}")
         # TODO(dcramer): once this goes live in production, we can kill the pickle path
         # (this is to ensure a zero downtime deploy where we can transition event processing)
@@ -204,14 +287,98 @@ class RedisBuffer(Buffer):
 
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, {key: time()})
-        pipe.execute()
 
-        metrics.incr(
-            "buffer.incr",
-            skip_internal=True,
-            tags={"module": model.__module__, "model": model.__name__},
+    def _coalesce_incr(self, key, model, columns, filters, extra, signal_only):
+        with self._pending_incr_lock:
+            pending = self._pending_incrs.get(key)
+            if pending is None:
+                pending = self._pending_incrs[key] = PendingIncr(model, filters)
+                self._pending_incr_keys.append(key)
+            pending.add(columns, extra, signal_only)
+            self._pending_incr_count += 1
+
+            if self._pending_incr_since is None:
+                self._pending_incr_since = time()
+                self._pending_incr_timer = threading.Timer(
+                    self.incr_coalesce_window, self._flush_incrs_from_timer
+                )
+                self._pending_incr_timer.daemon = True
+                self._pending_incr_timer.start()
+
+            # The pending increments are taken while holding the lock, so
+            # that no other thread can add a key to the full buffer.
+            pending = self._take_pending_incrs() if self._pending_incr_keys.full() else None
+
+        if pending is not None:
+            self._write_incrs(*pending)
+
+    def _take_pending_incrs(self):
+        """
+        Takes all coalesced increments and resets the pending state. Must be
+        called while holding `_pending_incr_lock`.
+        """
+        if self._pending_incr_keys.empty():
+            return None
+
+        pending = (
+            self._pending_incr_keys.flush(),
+            self._pending_incrs,
+            self._pending_incr_count,
+            self._pending_incr_since,
         )
 
+        self._pending_incrs = {}
+        self._pending_incr_count = 0
+        self._pending_incr_since = None
+        if self._pending_incr_timer is not None:
+            self._pending_incr_timer.cancel()
+            self._pending_incr_timer = None
+
+        return pending
+
+    def _flush_incrs_from_timer(self):
+        try:
+            self.flush_incrs()
+        except Exception:
+            # Nobody is waiting for the timer, the increments are lost.
+            metrics.incr("buffer.incr.flush-failed", skip_internal=False)
+            logger.exception("Failed to flush coalesced buffer increments")
+
+    def flush_incrs(self):
+        """
+        Writes all increments that were coalesced in process to Redis.
+        """
+        with self._pending_incr_lock:
+            pending = self._take_pending_incrs()
+
+        if pending is not None:
+            self._write_incrs(*pending)
+
+    def _write_incrs(self, keys, pending_incrs, count, since):
+        keys_by_host = {}
+        router = self.cluster.get_router()
+        for key in keys:
+            keys_by_host.setdefault(router.get_host_for_key(key), []).append(key)
+
+        for host_id, host_keys in keys_by_host.items():
+            pipe = self.cluster.get_local_client(host_id).pipeline()
+            for key in host_keys:
+                pending = pending_incrs[key]
+                self._add_incr_to_pipeline(
+                    pipe,
+                    key,
+                    pending.model,
+                    pending.columns,
+                    pending.filters,
+                    pending.extra,
+                    pending.signal_only,
+                )
+            pipe.execute()
+
+        metrics.timing("buffer.incr.flush-lag", time() - since)
+        metrics.timing("buffer.incr.flush-size", len(keys))
+        metrics.timing("buffer.incr.coalescing-ratio", count / len(keys))
+
     def process_pending(self, partition=None):
         if partition is None and self.pending_partitions > 1:
             # If we're using partitions, this one task fans out into
@@ -229,7 +396,9 @@ class RedisBuffer(Buffer):
         if not client.set(lock_key, "1", nx=True, ex=60):
             return
 
-        pending_buffer = PendingBuffer(self.incr_batch_size)
+        pending_buffer = PendingBuffer(
+            self.incr_bulk_batch_size if self.incr_bulk_flush else self.incr_batch_size
+        )
 
         try:
             keycount = 0
@@ -262,12 +431,121 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.incr_bulk_flush and len(batch_keys) > 1:
+            self._process_bulk_incrs(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
     def _process(self, model, columns, filters, extra=None, signal_only=None):
         return super().process(model, columns, filters, extra, signal_only)
 
+    def _load_incr(self, values):
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return BufferedIncr(model, incr_values, filters, extra_values, signal_only)
+
+    def _process_bulk_incrs(self, batch_keys):
+        with self.cluster.map() as conn:
+            locks = {
+                key: conn.set(self._make_lock_key(key), "1", nx=True, ex=10) for key in batch_keys
+            }
+
+        locked_keys = [key for key, result in locks.items() if result.value]
+        for key in set(batch_keys) - set(locked_keys):
+            metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+            self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
+
+        try:
+            keys_by_host = {}
+            router = self.cluster.get_router()
+            for key in locked_keys:
+                keys_by_host.setdefault(router.get_host_for_key(key), []).append(key)
+
+            incrs = []
+            for host_id, host_keys in keys_by_host.items():
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+
+                for key, values in zip(host_keys, results[::3]):
+                    values = {force_text(k): v for k, v in values.items()}
+                    if not values:
+                        metrics.incr(
+                            "buffer.revoked", tags={"reason": "empty"}, skip_internal=False
+                        )
+                        self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+                        continue
+                    incrs.append(self._load_incr(values))
+
+            by_shape = {}
+            remaining = []
+            for incr in incrs:
+                shape = get_bulk_update_shape(incr)
+                if shape is None:
+                    remaining.append(incr)
+                else:
+                    by_shape.setdefault(shape, []).append(incr)
+
+            for shape, shape_incrs in by_shape.items():
+                with metrics.timer(
+                    "buffer.bulk-update",
+                    tags={"module": shape.model.__module__, "model": shape.model.__name__},
+                ):
+                    skipped = bulk_update(shape, shape_incrs)
+                metrics.timing("buffer.bulk-update.size", len(shape_incrs))
+
+                skipped_ids = {id(incr) for incr in skipped}
+                for incr in shape_incrs:
+                    if id(incr) not in skipped_ids:
+                        buffer_incr_complete.send_robust(
+                            model=incr.model,
+                            columns=incr.columns,
+                            filters=incr.filters,
+                            extra=incr.extra,
+                            created=False,
+                            sender=incr.model,
+                        )
+                remaining.extend(skipped)
+
+            # Increments of rows that don't exist yet, signal-only increments
+            # and anything else `bulk_update` can't handle go through the
+            # regular path, which also takes care of creating rows.
+            for incr in remaining:
+                self._process(*incr)
+        finally:
+            with self.cluster.map() as conn:
+                for key in locked_keys:
+                    conn.delete(self._make_lock_key(key))
+
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
@@ -298,32 +576,6 @@ class RedisBuffer(Buffer):
                 self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
                 return
 
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))
-
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            self._process(model, incr_values, filters, extra_values, signal_only)
+            self._process(*self._load_incr(values))
         finally:
             client.delete(lock_key)
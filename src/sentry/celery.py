@@ -13,6 +13,7 @@ else:
     from celery import Celery
     from celery.app.task import Task
 
+from celery.signals import worker_process_init
 from celery.worker.request import Request
 
 LEGACY_PICKLE_TASKS = frozenset(
@@ -109,3 +110,11 @@ class SentryCelery(Celery):
 app = SentryCelery("sentry")
 app.config_from_object(settings)
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+@worker_process_init.connect
+def warmup_worker_caches(**kwargs):
+    if settings.SENTRY_GROUPING_CONFIG_CACHE_WARMUP:
+        from sentry.grouping.config_cache import warmup_config_caches
+
+        warmup_config_caches()
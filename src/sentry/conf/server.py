@@ -699,8 +699,10 @@ CELERY_IMPORTS = (
     "sentry.tasks.scheduler",
     "sentry.tasks.sentry_apps",
     "sentry.tasks.servicehooks",
+    "sentry.tasks.similarity",
     "sentry.tasks.store",
     "sentry.tasks.symbolication",
+    "sentry.tasks.tsdb",
     "sentry.tasks.unmerge",
     "sentry.tasks.update_user_reports",
     "sentry.tasks.user_report",
@@ -852,6 +854,18 @@ CELERYBEAT_SCHEDULE = {
         "schedule": timedelta(seconds=10),
         "options": {"expires": 10, "queue": "buffers.process_pending"},
     },
+    "record-similarity": {
+        "task": "sentry.tasks.similarity.record_similarity",
+        # Run every 1 minute
+        "schedule": crontab(minute="*/1"),
+        "options": {"expires": 60, "queue": "similarity.index"},
+    },
+    "compact-tsdb-rollups": {
+        "task": "sentry.tasks.tsdb.compact_rollups",
+        # Run every 1 minute
+        "schedule": crontab(minute="*/1"),
+        "options": {"expires": 60, "queue": "stats"},
+    },
     "sync-options": {
         "task": "sentry.tasks.options.sync_options",
         "schedule": timedelta(seconds=10),
@@ -1042,6 +1056,10 @@ BGTASKS = {
         "interval": 5 * 60,
         "roles": ["worker"],
     },
+    "sentry.bgtasks.clean_artifactbundlecache:clean_artifactbundlecache": {
+        "interval": 5 * 60,
+        "roles": ["worker"],
+    },
 }
 
 # Sentry logs to two major places: stdout, and it's internal project.
@@ -1829,6 +1847,13 @@ SENTRY_METRICS_DISALLOW_BAD_TAGS = IS_DEV
 SENTRY_METRICS_INDEXER = "sentry.sentry_metrics.indexer.postgres.postgres_v2.PostgresIndexer"
 SENTRY_METRICS_INDEXER_OPTIONS = {}
 SENTRY_METRICS_INDEXER_CACHE_TTL = 3600 * 2
+# Number of indexer results cached in memory by each process, in front of the
+# indexer cache. Set to 0 to disable the in-process cache.
+SENTRY_METRICS_INDEXER_LOCAL_CACHE_SIZE = 0
+SENTRY_METRICS_INDEXER_LOCAL_CACHE_TTL = 60 * 10
+# Strings that were rate limited or that aren't indexed are cached for this
+# many seconds.
+SENTRY_METRICS_INDEXER_LOCAL_CACHE_NEGATIVE_TTL = 10
 SENTRY_METRICS_INDEXER_TRANSACTIONS_SAMPLE_RATE = 0.1
 
 SENTRY_METRICS_INDEXER_SPANNER_OPTIONS = {}
@@ -3061,6 +3086,18 @@ SENTRY_GROUPING_AUTO_UPDATE_ENABLED = False
 # How long is the migration phase for grouping updates?
 SENTRY_GROUPING_UPDATE_MIGRATION_PHASE = 30 * 24 * 3600  # 30 days
 
+# How many parsed enhancements and fingerprinting configs are kept in memory
+# per process (see `sentry.grouping.config_cache`).
+SENTRY_GROUPING_CONFIG_CACHE_SIZE = 1000
+
+# If this is turned on, celery workers load the default grouping enhancements
+# when they start instead of on the first event.
+SENTRY_GROUPING_CONFIG_CACHE_WARMUP = False
+
+# Upper bound (in bytes of minified source and source map) of parsed source
+# maps kept in memory per process (see `sentry.lang.javascript.cache`).
+SENTRY_JS_SOURCEMAP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 SENTRY_USE_UWSGI = True
 
 # When copying attachments for to-be-reprocessed events into processing store,
@@ -3323,6 +3360,14 @@ SENTRY_ORGANIZATION_ONBOARDING_TASK = "sentry.onboarding_tasks.backends.organiza
 SENTRY_REPLAYS_STORAGE_ALLOWLIST = []
 SENTRY_REPLAYS_DOM_CLICK_SEARCH_ALLOWLIST = []
 
+# A local directory caching the recording segments of recently viewed replays.  Segments are
+# downloaded from blob storage on every request if unset.
+SENTRY_REPLAYS_SEGMENT_CACHE_DIR: Optional[str] = None
+# The maximum size of the segment cache directory in bytes.
+SENTRY_REPLAYS_SEGMENT_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+# Cached segments not viewed for this many seconds are evicted.
+SENTRY_REPLAYS_SEGMENT_CACHE_TTL = 60 * 60
+
 SENTRY_FEATURE_ADOPTION_CACHE_OPTIONS = {
     "path": "sentry.models.featureadoption.FeatureAdoptionRedisBackend",
     "options": {"cluster": "default"},
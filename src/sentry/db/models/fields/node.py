@@ -130,9 +130,11 @@ class NodeData(MutableMapping):
             self.data["_ref"] = ref
             self.data["_ref_version"] = self.ref_version
 
-    def save(self, subkeys=None):
+    def get_subkeys_to_save(self, subkeys=None):
         """
-        Write current data back to nodestore.
+        Return the payload that `save` would write to nodestore, or `None` if
+        there is nothing to save. This allows callers to write many nodes at
+        once using `nodestore.set_subkeys_multi`.
 
         :param subkeys: Additional JSON payloads to attach to nodestore value,
             currently only {"unprocessed": {...}} is added for reprocessing.
@@ -142,7 +144,7 @@ class NodeData(MutableMapping):
         # We never loaded any data for reading or writing, so there
         # is nothing to save.
         if self._node_data is None:
-            return
+            return None
 
         # We can't put our wrappers into the nodestore, so we need to
         # ensure that the data is converted into a plain old dict
@@ -152,6 +154,19 @@ class NodeData(MutableMapping):
 
         subkeys = subkeys or {}
         subkeys[None] = to_write
+        return subkeys
+
+    def save(self, subkeys=None):
+        """
+        Write current data back to nodestore.
+
+        :param subkeys: Additional JSON payloads to attach to nodestore value,
+            currently only {"unprocessed": {...}} is added for reprocessing.
+            See documentation of nodestore.
+        """
+        subkeys = self.get_subkeys_to_save(subkeys)
+        if subkeys is None:
+            return
 
         nodestore.set_subkeys(self.id, subkeys)
 
@@ -1,5 +1,5 @@
 import logging
-from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional, Sequence, Tuple
 
 from sentry.utils.imports import import_string
 from sentry.utils.services import Service
@@ -58,7 +58,16 @@ class Backend(Service):
     be transitioned to "waiting" instead.)
     """
 
-    __all__ = ("add", "delete", "digest", "enabled", "maintenance", "schedule", "validate")
+    __all__ = (
+        "add",
+        "add_multi",
+        "delete",
+        "digest",
+        "enabled",
+        "maintenance",
+        "schedule",
+        "validate",
+    )
 
     def __init__(self, **options: Any) -> None:
         # The ``minimum_delay`` option defines the default minimum amount of
@@ -133,6 +142,29 @@ class Backend(Service):
         """
         raise NotImplementedError
 
+    def add_multi(
+        self,
+        items: Sequence[Tuple[str, "Record"]],
+        increment_delay: Optional[int] = None,
+        maximum_delay: Optional[int] = None,
+        timestamp: Optional[float] = None,
+    ) -> Sequence[bool]:
+        """
+        Add records to timelines, given as a sequence of ``(key, record)``
+        pairs. Returns whether each timeline is ready for immediate digestion,
+        in the order of ``items``.
+        """
+        return [
+            self.add(
+                key,
+                record,
+                increment_delay=increment_delay,
+                maximum_delay=maximum_delay,
+                timestamp=timestamp,
+            )
+            for key, record in items
+        ]
+
     def digest(self, key: str, minimum_delay: Optional[int] = None) -> Any:
         """
         Extract records from a timeline for processing.
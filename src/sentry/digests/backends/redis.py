@@ -1,7 +1,8 @@
 import logging
 import time
+from collections import defaultdict
 from contextlib import contextmanager
-from typing import Any, Iterable, Optional, Tuple
+from typing import Any, Iterable, List, MutableMapping, Optional, Sequence, Tuple
 
 from rb.clients import LocalClient
 from redis.exceptions import ResponseError
@@ -122,23 +123,72 @@ class RedisBackend(Backend):
             script(
                 self._get_connection(key),
                 [key],
-                [
-                    "ADD",
-                    self.namespace,
-                    self.ttl,
-                    timestamp,
-                    key,
-                    record.key,
-                    self.codec.encode(record.value),
-                    record.timestamp,  # TODO: check type
-                    increment_delay,
-                    maximum_delay,
-                    self.capacity if self.capacity else -1,
-                    self.truncation_chance,
-                ],
+                self.__get_add_arguments(key, record, increment_delay, maximum_delay, timestamp),
             )
         )
 
+    def __get_add_arguments(
+        self,
+        key: str,
+        record: Record,
+        increment_delay: int,
+        maximum_delay: int,
+        timestamp: float,
+    ) -> List[Any]:
+        return [
+            "ADD",
+            self.namespace,
+            self.ttl,
+            timestamp,
+            key,
+            record.key,
+            self.codec.encode(record.value),
+            record.timestamp,  # TODO: check type
+            increment_delay,
+            maximum_delay,
+            self.capacity if self.capacity else -1,
+            self.truncation_chance,
+        ]
+
+    def add_multi(
+        self,
+        items: Sequence[Tuple[str, Record]],
+        increment_delay: Optional[int] = None,
+        maximum_delay: Optional[int] = None,
+        timestamp: Optional[float] = None,
+    ) -> Sequence[bool]:
+        if timestamp is None:
+            timestamp = time.time()
+
+        if increment_delay is None:
+            increment_delay = self.increment_delay
+
+        if maximum_delay is None:
+            maximum_delay = self.maximum_delay
+
+        # Pipeline the script calls of all timelines on the same host.
+        items_by_host: MutableMapping[int, List[Tuple[int, str, Record]]] = defaultdict(list)
+        router = self.cluster.get_router()
+        for i, (key, record) in enumerate(items):
+            host = router.get_host_for_key(f"{self.namespace}:t:{key}")
+            items_by_host[host].append((i, key, record))
+
+        results = [False] * len(items)
+        for host, host_items in items_by_host.items():
+            with self.cluster.get_local_client(host).pipeline(transaction=False) as pipeline:
+                for _, key, record in host_items:
+                    script(
+                        pipeline,
+                        [key],
+                        self.__get_add_arguments(
+                            key, record, increment_delay, maximum_delay, timestamp
+                        ),
+                    )
+                for (i, _, _), result in zip(host_items, pipeline.execute()):
+                    results[i] = bool(result)
+
+        return results
+
     def __schedule_partition(
         self, host: int, deadline: float, timestamp: float
     ) -> Iterable[Tuple[bytes, float]]:
@@ -217,18 +267,21 @@ class RedisBackend(Backend):
                 else:
                     raise
 
+            values = iter(
+                self.codec.decode_multi([value for _, value, _ in response if value is not None])
+            )
             records = [
                 Record(
                     key.decode(),
-                    self.codec.decode(value) if value is not None else None,
+                    next(values) if value is not None else None,
                     float(timestamp),
                 )
                 for key, value, timestamp in response
             ]
 
             # If the record value is `None`, this means the record data was
-            # missing (it was presumably evicted by Redis) so we don't need to
-            # return it here.
+            # missing (it was presumably evicted by Redis, or the event it
+            # references was deleted) so we don't need to return it here.
             filtered_records = [record for record in records if record.value is not None]
             if len(records) != len(filtered_records):
                 logger.warning(
@@ -1,6 +1,8 @@
 import pickle
 import zlib
-from typing import Any
+from typing import Any, Sequence
+
+from sentry.utils import json
 
 
 class Codec:
@@ -10,6 +12,9 @@ class Codec:
     def decode(self, value: bytes) -> Any:
         raise NotImplementedError
 
+    def decode_multi(self, values: Sequence[bytes]) -> Sequence[Any]:
+        return [self.decode(value) for value in values]
+
 
 class CompressedPickleCodec(Codec):
     def encode(self, value: Any) -> bytes:
@@ -17,3 +22,63 @@ class CompressedPickleCodec(Codec):
 
     def decode(self, value: bytes) -> Any:
         return pickle.loads(zlib.decompress(value))
+
+
+class EventReferenceCodec(Codec):
+    """
+    Stores notifications as a reference to their event (project, event and
+    group id) and rule ids, rather than pickling the event along with its
+    payload. Events are loaded from nodestore with a single request for all
+    records of a digest in ``decode_multi``. Notifications of events that
+    have since been deleted are decoded as ``None``.
+
+    Other values, such as notifications for issue platform occurrences
+    (which aren't stored in nodestore), are pickled like
+    ``CompressedPickleCodec`` does, which also allows reading records written
+    with that codec.
+    """
+
+    # zlib streams never start with this.
+    reference_prefix = b"r:"
+
+    def __init__(self) -> None:
+        self.fallback = CompressedPickleCodec()
+
+    def encode(self, value: Any) -> bytes:
+        from sentry.digests.notifications import Notification
+
+        if isinstance(value, Notification) and getattr(value.event, "occurrence", None) is None:
+            event = value.event
+            return self.reference_prefix + json.dumps(
+                [event.project_id, event.event_id, event.group_id, list(value.rules)]
+            ).encode("utf-8")
+        return self.fallback.encode(value)
+
+    def decode(self, value: bytes) -> Any:
+        return self.decode_multi([value])[0]
+
+    def decode_multi(self, values: Sequence[bytes]) -> Sequence[Any]:
+        from sentry import eventstore
+        from sentry.digests.notifications import Notification
+        from sentry.eventstore.models import Event
+
+        results = []
+        events = []
+        for value in values:
+            if value.startswith(self.reference_prefix):
+                project_id, event_id, group_id, rules = json.loads(
+                    value[len(self.reference_prefix) :]
+                )
+                event = Event(project_id, event_id, group_id=group_id)
+                events.append(event)
+                results.append(Notification(event, rules))
+            else:
+                results.append(self.fallback.decode(value))
+
+        if events:
+            eventstore.bind_nodes(events, "data")
+
+        return [
+            None if isinstance(result, Notification) and not result.event.data else result
+            for result in results
+        ]
@@ -7,6 +7,7 @@ import random
 import re
 import time
 import uuid
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from io import BytesIO
@@ -30,7 +31,7 @@ from django.conf import settings
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError, OperationalError, connection, transaction
-from django.db.models import Func
+from django.db.models import Func, Q
 from django.db.models.signals import post_save
 from django.utils.encoding import force_text
 from pytz import UTC
@@ -40,6 +41,7 @@ from sentry import (
     eventstream,
     eventtypes,
     features,
+    nodestore,
     options,
     quotas,
     reprocessing2,
@@ -444,176 +446,108 @@ class EventManager:
 
             return jobs[0]["event"]
 
-        with metrics.timer("event_manager.save.organization.get_from_cache"):
-            project.set_cached_field_value(
-                "organization", Organization.objects.get_from_cache(id=project.organization_id)
-            )
-
-        jobs = [job]
-
-        is_reprocessed = is_reprocessed_event(job["data"])
-
-        with sentry_sdk.start_span(op="event_manager.save.pull_out_data"):
-            _pull_out_data(jobs, projects)
+        job["cache_key"] = cache_key
+        save_error_events([job], projects, auto_upgrade_grouping=auto_upgrade_grouping)
 
-        with sentry_sdk.start_span(op="event_manager.save.get_or_create_release_many"):
-            _get_or_create_release_many(jobs, projects)
+        if "discarded" in job:
+            raise job["discarded"]
 
-        with sentry_sdk.start_span(op="event_manager.save.get_event_user_many"):
-            _get_event_user_many(jobs, projects)
-
-        job["project_key"] = None
-        if job["key_id"] is not None:
-            with metrics.timer("event_manager.load_project_key"):
-                try:
-                    job["project_key"] = ProjectKey.objects.get_from_cache(id=job["key_id"])
-                except ProjectKey.DoesNotExist:
-                    pass
+        self._data = job["event"].data.data
 
-        _derive_plugin_tags_many(jobs, projects)
-        _derive_interface_tags_many(jobs)
+        return job["event"]
 
-        do_background_grouping_before = options.get("store.background-grouping-before")
-        if do_background_grouping_before:
-            _run_background_grouping(project, job)
 
-        secondary_hashes = None
-        migrate_off_hierarchical = False
+@metrics.wraps("event_manager.save_error_events")
+def save_error_events(
+    jobs: Sequence[Job], projects: ProjectsMapping, auto_upgrade_grouping: bool = False
+) -> Sequence[Job]:
+    """
+    Save a batch of normalized error events.
+
+    Grouping and group assignment still happen per event, but every other
+    step (grouphash lookups, release and environment bookkeeping, TSDB
+    counters, nodestore writes and eventstream inserts) operates on the whole
+    batch so that round-trips to Postgres, Redis and nodestore are shared
+    between events.
+
+    Every job needs ``data``, ``project_id``, ``raw`` and ``start_time`` and
+    may carry a ``cache_key`` used to load attachments. Events that match a
+    tombstone are discarded and get the ``HashDiscarded`` error stored at
+    ``job["discarded"]`` instead of raising, so that the remaining events of
+    the batch are still saved.
+    """
+    with metrics.timer("event_manager.save_error_events.fetch_organizations"):
+        organization_ids = {project.organization_id for project in projects.values()}
+        organizations = {
+            o.id: o for o in Organization.objects.get_many_from_cache(organization_ids)
+        }
 
+    for project in projects.values():
         try:
-            secondary_grouping_config = project.get_option("sentry:secondary_grouping_config")
-            secondary_grouping_expiry = project.get_option("sentry:secondary_grouping_expiry")
-            if secondary_grouping_config and (secondary_grouping_expiry or 0) >= time.time():
-                with metrics.timer("event_manager.secondary_grouping"):
-                    secondary_event = copy.deepcopy(job["event"])
-                    loader = SecondaryGroupingConfigLoader()
-                    secondary_grouping_config = loader.get_config_dict(project)
-                    secondary_hashes = _calculate_event_grouping(
-                        project, secondary_event, secondary_grouping_config
-                    )
-        except Exception:
-            sentry_sdk.capture_exception()
-
-        with metrics.timer("event_manager.load_grouping_config"):
-            # At this point we want to normalize the in_app values in case the
-            # clients did not set this appropriately so far.
-            if is_reprocessed:
-                # The customer might have changed grouping enhancements since
-                # the event was ingested -> make sure we get the fresh one for reprocessing.
-                grouping_config = get_grouping_config_dict_for_project(project)
-                # Write back grouping config because it might have changed since the
-                # event was ingested.
-                # NOTE: We could do this unconditionally (regardless of `is_processed`).
-                job["data"]["grouping_config"] = grouping_config
-            else:
-                grouping_config = get_grouping_config_dict_for_event_data(
-                    job["event"].data.data, project
-                )
-
-        with sentry_sdk.start_span(op="event_manager.save.calculate_event_grouping"), metrics.timer(
-            "event_manager.calculate_event_grouping"
-        ):
-            hashes = _calculate_event_grouping(project, job["event"], grouping_config)
-
-        # Because this logic is not complex enough we want to special case the situation where we
-        # migrate from a hierarchical hash to a non hierarchical hash.  The reason being that
-        # `_save_aggregate` needs special logic to not create orphaned hashes in migration cases
-        # but it wants a different logic to implement splitting of hierarchical hashes.
-        migrate_off_hierarchical = bool(
-            secondary_hashes
-            and secondary_hashes.hierarchical_hashes
-            and not hashes.hierarchical_hashes
-        )
-
-        hashes = CalculatedHashes(
-            hashes=list(hashes.hashes) + list(secondary_hashes and secondary_hashes.hashes or []),
-            hierarchical_hashes=(
-                list(hashes.hierarchical_hashes)
-                + list(secondary_hashes and secondary_hashes.hierarchical_hashes or [])
-            ),
-            tree_labels=(
-                hashes.tree_labels or (secondary_hashes and secondary_hashes.tree_labels) or []
-            ),
-        )
-
-        if not do_background_grouping_before:
-            _run_background_grouping(project, job)
+            project.set_cached_field_value("organization", organizations[project.organization_id])
+        except KeyError:
+            continue
 
-        if hashes.tree_labels:
-            job["finest_tree_label"] = hashes.finest_tree_label
+    for job in jobs:
+        job["is_reprocessed"] = is_reprocessed_event(job["data"])
 
-        _materialize_metadata_many(jobs)
+    with sentry_sdk.start_span(op="event_manager.save.pull_out_data"):
+        _pull_out_data(jobs, projects)
 
-        kwargs = _create_kwargs(job)
+    with sentry_sdk.start_span(op="event_manager.save.get_or_create_release_many"):
+        _get_or_create_release_many(jobs, projects)
 
-        kwargs["culprit"] = job["culprit"]
+    with sentry_sdk.start_span(op="event_manager.save.get_event_user_many"):
+        _get_event_user_many(jobs, projects)
 
-        # Load attachments first, but persist them at the very last after
-        # posting to eventstream to make sure all counters and eventstream are
-        # incremented for sure. Also wait for grouping to remove attachments
-        # based on the group counter.
-        with metrics.timer("event_manager.get_attachments"):
-            with sentry_sdk.start_span(op="event_manager.save.get_attachments"):
-                attachments = get_attachments(cache_key, job)
+    _get_project_key_many(jobs)
+    _derive_plugin_tags_many(jobs, projects)
+    _derive_interface_tags_many(jobs)
 
-        try:
-            with sentry_sdk.start_span(op="event_manager.save.save_aggregate_fn"):
-                group_info = _save_aggregate(
-                    event=job["event"],
-                    hashes=hashes,
-                    release=job["release"],
-                    metadata=dict(job["event_metadata"]),
-                    received_timestamp=job["received_timestamp"],
-                    migrate_off_hierarchical=migrate_off_hierarchical,
-                    **kwargs,
-                )
-                job["groups"] = [group_info]
-        except HashDiscarded as err:
-            logger.info(
-                "event_manager.save.discard",
-                extra={
-                    "reason": err.reason,
-                    "tombstone_id": err.tombstone_id,
-                },
-            )
-            discard_event(job, attachments)
-            raise
+    for job in jobs:
+        _calculate_job_grouping(job, projects[job["project_id"]])
 
-        if not group_info:
-            return job["event"]
+    _materialize_metadata_many(jobs)
 
-        job["event"].group = group_info.group
+    with sentry_sdk.start_span(op="event_manager.save.get_grouphashes_many"):
+        grouphashes = _get_grouphashes_many(jobs)
 
-        # store a reference to the group id to guarantee validation of isolation
-        # XXX(markus): No clue what this does
-        job["event"].data.bind_ref(job["event"])
+    saved_jobs = [job for job in jobs if _save_aggregate_for_job(job, grouphashes)]
+    if not saved_jobs:
+        return jobs
 
-        _get_or_create_environment_many(jobs, projects)
-        _get_or_create_group_environment_many(jobs, projects)
-        _get_or_create_release_associated_models(jobs, projects)
-        _increment_release_associated_counts_many(jobs, projects)
-        _get_or_create_group_release_many(jobs, projects)
-        _tsdb_record_all_metrics(jobs)
+    _get_or_create_environment_many(saved_jobs, projects)
+    _get_or_create_group_environment_many(saved_jobs, projects)
+    _get_or_create_release_associated_models(saved_jobs, projects)
+    _increment_release_associated_counts_many(saved_jobs, projects)
+    _get_or_create_group_release_many(saved_jobs, projects)
+    _tsdb_record_all_metrics(saved_jobs)
 
-        UserReport.objects.filter(project_id=project.id, event_id=job["event"].event_id).update(
-            group_id=group_info.group.id, environment_id=job["environment"].id
-        )
+    for job in saved_jobs:
+        group_info = job["groups"][0]
+        UserReport.objects.filter(
+            project_id=job["project_id"], event_id=job["event"].event_id
+        ).update(group_id=group_info.group.id, environment_id=job["environment"].id)
 
         with metrics.timer("event_manager.filter_attachments_for_group"):
-            attachments = filter_attachments_for_group(attachments, job)
+            job["attachments"] = filter_attachments_for_group(job["attachments"], job)
 
-        # XXX: DO NOT MUTATE THE EVENT PAYLOAD AFTER THIS POINT
-        _materialize_event_metrics(jobs)
+    # XXX: DO NOT MUTATE THE EVENT PAYLOAD AFTER THIS POINT
+    _materialize_event_metrics(saved_jobs)
 
-        for attachment in attachments:
+    for job in saved_jobs:
+        for attachment in job["attachments"]:
             key = f"bytes.stored.{attachment.type}"
             old_bytes = job["event_metrics"].get(key) or 0
             job["event_metrics"][key] = old_bytes + attachment.size
 
-        _nodestore_save_many(jobs)
+    _nodestore_save_many(saved_jobs)
+
+    for job in saved_jobs:
+        project = projects[job["project_id"]]
         save_unprocessed_event(project, job["event"].event_id)
 
-        if not raw:
+        if not job["raw"]:
             if not project.first_event:
                 project.update(first_event=job["event"].datetime)
                 first_event_received.send_robust(
@@ -628,7 +562,7 @@ class EventManager:
                     project=project, event=job["event"], sender=Project
                 )
 
-        if is_reprocessed:
+        if job["is_reprocessed"]:
             safe_execute(
                 reprocessing2.buffered_delete_old_primary_hash,
                 project_id=job["event"].project_id,
@@ -640,17 +574,18 @@ class EventManager:
                 _with_transaction=False,
             )
 
-        _eventstream_insert_many(jobs)
+    _eventstream_insert_many(saved_jobs)
 
+    for job in saved_jobs:
         # Do this last to ensure signals get emitted even if connection to the
         # file store breaks temporarily.
         #
         # We do not need this for reprocessed events as for those we update the
         # group_id on existing models in post_process_group, which already does
         # this because of indiv. attachments.
-        if not is_reprocessed:
+        if not job["is_reprocessed"]:
             with metrics.timer("event_manager.save_attachments"):
-                save_attachments(cache_key, attachments, job)
+                save_attachments(job.get("cache_key"), job["attachments"], job)
 
         metric_tags = {"from_relay": "_relay_processed" in job["data"]}
 
@@ -666,16 +601,190 @@ class EventManager:
             tags=metric_tags,
         )
 
-        _track_outcome_accepted_many(jobs)
+    _track_outcome_accepted_many(saved_jobs)
 
-        self._data = job["event"].data.data
+    # Check if the project is configured for auto upgrading and we need to upgrade
+    # to the latest grouping config.
+    if auto_upgrade_grouping:
+        for project_id in {job["project_id"] for job in saved_jobs}:
+            project = projects[project_id]
+            if _project_should_update_grouping(project):
+                _auto_update_grouping(project)
 
-        # Check if the project is configured for auto upgrading and we need to upgrade
-        # to the latest grouping config.
-        if auto_upgrade_grouping and _project_should_update_grouping(project):
-            _auto_update_grouping(project)
+    return jobs
 
-        return job["event"]
+
+@metrics.wraps("save_event.get_project_key_many")
+def _get_project_key_many(jobs: Sequence[Job]) -> None:
+    key_ids = {job["key_id"] for job in jobs if job["key_id"] is not None}
+    project_keys = {}
+    if key_ids:
+        with metrics.timer("event_manager.load_project_key"):
+            project_keys = {pk.id: pk for pk in ProjectKey.objects.get_many_from_cache(key_ids)}
+
+    for job in jobs:
+        job["project_key"] = project_keys.get(job["key_id"])
+
+
+def _calculate_job_grouping(job: Job, project: Project) -> None:
+    """
+    Calculate the primary (and, during a grouping config transition,
+    secondary) hashes of an event and store them on the job.
+    """
+    do_background_grouping_before = options.get("store.background-grouping-before")
+    if do_background_grouping_before:
+        _run_background_grouping(project, job)
+
+    secondary_hashes = None
+    migrate_off_hierarchical = False
+
+    try:
+        secondary_grouping_config = project.get_option("sentry:secondary_grouping_config")
+        secondary_grouping_expiry = project.get_option("sentry:secondary_grouping_expiry")
+        if secondary_grouping_config and (secondary_grouping_expiry or 0) >= time.time():
+            with metrics.timer("event_manager.secondary_grouping"):
+                secondary_event = copy.deepcopy(job["event"])
+                loader = SecondaryGroupingConfigLoader()
+                secondary_grouping_config = loader.get_config_dict(project)
+                secondary_hashes = _calculate_event_grouping(
+                    project, secondary_event, secondary_grouping_config
+                )
+    except Exception:
+        sentry_sdk.capture_exception()
+
+    with metrics.timer("event_manager.load_grouping_config"):
+        # At this point we want to normalize the in_app values in case the
+        # clients did not set this appropriately so far.
+        if job["is_reprocessed"]:
+            # The customer might have changed grouping enhancements since
+            # the event was ingested -> make sure we get the fresh one for reprocessing.
+            grouping_config = get_grouping_config_dict_for_project(project)
+            # Write back grouping config because it might have changed since the
+            # event was ingested.
+            # NOTE: We could do this unconditionally (regardless of `is_processed`).
+            job["data"]["grouping_config"] = grouping_config
+        else:
+            grouping_config = get_grouping_config_dict_for_event_data(
+                job["event"].data.data, project
+            )
+
+    with sentry_sdk.start_span(op="event_manager.save.calculate_event_grouping"), metrics.timer(
+        "event_manager.calculate_event_grouping"
+    ):
+        hashes = _calculate_event_grouping(project, job["event"], grouping_config)
+
+    # Because this logic is not complex enough we want to special case the situation where we
+    # migrate from a hierarchical hash to a non hierarchical hash.  The reason being that
+    # `_save_aggregate` needs special logic to not create orphaned hashes in migration cases
+    # but it wants a different logic to implement splitting of hierarchical hashes.
+    migrate_off_hierarchical = bool(
+        secondary_hashes and secondary_hashes.hierarchical_hashes and not hashes.hierarchical_hashes
+    )
+
+    hashes = CalculatedHashes(
+        hashes=list(hashes.hashes) + list(secondary_hashes and secondary_hashes.hashes or []),
+        hierarchical_hashes=(
+            list(hashes.hierarchical_hashes)
+            + list(secondary_hashes and secondary_hashes.hierarchical_hashes or [])
+        ),
+        tree_labels=(
+            hashes.tree_labels or (secondary_hashes and secondary_hashes.tree_labels) or []
+        ),
+    )
+
+    if not do_background_grouping_before:
+        _run_background_grouping(project, job)
+
+    if hashes.tree_labels:
+        job["finest_tree_label"] = hashes.finest_tree_label
+
+    job["hashes"] = hashes
+    job["migrate_off_hierarchical"] = migrate_off_hierarchical
+
+
+GroupHashesMapping = MutableMapping[Tuple[int, str], GroupHash]
+
+
+@metrics.wraps("save_event.get_grouphashes_many")
+def _get_grouphashes_many(jobs: Sequence[Job]) -> GroupHashesMapping:
+    """
+    Load the existing flat grouphashes of all events in a batch with a single
+    query. Hashes that do not exist yet are created by `_save_aggregate`.
+    """
+    hashes_by_project: dict[int, set[str]] = {}
+    for job in jobs:
+        hashes_by_project.setdefault(job["project_id"], set()).update(job["hashes"].hashes)
+
+    condition = Q()
+    for project_id, hashes in hashes_by_project.items():
+        if hashes:
+            condition |= Q(project_id=project_id, hash__in=hashes)
+
+    if not condition:
+        return {}
+
+    return {(gh.project_id, gh.hash): gh for gh in GroupHash.objects.filter(condition)}
+
+
+def _save_aggregate_for_job(job: Job, grouphashes: GroupHashesMapping) -> bool:
+    """
+    Assign the event of `job` to a group. Returns `False` if the event was
+    discarded or could not be associated with an error group, in which case
+    it must not be saved any further.
+    """
+    kwargs = _create_kwargs(job)
+
+    kwargs["culprit"] = job["culprit"]
+
+    # Load attachments first, but persist them at the very last after
+    # posting to eventstream to make sure all counters and eventstream are
+    # incremented for sure. Also wait for grouping to remove attachments
+    # based on the group counter.
+    with metrics.timer("event_manager.get_attachments"):
+        with sentry_sdk.start_span(op="event_manager.save.get_attachments"):
+            job["attachments"] = get_attachments(job.get("cache_key"), job)
+
+    try:
+        with sentry_sdk.start_span(op="event_manager.save.save_aggregate_fn"):
+            group_info = _save_aggregate(
+                event=job["event"],
+                hashes=job["hashes"],
+                release=job["release"],
+                metadata=dict(job["event_metadata"]),
+                received_timestamp=job["received_timestamp"],
+                migrate_off_hierarchical=job["migrate_off_hierarchical"],
+                grouphashes=grouphashes,
+                **kwargs,
+            )
+            job["groups"] = [group_info]
+    except HashDiscarded as err:
+        logger.info(
+            "event_manager.save.discard",
+            extra={
+                "reason": err.reason,
+                "tombstone_id": err.tombstone_id,
+            },
+        )
+        discard_event(job, job["attachments"])
+        job["discarded"] = err
+        return False
+
+    if not group_info:
+        return False
+
+    if group_info.is_new:
+        # The prefetched grouphashes of a freshly created group are stale now,
+        # make later events of the batch load them again.
+        for hash in job["hashes"].hashes:
+            grouphashes.pop((job["project_id"], hash), None)
+
+    job["event"].group = group_info.group
+
+    # store a reference to the group id to guarantee validation of isolation
+    # XXX(markus): No clue what this does
+    job["event"].data.bind_ref(job["event"])
+
+    return True
 
 
 def _project_should_update_grouping(project: Project) -> bool:
@@ -1173,23 +1282,37 @@ def _tsdb_record_all_metrics(jobs: Sequence[Job]) -> None:
     """
     Do all tsdb-related things for save_event in here s.t. we can potentially
     put everything in a single redis pipeline someday.
+
+    Increments of all jobs are merged per environment and carry their own
+    timestamps, so a batch of events that share an environment results in a
+    single `incr_multi` call. Distinct counters and frequencies are merged per
+    environment and event timestamp.
     """
 
     # XXX: validate whether anybody actually uses those metrics
 
+    # environment_id -> (model, key, timestamp) -> count
+    incrs: dict[int, dict[tuple[Any, int, datetime], int]] = defaultdict(lambda: defaultdict(int))
+    # (environment_id, timestamp) -> [(model, key, values)]
+    records: dict[tuple[int, datetime], list[Any]] = defaultdict(list)
+    # timestamp -> [(model, {key: {member: score}})]
+    frequencies: dict[datetime, list[Any]] = defaultdict(list)
+
     for job in jobs:
-        incrs = []
-        frequencies = []
-        records = []
-        incrs.append((tsdb.models.project, job["project_id"]))
         event = job["event"]
         release = job["release"]
         environment = job["environment"]
         user = job["user"]
+        timestamp = event.datetime
+
+        env_incrs = incrs[environment.id]
+        env_records = records[(environment.id, timestamp)]
+
+        env_incrs[(tsdb.models.project, job["project_id"], timestamp)] += 1
 
         for group_info in job["groups"]:
-            incrs.append((tsdb.models.group, group_info.group.id))
-            frequencies.append(
+            env_incrs[(tsdb.models.group, group_info.group.id, timestamp)] += 1
+            frequencies[timestamp].append(
                 (
                     tsdb.models.frequent_environments_by_group,
                     {group_info.group.id: {environment.id: 1}},
@@ -1197,37 +1320,52 @@ def _tsdb_record_all_metrics(jobs: Sequence[Job]) -> None:
             )
 
             if group_info.group_release:
-                frequencies.append(
+                frequencies[timestamp].append(
                     (
                         tsdb.models.frequent_releases_by_group,
                         {group_info.group.id: {group_info.group_release.id: 1}},
                     )
                 )
             if user:
-                records.append(
+                env_records.append(
                     (tsdb.models.users_affected_by_group, group_info.group.id, (user.tag_value,))
                 )
 
         if release:
-            incrs.append((tsdb.models.release, release.id))
+            env_incrs[(tsdb.models.release, release.id, timestamp)] += 1
 
         if user:
             project_id = job["project_id"]
-            records.append((tsdb.models.users_affected_by_project, project_id, (user.tag_value,)))
+            env_records.append(
+                (tsdb.models.users_affected_by_project, project_id, (user.tag_value,))
+            )
 
-        if incrs:
-            tsdb.incr_multi(incrs, timestamp=event.datetime, environment_id=environment.id)
+    for environment_id, counts in incrs.items():
+        tsdb.incr_multi(
+            [
+                (model, key, {"timestamp": timestamp, "count": count})
+                for (model, key, timestamp), count in counts.items()
+            ],
+            environment_id=environment_id,
+        )
 
-        if records:
-            tsdb.record_multi(records, timestamp=event.datetime, environment_id=environment.id)
+    for (environment_id, timestamp), items in records.items():
+        if items:
+            tsdb.record_multi(items, timestamp=timestamp, environment_id=environment_id)
 
-        if frequencies:
-            tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
+    for timestamp, requests in frequencies.items():
+        tsdb.record_frequency_multi(requests, timestamp=timestamp)
 
 
 @metrics.wraps("save_event.nodestore_save_many")
 def _nodestore_save_many(jobs: Sequence[Job]) -> None:
+    """
+    Writes the events to nodestore. Backends that coalesce writes may hold on
+    to them until `_flush_nodestore` is called, right before the events are
+    handed to post processing.
+    """
     inserted_time = datetime.utcnow().replace(tzinfo=UTC).timestamp()
+    items = {}
     for job in jobs:
         # Write the event to Nodestore
         subkeys = {}
@@ -1243,11 +1381,25 @@ def _nodestore_save_many(jobs: Sequence[Job]) -> None:
                 subkeys["unprocessed"] = unprocessed
 
         job["event"].data["nodestore_insert"] = inserted_time
-        job["event"].data.save(subkeys=subkeys)
+        node_subkeys = job["event"].data.get_subkeys_to_save(subkeys=subkeys)
+        if node_subkeys is not None:
+            items[job["event"].data.id] = node_subkeys
+
+    if items:
+        nodestore.set_subkeys_multi(items)
+
+
+def _flush_nodestore(jobs: Sequence[Job]) -> None:
+    # Post processing reads the events from nodestore, so the writes of these
+    # events must not be held on to by backends that coalesce writes. Other
+    # pending writes stay batched.
+    nodestore.flush([job["event"].data.id for job in jobs])
 
 
 @metrics.wraps("save_event.eventstream_insert_many")
 def _eventstream_insert_many(jobs: Sequence[Job]) -> None:
+    _flush_nodestore(jobs)
+
     for job in jobs:
         if job["event"].project_id == settings.SENTRY_PROJECT:
             metrics.incr(
@@ -1448,12 +1600,15 @@ def _save_aggregate(
     metadata: dict[str, Any],
     received_timestamp: Union[int, float],
     migrate_off_hierarchical: Optional[bool] = False,
+    grouphashes: Optional[GroupHashesMapping] = None,
     **kwargs: dict[str, Any],
 ) -> Optional[GroupInfo]:
     project = event.project
 
     flat_grouphashes = [
-        GroupHash.objects.get_or_create(project=project, hash=hash)[0] for hash in hashes.hashes
+        (grouphashes or {}).get((project.id, hash))
+        or GroupHash.objects.get_or_create(project=project, hash=hash)[0]
+        for hash in hashes.hashes
     ]
 
     # The root_hierarchical_hash is the least specific hash within the tree, so
@@ -2395,5 +2550,7 @@ def save_generic_events(jobs: Sequence[Job], projects: ProjectsMapping) -> Seque
     _get_or_create_environment_many(jobs, projects)
     _materialize_event_metrics(jobs)
     _nodestore_save_many(jobs)
+    # The caller hands generic events to post processing with their occurrence.
+    _flush_nodestore(jobs)
 
     return jobs
@@ -0,0 +1,86 @@
+"""
+Process-wide caches of parsed grouping configs.
+
+Parsing enhancements and fingerprinting rules (and decoding serialized
+enhancements) is expensive compared to applying them, yet the same handful of
+configs is used for the vast majority of events. The caches in this module
+keep the parsed objects around, keyed by a hash of their source, so that
+every worker thread shares them. Cached objects must be treated as immutable.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Optional, TypeVar
+
+from django.conf import settings
+
+from sentry.utils import metrics
+from sentry.utils.hashlib import md5_text
+
+T = TypeVar("T")
+
+
+class ParsedConfigCache(Generic[T]):
+    """A thread-safe LRU of parsed configs keyed by the hash of their source."""
+
+    def __init__(self, name: str, maxsize: Optional[int] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, T]" = OrderedDict()
+
+    def get_or_parse(self, source: str, parse: Callable[[], T]) -> T:
+        """
+        Returns the cached object for ``source`` or invokes ``parse`` to create
+        it. Exceptions raised by ``parse`` are not cached.
+        """
+        key = md5_text(source).hexdigest()
+
+        with self._lock:
+            rv = self._items.get(key)
+            if rv is not None:
+                self._items.move_to_end(key)
+
+        if rv is not None:
+            metrics.incr("grouping.config_cache.hit", tags={"cache": self.name}, sample_rate=0.01)
+            return rv
+
+        metrics.incr("grouping.config_cache.miss", tags={"cache": self.name})
+        rv = parse()
+
+        maxsize = self.maxsize
+        if maxsize is None:
+            maxsize = settings.SENTRY_GROUPING_CONFIG_CACHE_SIZE
+
+        with self._lock:
+            self._items[key] = rv
+            while len(self._items) > maxsize:
+                self._items.popitem(last=False)
+
+        return rv
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+enhancements_cache: ParsedConfigCache = ParsedConfigCache("enhancements")
+fingerprinting_cache: ParsedConfigCache = ParsedConfigCache("fingerprinting")
+
+
+def warmup_config_caches() -> None:
+    """
+    Loads the default enhancements of every grouping config, which are built
+    from ``grouping/enhancer/enhancement-configs``, so that the first events
+    handled by a freshly started worker don't pay for decoding and indexing.
+    """
+    from sentry.grouping.api import get_default_enhancements
+    from sentry.grouping.enhancer import Enhancements
+    from sentry.grouping.strategies.configurations import CONFIGURATIONS
+
+    with metrics.timer("grouping.config_cache.warmup"):
+        for config_id in CONFIGURATIONS:
+            Enhancements.loads(get_default_enhancements(config_id))._get_matcher_indexes()
@@ -20,6 +20,7 @@ from .matchers import (
     Match,
     create_match_frame,
 )
+from .matcher_index import get_matcher_indexes
 
 # Grammar is defined in EBNF syntax.
 enhancements_grammar = Grammar(
@@ -116,6 +117,20 @@ class Enhancements:
         self._modifier_rules = [rule for rule in self.iter_rules() if rule.is_modifier]
         self._updater_rules = [rule for rule in self.iter_rules() if rule.is_updater]
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_matcher_indexes", None)
+        return state
+
+    def _get_matcher_indexes(self):
+        """Returns the modifier and updater `MatcherIndex` of this config."""
+        # Not set in `__init__` so that instances restored from older pickles
+        # keep working.
+        rv = getattr(self, "_matcher_indexes", None)
+        if rv is None:
+            rv = self._matcher_indexes = get_matcher_indexes(self)
+        return rv
+
     def apply_modifications_to_frame(self, frames, platform, exception_data):
         """This applies the frame modifications to the frames itself.  This
         does not affect grouping.
@@ -125,10 +140,11 @@ class Enhancements:
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
 
-        for rule in self._modifier_rules:
-            for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
-            ):
+        modifier_index, _ = self._get_matcher_indexes()
+        for rule, actions in modifier_index.iter_matching_frame_actions(
+            match_frames, platform, exception_data, cache
+        ):
+            for idx, action in actions:
                 action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
 
     def update_frame_components_contributions(self, components, frames, platform, exception_data):
@@ -138,12 +154,12 @@ class Enhancements:
         match_frames = [create_match_frame(frame, platform) for frame in frames]
 
         stacktrace_state = StacktraceState()
+        _, updater_index = self._get_matcher_indexes()
         # Apply direct frame actions and update the stack state alongside
-        for rule in self._updater_rules:
-
-            for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
-            ):
+        for rule, actions in updater_index.iter_matching_frame_actions(
+            match_frames, platform, exception_data, cache
+        ):
+            for idx, action in actions:
                 action.update_frame_components_contributions(components, frames, idx, rule=rule)
                 action.modify_stacktrace_state(stacktrace_state, rule)
 
@@ -249,6 +265,18 @@ class Enhancements:
 
     @classmethod
     def loads(cls, data):
+        """
+        Loads a serialized config. Parsed configs are shared process-wide, so
+        the returned instance must not be modified.
+        """
+        from sentry.grouping.config_cache import enhancements_cache
+
+        if isinstance(data, bytes):
+            data = data.decode("ascii", "ignore")
+        return enhancements_cache.get_or_parse(f"loads:{data}", lambda: cls._loads(data))
+
+    @classmethod
+    def _loads(cls, data):
         if isinstance(data, str):
             data = data.encode("ascii", "ignore")
         padded = data + b"=" * (4 - (len(data) % 4))
@@ -260,7 +288,20 @@ class Enhancements:
             raise ValueError("invalid stack trace rule config: %s" % e)
 
     @classmethod
-    def from_config_string(self, s, bases=None, id=None):
+    def from_config_string(cls, s, bases=None, id=None):
+        """
+        Parses a config string. Parsed configs are shared process-wide, so
+        the returned instance must not be modified.
+        """
+        from sentry.grouping.config_cache import enhancements_cache
+
+        source = f"config:{id}:{','.join(bases or ())}:{s}"
+        return enhancements_cache.get_or_parse(
+            source, lambda: cls._from_config_string(s, bases=bases, id=id)
+        )
+
+    @classmethod
+    def _from_config_string(cls, s, bases=None, id=None):
         try:
             tree = enhancements_grammar.parse(s)
         except ParseError as e:
@@ -312,9 +353,14 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None, cache=None):
+    def get_matching_frame_actions(
+        self, frames, platform, exception_data=None, cache=None, frame_indices=None
+    ):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
+
+        If `frame_indices` is given, only the frames at those indexes are
+        considered (see `MatcherIndex`).
         """
         if not self.matchers:
             return []
@@ -326,8 +372,11 @@ class Rule:
 
         rv = []
 
+        if frame_indices is None:
+            frame_indices = range(len(frames))
+
         # 2 - Check if frame matchers match
-        for idx, frame in enumerate(frames):
+        for idx in frame_indices:
             if all(
                 m.matches_frame(frames, idx, platform, exception_data, cache)
                 for m in self._other_matchers
@@ -454,7 +503,7 @@ def _load_configs():
                 # We cannot use `:` in filenames on Windows but we already have ids with
                 # `:` in their names hence this trickery.
                 fn = fn.replace("@", ":")
-                rv[fn[:-4]] = Enhancements.from_config_string(f.read(), id=fn[:-4])
+                rv[fn[:-4]] = Enhancements._from_config_string(f.read(), id=fn[:-4])
     return rv
 
 
@@ -0,0 +1,244 @@
+"""
+An index over the frame matchers of enhancement rules.
+
+Evaluating enhancements naively means running every matcher of every rule
+against every frame. Most rules however can only ever match frames whose
+function, module, path or package starts with a literal prefix, or which
+belong to a specific platform family. ``MatcherIndex`` extracts these
+constraints once per enhancements config and uses them to select the
+candidate frames of each rule in a single pass over the stack trace. The
+actual matchers (including caller/callee and exception matchers) still run
+for all candidates, so the index never changes which frames a rule matches.
+"""
+
+import threading
+from collections import OrderedDict, defaultdict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from sentry.utils import metrics
+
+from .matchers import FamilyMatch, FrameMatch, FunctionMatch, ModuleMatch, PathLikeMatch
+
+if TYPE_CHECKING:
+    from . import Enhancements, Rule
+
+# Characters that end the literal prefix of a glob pattern.
+GLOB_SPECIAL_CHARS = frozenset(b"*?[]{}\\!")
+
+# Maximum number of compiled indexes kept in memory per process.
+MAX_CACHED_INDEXES = 500
+
+
+def get_literal_prefix(pattern: bytes) -> bytes:
+    """Returns the part of a glob pattern before its first special character."""
+    for idx, char in enumerate(pattern):
+        if char in GLOB_SPECIAL_CHARS:
+            return pattern[:idx]
+    return pattern
+
+
+def normalize_path(value: bytes) -> bytes:
+    """
+    Normalizes a (lowercased) path or package for prefix lookups.
+
+    Path matchers normalize separators and also try the value with a leading
+    slash, so both separators and leading slashes are removed here.
+    """
+    return value.replace(b"\\", b"/").lstrip(b"/")
+
+
+def _get_path_anchor(pattern: bytes) -> bytes:
+    # Only the first path segment is used as anchor, as later segments could
+    # be affected by path normalization.
+    segment = normalize_path(get_literal_prefix(pattern)).split(b"/", 1)[0]
+    if segment in (b".", b".."):
+        return b""
+    return segment
+
+
+def _get_anchor(rule: "Rule") -> Optional[Tuple[str, bytes]]:
+    """
+    Returns the field and literal prefix that the frame itself must match
+    for the rule to apply, picking the longest one if there are several.
+    """
+    best = None
+    for matcher in rule._other_matchers:
+        # Caller and callee matchers are not `FrameMatch` instances and look
+        # at neighboring frames, so they cannot be used as anchors.
+        if not isinstance(matcher, FrameMatch) or matcher.negated:
+            continue
+
+        if isinstance(matcher, (FunctionMatch, ModuleMatch)):
+            prefix = get_literal_prefix(matcher._encoded_pattern)
+        elif isinstance(matcher, PathLikeMatch):
+            prefix = _get_path_anchor(matcher._encoded_pattern)
+        else:
+            continue
+
+        if prefix and (best is None or len(prefix) > len(best[1])):
+            best = (matcher.key, prefix)
+
+    return best
+
+
+def _get_families(rule: "Rule") -> Optional[FrozenSet[bytes]]:
+    """Returns the families a rule is restricted to, or `None`."""
+    families = None
+    for matcher in rule._other_matchers:
+        if isinstance(matcher, FamilyMatch) and not matcher.negated:
+            if b"all" in matcher._flags:
+                continue
+            flags = frozenset(matcher._flags)
+            families = flags if families is None else families & flags
+    return families
+
+
+def _get_frame_value(match_frame: Mapping[str, Any], field: str) -> Optional[bytes]:
+    value = match_frame.get(field)
+    if value is None:
+        return None
+    if field in ("path", "package"):
+        return normalize_path(value)
+    return value
+
+
+class MatcherIndex:
+    """
+    Selects the candidate frames for a list of rules.
+
+    Rules are bucketed by the literal prefix of one of their function, module,
+    path or package matchers and by the families they are restricted to.
+    """
+
+    def __init__(self, rules: Sequence["Rule"]):
+        self.rules = list(rules)
+
+        self._families: List[Optional[FrozenSet[bytes]]] = []
+        self._unanchored: List[int] = []
+        # field -> prefix -> rule indexes
+        self._anchors: Dict[str, Dict[bytes, List[int]]] = {}
+
+        for rule_idx, rule in enumerate(self.rules):
+            self._families.append(_get_families(rule))
+            anchor = _get_anchor(rule)
+            if anchor is None:
+                self._unanchored.append(rule_idx)
+            else:
+                field, prefix = anchor
+                self._anchors.setdefault(field, {}).setdefault(prefix, []).append(rule_idx)
+
+        # field -> distinct prefix lengths, longest first
+        self._prefix_lengths = {
+            field: sorted({len(prefix) for prefix in prefixes}, reverse=True)
+            for field, prefixes in self._anchors.items()
+        }
+        self._unanchored_by_family: Dict[bytes, List[int]] = {}
+
+    def _get_unanchored(self, family: bytes) -> List[int]:
+        rv = self._unanchored_by_family.get(family)
+        if rv is None:
+            rv = self._unanchored_by_family[family] = [
+                rule_idx
+                for rule_idx in self._unanchored
+                if self._families[rule_idx] is None or family in self._families[rule_idx]
+            ]
+        return rv
+
+    def get_candidate_frames(
+        self, match_frames: Sequence[Mapping[str, Any]]
+    ) -> Dict[int, List[int]]:
+        """
+        Returns a mapping of rule index to the (ordered) indexes of all frames
+        that rule could possibly match.
+        """
+        rv: Dict[int, List[int]] = defaultdict(list)
+
+        for frame_idx, match_frame in enumerate(match_frames):
+            family = match_frame["family"]
+
+            for rule_idx in self._get_unanchored(family):
+                rv[rule_idx].append(frame_idx)
+
+            for field, lengths in self._prefix_lengths.items():
+                value = _get_frame_value(match_frame, field)
+                if not value:
+                    continue
+
+                prefixes = self._anchors[field]
+                for length in lengths:
+                    if length > len(value):
+                        continue
+                    for rule_idx in prefixes.get(value[:length], ()):
+                        families = self._families[rule_idx]
+                        if families is None or family in families:
+                            rv[rule_idx].append(frame_idx)
+
+        return rv
+
+    def iter_matching_frame_actions(
+        self,
+        match_frames: Sequence[MutableMapping[str, Any]],
+        platform: Optional[str],
+        exception_data: Any,
+        cache: MutableMapping[Any, Any],
+    ) -> Iterator[Tuple["Rule", List[Tuple[int, Any]]]]:
+        """
+        Yields every rule with matches together with its matching actions, in
+        rule order. Matches of a rule are computed only once the caller has
+        consumed the previous rule, so actions that modify ``match_frames``
+        are visible to subsequent rules exactly as without the index.
+        """
+        candidates = self.get_candidate_frames(match_frames)
+
+        for rule_idx in sorted(candidates):
+            rule = self.rules[rule_idx]
+            actions = rule.get_matching_frame_actions(
+                match_frames, platform, exception_data, cache, frame_indices=candidates[rule_idx]
+            )
+            if actions:
+                yield rule, actions
+
+
+_cache_lock = threading.Lock()
+_index_cache: "OrderedDict[str, Tuple[MatcherIndex, MatcherIndex]]" = OrderedDict()
+
+
+def get_matcher_indexes(enhancements: "Enhancements") -> Tuple[MatcherIndex, MatcherIndex]:
+    """
+    Returns the modifier and updater rule indexes of an enhancements config.
+    Indexes are shared between all instances with the same serialized config.
+    """
+    key = enhancements.dumps()
+
+    with _cache_lock:
+        rv = _index_cache.get(key)
+        if rv is not None:
+            _index_cache.move_to_end(key)
+            metrics.incr("grouping.enhancer.matcher_index.hit", sample_rate=0.01)
+            return rv
+
+    metrics.incr("grouping.enhancer.matcher_index.miss")
+    with metrics.timer("grouping.enhancer.matcher_index.compile"):
+        rv = (
+            MatcherIndex([rule for rule in enhancements.iter_rules() if rule.is_modifier]),
+            MatcherIndex([rule for rule in enhancements.iter_rules() if rule.is_updater]),
+        )
+
+    with _cache_lock:
+        _index_cache[key] = rv
+        while len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+
+    return rv
@@ -91,6 +91,29 @@ class IncidentManager(BaseManager):
 
         return incident
 
+    def get_active_incidents(self, alert_rules_and_projects):
+        """
+        Fetches the active incidents of many `(alert_rule, project)` pairs, with one
+        cache lookup for all of them.
+        :return: A dict of `(alert_rule_id, project_id)` to the active incident or None
+        """
+        cache_keys = {
+            (alert_rule.id, project.id): self._build_active_incident_cache_key(
+                alert_rule.id, project.id
+            )
+            for alert_rule, project in alert_rules_and_projects
+        }
+        cached = cache.get_many(cache_keys.values())
+
+        incidents = {}
+        for alert_rule, project in alert_rules_and_projects:
+            key = (alert_rule.id, project.id)
+            incident = cached.get(cache_keys[key])
+            if incident is None:
+                incident = self.get_active_incident(alert_rule, project)
+            incidents[key] = incident or None
+        return incidents
+
     @classmethod
     def clear_active_incident_cache(cls, instance, **kwargs):
         for project in instance.projects.all():
@@ -328,6 +351,45 @@ class AlertRuleManager(BaseManager):
 
         return alert_rule
 
+    def get_for_subscriptions(self, subscriptions):
+        """
+        Fetches the AlertRules associated with many Subscriptions, with one cache
+        lookup and at most one query for all of them.
+        :return: A dict of subscription id to AlertRule. Subscriptions without an
+        AlertRule are left out.
+        """
+        cache_keys = {
+            subscription.id: self.__build_subscription_cache_key(subscription.id)
+            for subscription in subscriptions
+        }
+        cached = cache.get_many(cache_keys.values())
+
+        alert_rules = {}
+        missing = []
+        for subscription in subscriptions:
+            alert_rule = cached.get(cache_keys[subscription.id])
+            if alert_rule is None:
+                missing.append(subscription)
+            else:
+                alert_rules[subscription.id] = alert_rule
+
+        if missing:
+            alert_rules_by_query = {
+                alert_rule.snuba_query_id: alert_rule
+                for alert_rule in self.filter(
+                    snuba_query_id__in={subscription.snuba_query_id for subscription in missing}
+                )
+            }
+            to_cache = {}
+            for subscription in missing:
+                alert_rule = alert_rules_by_query.get(subscription.snuba_query_id)
+                if alert_rule is not None:
+                    alert_rules[subscription.id] = alert_rule
+                    to_cache[cache_keys[subscription.id]] = alert_rule
+            cache.set_many(to_cache, 3600)
+
+        return alert_rules
+
     @classmethod
     def clear_subscription_cache(cls, instance, **kwargs):
         cache.delete(cls.__build_subscription_cache_key(instance.id))
@@ -483,6 +545,36 @@ class AlertRuleTriggerManager(BaseManager):
             cache.set(cache_key, triggers, 3600)
         return triggers
 
+    def get_for_alert_rules(self, alert_rules):
+        """
+        Fetches the AlertRuleTriggers associated with many AlertRules, with one
+        cache lookup and at most one query for all of them.
+        :return: A dict of alert rule id to a list of AlertRuleTriggers
+        """
+        cache_keys = {
+            alert_rule.id: self._build_trigger_cache_key(alert_rule.id)
+            for alert_rule in alert_rules
+        }
+        cached = cache.get_many(cache_keys.values())
+
+        triggers = {}
+        for alert_rule_id, cache_key in cache_keys.items():
+            if cached.get(cache_key) is not None:
+                triggers[alert_rule_id] = cached[cache_key]
+
+        missing = [alert_rule_id for alert_rule_id in cache_keys if alert_rule_id not in triggers]
+        if missing:
+            for alert_rule_id in missing:
+                triggers[alert_rule_id] = []
+            for trigger in AlertRuleTrigger.objects.filter(alert_rule_id__in=missing):
+                triggers[trigger.alert_rule_id].append(trigger)
+            cache.set_many(
+                {cache_keys[alert_rule_id]: triggers[alert_rule_id] for alert_rule_id in missing},
+                3600,
+            )
+
+        return triggers
+
     @classmethod
     def clear_trigger_cache(cls, instance, **kwargs):
         cache.delete(cls._build_trigger_cache_key(instance.alert_rule_id))
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import operator
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Sequence, Tuple, TypeVar, cast
@@ -10,7 +11,7 @@ from django.conf import settings
 from django.db import transaction
 from snuba_sdk import Column, Condition, Limit, Op
 
-from sentry import features
+from sentry import features, options
 from sentry.constants import CRASH_RATE_ALERT_AGGREGATE_ALIAS, CRASH_RATE_ALERT_SESSION_COUNT_ALIAS
 from sentry.incidents.logic import (
     CRITICAL_TRIGGER_LABEL,
@@ -77,21 +78,39 @@ class SubscriptionProcessor:
         AlertRuleThresholdType.BELOW: (operator.lt, operator.gt),
     }
 
-    def __init__(self, subscription: QuerySubscription) -> None:
+    def __init__(
+        self,
+        subscription: QuerySubscription,
+        alert_rule: Optional[AlertRule] = None,
+        triggers: Optional[List[AlertRuleTrigger]] = None,
+        alert_rule_stats: Optional[Tuple[datetime, Dict[str, int], Dict[str, int]]] = None,
+    ) -> None:
+        """
+        The alert rule, its triggers and the alert rule stats are fetched unless they
+        are passed in, which `build_subscription_processors` does for many
+        subscriptions at once.
+        """
         self.subscription = subscription
-        try:
-            self.alert_rule = AlertRule.objects.get_for_subscription(subscription)
-        except AlertRule.DoesNotExist:
-            return
-
-        self.triggers = AlertRuleTrigger.objects.get_for_alert_rule(self.alert_rule)
-        self.triggers.sort(key=lambda trigger: trigger.alert_threshold)
-
+        if alert_rule is None:
+            try:
+                alert_rule = AlertRule.objects.get_for_subscription(subscription)
+            except AlertRule.DoesNotExist:
+                return
+        self.alert_rule = alert_rule
+
+        if triggers is None:
+            triggers = AlertRuleTrigger.objects.get_for_alert_rule(self.alert_rule)
+        self.triggers = sorted(triggers, key=lambda trigger: trigger.alert_threshold)
+
+        if alert_rule_stats is None:
+            alert_rule_stats = get_alert_rule_stats(
+                self.alert_rule, self.subscription, self.triggers
+            )
         (
             self.last_update,
             self.trigger_alert_counts,
             self.trigger_resolve_counts,
-        ) = get_alert_rule_stats(self.alert_rule, self.subscription, self.triggers)
+        ) = alert_rule_stats
         self.orig_trigger_alert_counts = deepcopy(self.trigger_alert_counts)
         self.orig_trigger_resolve_counts = deepcopy(self.trigger_resolve_counts)
 
@@ -693,6 +712,133 @@ class SubscriptionProcessor:
             updated_trigger_alert_counts,
             updated_trigger_resolve_counts,
         )
+        # Later updates processed by this processor are compared with the
+        # counts that were just written.
+        self.orig_trigger_alert_counts = deepcopy(self.trigger_alert_counts)
+        self.orig_trigger_resolve_counts = deepcopy(self.trigger_resolve_counts)
+
+
+def build_subscription_processors(
+    subscriptions: Sequence[QuerySubscription],
+) -> Dict[int, SubscriptionProcessor]:
+    """
+    Builds `SubscriptionProcessor`s for many subscriptions, fetching their alert rules,
+    triggers, active incidents and alert rule stats in bulk.
+    :return: A dict of subscription id to processor
+    """
+    projects = {
+        project.id: project
+        for project in Project.objects.get_many_from_cache(
+            list({subscription.project_id for subscription in subscriptions})
+        )
+    }
+    for subscription in subscriptions:
+        if subscription.project_id in projects:
+            subscription.project = projects[subscription.project_id]
+
+    alert_rules = AlertRule.objects.get_for_subscriptions(subscriptions)
+    triggers = AlertRuleTrigger.objects.get_for_alert_rules(list(set(alert_rules.values())))
+    with_alert_rules = [
+        subscription for subscription in subscriptions if subscription.id in alert_rules
+    ]
+    stats = get_alert_rule_stats_multi(
+        [
+            (
+                alert_rules[subscription.id],
+                subscription,
+                triggers[alert_rules[subscription.id].id],
+            )
+            for subscription in with_alert_rules
+        ]
+    )
+
+    processors = {}
+    for subscription, alert_rule_stats in zip(with_alert_rules, stats):
+        alert_rule = alert_rules[subscription.id]
+        processors[subscription.id] = SubscriptionProcessor(
+            subscription,
+            alert_rule=alert_rule,
+            triggers=triggers[alert_rule.id],
+            alert_rule_stats=alert_rule_stats,
+        )
+
+    # Processors of deleted projects don't need their active incident.
+    with_projects = [
+        processor
+        for processor in processors.values()
+        if processor.subscription.project_id in projects
+    ]
+    active_incidents = Incident.objects.get_active_incidents(
+        [(processor.alert_rule, processor.subscription.project) for processor in with_projects]
+    )
+    for processor in with_projects:
+        processor.active_incident = active_incidents[
+            (processor.alert_rule.id, processor.subscription.project_id)
+        ]
+
+    # Subscriptions without an alert rule are skipped by `process_update`.
+    for subscription in subscriptions:
+        if subscription.id not in processors:
+            processors[subscription.id] = SubscriptionProcessor(subscription)
+
+    return processors
+
+
+# The thread pool used by `process_subscription_updates` and its size.
+_executor: Optional[Tuple[int, ThreadPoolExecutor]] = None
+
+
+def _get_executor(concurrency: int) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None or _executor[0] != concurrency:
+        if _executor is not None:
+            _executor[1].shutdown(wait=False)
+        _executor = (
+            concurrency,
+            ThreadPoolExecutor(
+                max_workers=concurrency, thread_name_prefix="subscription-processor"
+            ),
+        )
+    return _executor[1]
+
+
+def process_subscription_updates(
+    updates: Sequence[Tuple[SubscriptionUpdate, QuerySubscription]]
+) -> None:
+    """
+    Processes updates of many subscriptions. Updates are grouped by subscription and
+    processed in order by a single processor per subscription, while different
+    subscriptions are processed concurrently by up to
+    ``incidents.subscription-processor.concurrency`` threads.
+    """
+    updates_by_subscription: Dict[int, List[SubscriptionUpdate]] = {}
+    subscriptions = {}
+    for subscription_update, subscription in updates:
+        updates_by_subscription.setdefault(subscription.id, []).append(subscription_update)
+        subscriptions[subscription.id] = subscription
+
+    with metrics.timer("incidents.subscription_procesor.build_processors"):
+        processors = build_subscription_processors(list(subscriptions.values()))
+
+    def process_subscription(subscription_id: int) -> None:
+        processor = processors[subscription_id]
+        for subscription_update in updates_by_subscription[subscription_id]:
+            try:
+                with metrics.timer("incidents.subscription_procesor.process_update"):
+                    processor.process_update(subscription_update)
+            except Exception:
+                logger.exception(
+                    "Failed to process subscription update",
+                    extra={"subscription_id": subscription_id},
+                )
+
+    concurrency = options.get("incidents.subscription-processor.concurrency")
+    if concurrency > 1 and len(updates_by_subscription) > 1:
+        # Consume the results so that the batch is done before returning.
+        list(_get_executor(concurrency).map(process_subscription, updates_by_subscription))
+    else:
+        for subscription_id in updates_by_subscription:
+            process_subscription(subscription_id)
 
 
 def build_alert_rule_stat_keys(alert_rule: AlertRule, subscription: QuerySubscription) -> List[str]:
@@ -755,9 +901,15 @@ def get_alert_rule_stats(
     alert_rule_keys = build_alert_rule_stat_keys(alert_rule, subscription)
     trigger_keys = build_trigger_stat_keys(alert_rule, subscription, triggers)
     results = get_redis_client().mget(alert_rule_keys + trigger_keys)
-    results = tuple(0 if result is None else int(result) for result in results)
-    last_update = to_datetime(results[0])
-    trigger_results = results[1:]
+    return _parse_alert_rule_stats(triggers, results)
+
+
+def _parse_alert_rule_stats(
+    triggers: List[AlertRuleTrigger], results: Sequence[Optional[str]]
+) -> Tuple[datetime, Dict[str, int], Dict[str, int]]:
+    values = tuple(0 if result is None else int(result) for result in results)
+    last_update = to_datetime(values[0])
+    trigger_results = values[1:]
     trigger_alert_counts = {}
     trigger_resolve_counts = {}
 
@@ -770,6 +922,33 @@ def get_alert_rule_stats(
     return last_update, trigger_alert_counts, trigger_resolve_counts
 
 
+def get_alert_rule_stats_multi(
+    items: Sequence[Tuple[AlertRule, QuerySubscription, List[AlertRuleTrigger]]]
+) -> List[Tuple[datetime, Dict[str, int], Dict[str, int]]]:
+    """
+    Fetches the stats of many alert rules and subscriptions like `get_alert_rule_stats`,
+    with a single redis pipeline for all of them.
+    """
+    all_keys = [
+        build_alert_rule_stat_keys(alert_rule, subscription)
+        + build_trigger_stat_keys(alert_rule, subscription, triggers)
+        for alert_rule, subscription, triggers in items
+    ]
+    pipeline = get_redis_client().pipeline()
+    # Cluster pipelines don't support MGET, so every key is read with GET.
+    for keys in all_keys:
+        for key in keys:
+            pipeline.get(key)
+    results = pipeline.execute()
+
+    stats = []
+    start = 0
+    for (_, _, triggers), keys in zip(items, all_keys):
+        stats.append(_parse_alert_rule_stats(triggers, results[start : start + len(keys)]))
+        start += len(keys)
+    return stats
+
+
 def update_alert_rule_stats(
     alert_rule: AlertRule,
     subscription: QuerySubscription,
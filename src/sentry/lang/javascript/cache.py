@@ -1,8 +1,15 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from symbolic import SourceMapCache as SmCache
 from symbolic import SourceView
 
+from sentry.utils import metrics
 from sentry.utils.strings import codec_lookup
 
-__all__ = ["SourceCache", "SourceMapCache"]
+__all__ = ["SourceCache", "SourceMapCache", "ParsedSourceMapCache", "parsed_sourcemap_cache"]
 
 
 def is_utf8(codec):
@@ -90,3 +97,79 @@ class SourceMapCache:
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class ParsedSourceMapCache:
+    """
+    A process-wide LRU of parsed source map caches shared by all stack trace
+    processors.
+
+    Building a ``SmCache`` from a minified file and its source map is by far
+    the most expensive part of JavaScript processing, and the same pair of
+    files is usually needed by many events of the same release. Entries are
+    keyed by the digests of both inputs, so a re-uploaded or re-scraped file
+    can never resolve to a stale entry. The combined size of the inputs is
+    used as estimate of the memory held by an entry.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def _get_max_bytes(self):
+        if self.max_bytes is not None:
+            return self.max_bytes
+        return settings.SENTRY_JS_SOURCEMAP_CACHE_MAX_BYTES
+
+    @staticmethod
+    def _make_key(source, sourcemap):
+        return (hashlib.sha1(source).hexdigest(), hashlib.sha1(sourcemap).hexdigest())
+
+    def get_or_build(self, source, sourcemap):
+        """
+        Returns the ``SmCache`` for the given minified source and source map,
+        building it if necessary. Exceptions raised while building are
+        propagated and not cached.
+        """
+        max_bytes = self._get_max_bytes()
+        size = len(source) + len(sourcemap)
+        if size > max_bytes:
+            return SmCache.from_bytes(source, sourcemap)
+
+        key = self._make_key(source, sourcemap)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+
+        if item is not None:
+            metrics.incr("sourcemaps.parsed_cache.hit", sample_rate=0.1)
+            return item[0]
+
+        metrics.incr("sourcemaps.parsed_cache.miss", sample_rate=0.1)
+        with metrics.timer("sourcemaps.parsed_cache.build"):
+            rv = SmCache.from_bytes(source, sourcemap)
+
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = (rv, size)
+                self.total_bytes += size
+            while self.total_bytes > max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.total_bytes -= evicted_size
+                metrics.incr("sourcemaps.parsed_cache.evicted", sample_rate=0.1)
+
+        return rv
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+parsed_sourcemap_cache = ParsedSourceMapCache()
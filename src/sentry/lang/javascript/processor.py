@@ -6,6 +6,7 @@ import re
 import sys
 import time
 import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from enum import Enum
 from io import BytesIO
@@ -19,11 +20,11 @@ from django.conf import settings
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 from requests.utils import get_encoding_from_headers
-from symbolic import SourceMapCache as SmCache
 from symbolic import SourceView
 
 from sentry import features, http, options
 from sentry.event_manager import set_tag
+from sentry.lang.javascript.cache import parsed_sourcemap_cache
 from sentry.models import (
     NULL_STRING,
     ArtifactBundle,
@@ -665,6 +666,27 @@ INVALID_ARCHIVE = type("INVALID_ARCHIVE", (), {})()
 # the system from loading an arbitrarily big number of artifacts that might cause high memory and cpu usage.
 MAX_ARTIFACTS_NUMBER = 5
 
+# Maximum number of artifact bundles that are downloaded concurrently by a single process.
+MAX_ARTIFACT_BUNDLE_FETCH_WORKERS = 8
+
+artifact_bundle_fetch_pool = ThreadPoolExecutor(
+    max_workers=MAX_ARTIFACT_BUNDLE_FETCH_WORKERS, thread_name_prefix="artifact-bundle-fetch"
+)
+
+
+def read_and_cache_artifact_bundle_file(cache_key, artifact_bundle_file):
+    """
+    Reads the contents of an ArtifactBundle file and stores them in the cache.
+    """
+    with sentry_sdk.start_span(op="_fetch_artifact_bundle_file.read_for_caching") as span:
+        span.set_data("file_size", artifact_bundle_file.size)
+        contents = artifact_bundle_file.read()
+    with sentry_sdk.start_span(op="_fetch_artifact_bundle_file.write_to_cache") as span:
+        span.set_data("file_size", len(contents))
+        cache.set(cache_key, contents, 3600)
+
+    return contents
+
 
 class Fetcher:
     """
@@ -690,6 +712,9 @@ class Fetcher:
         # Set that contains all the tuples (release, dist) of a bundle for which the query returned an empty result.
         # Here we also don't put the project for the same reasoning as above.
         self.empty_result_for_releases = set()
+        # Mappings between bundle_id -> Future of the prefetch downloads that didn't finish in time. The regular
+        # fetching waits for them instead of downloading the bundles again.
+        self.pending_downloads = {}
 
     def bind_release(self, release=None, dist=None):
         """
@@ -706,6 +731,11 @@ class Fetcher:
             if open_archive is not INVALID_ARCHIVE:
                 open_archive.close()
 
+        # Downloads that were not needed after all don't have to start anymore.
+        for future in self.pending_downloads.values():
+            future.cancel()
+        self.pending_downloads.clear()
+
     def _lookup_in_open_archives(self, block):
         """
         Looks up in open archives if there is one that contains a matching file with debug_id and source_file_type.
@@ -792,16 +822,182 @@ class Fetcher:
         if CACHE_MAX_VALUE_SIZE is not None and artifact_bundle_file.size > CACHE_MAX_VALUE_SIZE:
             return artifact_bundle_file
 
-        with sentry_sdk.start_span(op="_fetch_artifact_bundle_file.read_for_caching") as span:
-            span.set_data("file_size", artifact_bundle_file.size)
-            contents = artifact_bundle_file.read()
-        with sentry_sdk.start_span(op="_fetch_artifact_bundle_file.write_to_cache") as span:
-            span.set_data("file_size", len(contents))
-            cache.set(cache_key, contents, 3600)
-
+        read_and_cache_artifact_bundle_file(cache_key, artifact_bundle_file)
         artifact_bundle_file.seek(0)
         return artifact_bundle_file
 
+    def _get_artifact_bundle_file(self, artifact_bundle):
+        """
+        Returns the File object bound to an ArtifactBundle.
+
+        In case the bundle is still being downloaded by `prefetch_artifact_bundles`, we wait for that download instead
+        of fetching the bundle a second time.
+        """
+        download = self.pending_downloads.pop(artifact_bundle.id, None)
+        if download is not None:
+            try:
+                return BytesIO(download.result())
+            except Exception as exc:
+                logger.debug("Failed to fetch artifact bundle %s", artifact_bundle.id, exc_info=exc)
+
+        return self._fetch_artifact_bundle_file(artifact_bundle)
+
+    def _open_cached_archive(self, artifact_bundle):
+        """
+        Opens an ArtifactBundle through the local disk cache, which serves the individual files from a memory map of
+        the bundle instead of keeping the whole bundle in memory.
+        """
+        archive = ArtifactBundle.cache.get_archive(artifact_bundle)
+        self.open_archives[artifact_bundle.id] = archive
+        return archive
+
+    def _open_archive(self, artifact_bundle_id, artifact_bundle_file):
+        """
+        Opens the .zip file of an ArtifactBundle and stores the archive in the local cache.
+
+        Returns None and marks the bundle as INVALID_ARCHIVE in case the file is not a valid archive.
+        """
+        try:
+            # We load the entire bundle into an archive and cache it locally. It is very important that this opened
+            # archive is closed before the processing ends.
+            with sentry_sdk.start_span(op="Fetcher.ArtifactBundleArchive"):
+                archive = ArtifactBundleArchive(artifact_bundle_file)
+                self.open_archives[artifact_bundle_id] = archive
+                return archive
+        except Exception as exc:
+            artifact_bundle_file.seek(0)
+            logger.debug(
+                "Failed to initialize archive for the artifact bundle file",
+                exc_info=exc,
+                extra={"contents": base64.b64encode(artifact_bundle_file.read(256))},
+            )
+            if artifact_bundle_id:
+                self.open_archives[artifact_bundle_id] = INVALID_ARCHIVE
+
+            return None
+
+    def prefetch_artifact_bundles(self, debug_ids, urls, timeout, max_bundles=None):
+        """
+        Concurrently downloads and opens all the artifact bundles that are expected to be needed for resolving the
+        files with the supplied 'debug_ids' and 'urls', so that the subsequent fetches are served by open archives.
+
+        The bundles are resolved on the calling thread and every distinct bundle is downloaded at most once, and at
+        most 'max_bundles' bundles are downloaded. Bundles that couldn't be downloaded within 'timeout' seconds keep
+        downloading and are picked up by the regular fetching.
+        """
+        artifact_bundles = {}
+
+        for debug_id in debug_ids:
+            try:
+                artifact_bundle = self._get_artifact_bundle_entry_by_debug_id(
+                    debug_id, SourceFileType.MINIFIED_SOURCE
+                )
+            except Exception:
+                continue
+            artifact_bundles.setdefault(artifact_bundle.id, artifact_bundle)
+
+        # Files resolved by url are cached individually, thus we only want to download the bundles of the release/dist
+        # pair in case at least one of the files is missing from the cache.
+        if self.release is not None and urls:
+            cache_keys = [get_cache_keys_new(url, self.release, self.dist)[0] for url in urls]
+            if len(cache.get_many(cache_keys)) < len(cache_keys):
+                try:
+                    for artifact_bundle in self._get_artifact_bundle_entries_by_release_dist_pair():
+                        artifact_bundles.setdefault(artifact_bundle.id, artifact_bundle)
+                except Exception:
+                    pass
+
+        pending = [
+            artifact_bundle
+            for artifact_bundle_id, artifact_bundle in artifact_bundles.items()
+            if artifact_bundle_id not in self.open_archives
+            and artifact_bundle_id not in self.pending_downloads
+        ]
+        # Every bundle would otherwise be fetched by the regular fetching, which is limited by the number of fetches.
+        if max_bundles is not None:
+            pending = pending[: max(max_bundles, 0)]
+        if not pending:
+            return
+
+        # Large bundles are downloaded by the local disk cache, which already fetches their blobs concurrently.
+        cached_on_disk = []
+        for artifact_bundle in pending:
+            if ArtifactBundle.cache.should_cache(artifact_bundle):
+                cached_on_disk.append(artifact_bundle)
+        pending = [
+            artifact_bundle for artifact_bundle in pending if artifact_bundle not in cached_on_disk
+        ]
+
+        for artifact_bundle in cached_on_disk:
+            try:
+                self._open_cached_archive(artifact_bundle)
+            except Exception as exc:
+                logger.debug("Failed to fetch artifact bundle %s", artifact_bundle.id, exc_info=exc)
+
+        if len(pending) == 1:
+            # There is nothing to gain from downloading a single bundle on another thread.
+            artifact_bundle = pending[0]
+            try:
+                artifact_bundle_file = self._fetch_artifact_bundle_file(artifact_bundle)
+            except Exception as exc:
+                logger.debug("Failed to fetch artifact bundle %s", artifact_bundle.id, exc_info=exc)
+            else:
+                self._open_archive(artifact_bundle.id, artifact_bundle_file)
+            return
+
+        cache_keys = {
+            artifact_bundle.id: get_artifact_bundle_cache_key(artifact_bundle.id)
+            for artifact_bundle in pending
+        }
+        cached_bundles = cache.get_many(list(cache_keys.values())) if cache_keys else {}
+
+        artifact_bundle_files = {}
+        downloads = {}
+        for artifact_bundle in pending:
+            cache_key = cache_keys[artifact_bundle.id]
+            contents = cached_bundles.get(cache_key)
+            if contents:
+                artifact_bundle_files[artifact_bundle.id] = BytesIO(contents)
+                continue
+
+            try:
+                artifact_bundle_file = fetch_retry_policy(artifact_bundle.file.getfile)
+            except Exception as exc:
+                logger.debug("Failed to fetch artifact bundle %s", artifact_bundle.id, exc_info=exc)
+                continue
+
+            # Files that are too big for the cache are read lazily by the archive.
+            if (
+                CACHE_MAX_VALUE_SIZE is not None
+                and artifact_bundle_file.size > CACHE_MAX_VALUE_SIZE
+            ):
+                artifact_bundle_files[artifact_bundle.id] = artifact_bundle_file
+                continue
+
+            downloads[artifact_bundle.id] = artifact_bundle_fetch_pool.submit(
+                read_and_cache_artifact_bundle_file, cache_key, artifact_bundle_file
+            )
+
+        if downloads:
+            done, not_done = wait(downloads.values(), timeout=timeout)
+            metrics.incr("sourcemaps.artifact_bundles.prefetched", amount=len(done))
+            if not_done:
+                metrics.incr("sourcemaps.artifact_bundles.prefetch_timeout", amount=len(not_done))
+
+            for artifact_bundle_id, future in downloads.items():
+                if future not in done:
+                    self.pending_downloads[artifact_bundle_id] = future
+                    continue
+                try:
+                    artifact_bundle_files[artifact_bundle_id] = BytesIO(future.result())
+                except Exception as exc:
+                    logger.debug(
+                        "Failed to fetch artifact bundle %s", artifact_bundle_id, exc_info=exc
+                    )
+
+        for artifact_bundle_id, artifact_bundle_file in artifact_bundle_files.items():
+            self._open_archive(artifact_bundle_id, artifact_bundle_file)
+
     def _open_artifact_bundle_archive(self, debug_id, source_file_type):
         """
         Opens an ArtifactBundle as a .zip file and returns an ArtifactBundleArchive object that allows the caller
@@ -850,10 +1046,15 @@ class Fetcher:
 
                 return cached_open_archive
 
+            # Large bundles are served by the local disk cache.
+            if ArtifactBundle.cache.should_cache(artifact_bundle):
+                with sentry_sdk.start_span(op="Fetcher.fetch_by_debug_id._open_cached_archive"):
+                    return self._open_cached_archive(artifact_bundle)
+
             # In case the local cache doesn't have the archive, we will try to load it from memcached and then directly
             # from the source.
             with sentry_sdk.start_span(op="Fetcher.fetch_by_debug_id._fetch_artifact_bundle_file"):
-                artifact_bundle_file = self._fetch_artifact_bundle_file(artifact_bundle)
+                artifact_bundle_file = self._get_artifact_bundle_file(artifact_bundle)
         except Exception as exc:
             logger.debug(
                 "Failed to load the artifact bundle for debug_id %s and source_file_type %s",
@@ -866,25 +1067,7 @@ class Fetcher:
 
             return None
         else:
-            archive = None
-
-            try:
-                # We load the entire bundle into an archive and cache it locally. It is very important that this opened
-                # archive is closed before the processing ends.
-                with sentry_sdk.start_span(op="Fetcher.fetch_by_debug_id.ArtifactBundleArchive"):
-                    archive = ArtifactBundleArchive(artifact_bundle_file)
-                    self.open_archives[artifact_bundle_id] = archive
-            except Exception as exc:
-                artifact_bundle_file.seek(0)
-                logger.debug(
-                    "Failed to initialize archive for the artifact bundle file",
-                    exc_info=exc,
-                    extra={"contents": base64.b64encode(artifact_bundle_file.read(256))},
-                )
-                if artifact_bundle_id:
-                    self.open_archives[artifact_bundle_id] = INVALID_ARCHIVE
-
-            return archive
+            return self._open_archive(artifact_bundle_id, artifact_bundle_file)
 
     def fetch_by_debug_id(self, debug_id, source_file_type):
         """
@@ -983,6 +1166,7 @@ class Fetcher:
         they will be resolved by files within the same archive.
         """
         artifact_bundle_files = []
+        opened_artifact_bundles = 0
         failed_artifact_bundle_ids = set()
 
         def file_by_url_candidates_lookup(open_archive):
@@ -1015,12 +1199,21 @@ class Fetcher:
                     return cached_open_archive
 
                 try:
+                    # Large bundles are served by the local disk cache.
+                    if ArtifactBundle.cache.should_cache(artifact_bundle):
+                        with sentry_sdk.start_span(
+                            op="Fetcher.fetch_by_url_new._open_cached_archive"
+                        ):
+                            self._open_cached_archive(artifact_bundle)
+                            opened_artifact_bundles += 1
+                        continue
+
                     # In case we didn't find the archive in the cache, we want to fetch the artifact bundle to put later
                     # in the cache.
                     with sentry_sdk.start_span(
                         op="Fetcher.fetch_by_url_new._fetch_artifact_bundle_file"
                     ):
-                        artifact_bundle_file = self._fetch_artifact_bundle_file(artifact_bundle)
+                        artifact_bundle_file = self._get_artifact_bundle_file(artifact_bundle)
                         artifact_bundle_files.append((artifact_bundle.id, artifact_bundle_file))
                 except Exception as exc:
                     logger.debug(
@@ -1030,7 +1223,11 @@ class Fetcher:
 
             # In case during the loading we ended up not being able to load anything and we got at least one error, we
             # can't do much.
-            if len(artifact_bundle_files) == 0 and len(failed_artifact_bundle_ids) > 0:
+            if (
+                len(artifact_bundle_files) == 0
+                and opened_artifact_bundles == 0
+                and len(failed_artifact_bundle_ids) > 0
+            ):
                 raise Exception(
                     "Failed to fetch at least one artifact bundle given a release/dist pair"
                 )
@@ -1050,19 +1247,7 @@ class Fetcher:
             return None
         else:
             for artifact_bundle_id, artifact_bundle_file in artifact_bundle_files:
-                try:
-                    with sentry_sdk.start_span(op="Fetcher.fetch_by_url_new.ArtifactBundleArchive"):
-                        archive = ArtifactBundleArchive(artifact_bundle_file)
-                        self.open_archives[artifact_bundle_id] = archive
-                except Exception as exc:
-                    artifact_bundle_file.seek(0)
-                    logger.debug(
-                        "Failed to initialize archive for the artifact bundle file",
-                        exc_info=exc,
-                        extra={"contents": base64.b64encode(artifact_bundle_file.read(256))},
-                    )
-                    if artifact_bundle_id:
-                        self.open_archives[artifact_bundle_id] = INVALID_ARCHIVE
+                self._open_archive(artifact_bundle_id, artifact_bundle_file)
 
             # After having loaded all the archives into memory, we want to look if we have the file again. Technically
             # we could recursively implement this behavior but that would require the usage of a discriminator variable
@@ -1990,7 +2175,7 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                     # We want to keep track of the sourcemap url of the sourcemap resolved with this specific debug id.
                     self.sourcemap_debug_id_to_sourcemap_url[debug_id] = result.url
                     # This is an expensive operation that should be executed as few times as possible.
-                    return SmCache.from_bytes(
+                    return parsed_sourcemap_cache.get_or_build(
                         minified_sourceview.get_source().encode("utf-8"), result.body
                     )
             except Exception as exc:
@@ -2093,7 +2278,7 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 op="JavaScriptStacktraceProcessor.fetch_sourcemap_view_by_url.SmCache.from_bytes"
             ):
                 # This is an expensive operation that should be executed as few times as possible.
-                return SmCache.from_bytes(source, body)
+                return parsed_sourcemap_cache.get_or_build(source, body)
         except Exception as exc:
             # This is in debug because the product shows an error already.
             logger.debug(str(exc), exc_info=True)
@@ -2120,6 +2305,26 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f["abs_path"])
 
+        prefetch_timeout = options.get("sourcemaps.artifact-bundles.prefetch-timeout")
+        if prefetch_timeout > 0:
+            with sentry_sdk.start_span(
+                op="JavaScriptStacktraceProcessor.populate_source_cache.prefetch_artifact_bundles"
+            ):
+                debug_ids = set()
+                urls = set()
+                for url in pending_file_list:
+                    debug_id = self.abs_path_debug_id.get(url)
+                    if debug_id is not None:
+                        debug_ids.add(debug_id)
+                    else:
+                        urls.add(url)
+                self.fetcher.prefetch_artifact_bundles(
+                    debug_ids,
+                    urls,
+                    timeout=prefetch_timeout,
+                    max_bundles=self.max_fetches - self.fetch_count,
+                )
+
         for idx, url in enumerate(pending_file_list):
             with sentry_sdk.start_span(
                 op="JavaScriptStacktraceProcessor.populate_source_cache.cache_source"
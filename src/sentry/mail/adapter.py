@@ -1,6 +1,8 @@
 import logging
-from collections import namedtuple
-from typing import Any, Mapping, Optional, Sequence
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Mapping, Optional, Sequence
 
 from sentry import digests
 from sentry.digests import Digest
@@ -23,6 +25,56 @@ logger = logging.getLogger(__name__)
 # TODO(mgaeta): This CANNOT be moved because of the way we inject mail adapters in plugins.
 RuleFuture = namedtuple("RuleFuture", ["rule", "kwargs"])
 
+PendingDigestAdd = namedtuple(
+    "PendingDigestAdd", ["key", "record", "increment_delay", "maximum_delay", "extra"]
+)
+
+_digest_batch = threading.local()
+
+
+@contextmanager
+def batch_digest_adds() -> Iterator[None]:
+    """
+    Collects the digest records added by `MailAdapter.rule_notify` within the
+    block and adds them with one pipelined `digests.add_multi` call per set of
+    delays once the block exits. Nested blocks are added by the outermost one.
+    """
+    if getattr(_digest_batch, "pending", None) is not None:
+        yield
+        return
+
+    _digest_batch.pending = []
+    try:
+        yield
+    finally:
+        pending = _digest_batch.pending
+        _digest_batch.pending = None
+        if pending:
+            _add_digest_records(pending)
+
+
+def _add_digest_records(pending: List[PendingDigestAdd]) -> None:
+    items_by_delays = defaultdict(list)
+    for item in pending:
+        items_by_delays[(item.increment_delay, item.maximum_delay)].append(item)
+
+    for (increment_delay, maximum_delay), items in items_by_delays.items():
+        try:
+            results = digests.add_multi(
+                [(item.key, item.record) for item in items],
+                increment_delay=increment_delay,
+                maximum_delay=maximum_delay,
+            )
+        except Exception:
+            logger.exception("mail.adapter.digest_add_failed")
+            continue
+
+        for item, immediate_delivery in zip(items, results):
+            if immediate_delivery:
+                deliver_digest.delay(item.key)
+            log_event = "dispatched" if immediate_delivery else "digested"
+            logger.info("mail.adapter.notification.%s" % log_event, extra=item.extra)
+
 
 class MailAdapter:
     """
@@ -73,11 +125,23 @@ class MailAdapter:
                 event.group.project, target_type, target_identifier, fallthrough_choice
             )
             extra["digest_key"] = digest_key
+            record = event_to_record(event, rules)
+            increment_delay = get_digest_option("increment_delay")
+            maximum_delay = get_digest_option("maximum_delay")
+
+            pending = getattr(_digest_batch, "pending", None)
+            if pending is not None:
+                # The record is added and logged when the batch exits.
+                pending.append(
+                    PendingDigestAdd(digest_key, record, increment_delay, maximum_delay, extra)
+                )
+                return
+
             immediate_delivery = digests.add(
                 digest_key,
-                event_to_record(event, rules),
-                increment_delay=get_digest_option("increment_delay"),
-                maximum_delay=get_digest_option("maximum_delay"),
+                record,
+                increment_delay=increment_delay,
+                maximum_delay=maximum_delay,
             )
             if immediate_delivery:
                 deliver_digest.delay(digest_key)
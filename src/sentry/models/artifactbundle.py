@@ -1,12 +1,19 @@
+import mmap
+import os
+import struct
+import tempfile
 import zipfile
+import zlib
 from enum import Enum
-from typing import IO, Callable, Dict, List, Optional, Tuple
+from io import BytesIO
+from typing import IO, Callable, Dict, List, Optional, Tuple, Union
 
 from django.db import models
 from django.db.models.signals import post_delete
 from django.utils import timezone
 from symbolic import SymbolicError, normalize_debug_id
 
+from sentry import options
 from sentry.db.models import (
     BoundedBigIntegerField,
     BoundedPositiveIntegerField,
@@ -14,7 +21,8 @@ from sentry.db.models import (
     Model,
     region_silo_only_model,
 )
-from sentry.utils import json
+from sentry.models.files.utils import clear_cached_files
+from sentry.utils import json, metrics
 from sentry.utils.hashlib import sha1_text
 
 NULL_UUID = "00000000-00000000-00000000-00000000"
@@ -279,3 +287,243 @@ class ArtifactBundleArchive:
         files = self.manifest.get("files", {})
         file_info = files.get(file_path, {})
         return file_info.get("url")
+
+
+# Version of the on-disk index of cached artifact bundles, indexes with another version are rebuilt.
+ARTIFACT_BUNDLE_INDEX_VERSION = 1
+
+# Compression methods of artifacts that can be read straight from the memory map.
+MAPPABLE_COMPRESS_TYPES = (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+
+def _get_debug_id_key(debug_id: str, source_file_type: SourceFileType) -> str:
+    return f"{debug_id}/{source_file_type.value}"
+
+
+def build_artifact_bundle_index(path: str) -> Optional[dict]:
+    """
+    Builds an index of the location of each artifact within the .zip file at ``path``.
+
+    Returns ``None`` if any of the artifacts can't be read from a memory map.
+    """
+    with open(path, "rb") as fp:
+        archive = ArtifactBundleArchive(fp)
+        try:
+            files = {}
+            for file_path, info in archive.manifest.get("files", {}).items():
+                zip_info = archive.info(file_path)
+                if (
+                    zip_info.compress_type not in MAPPABLE_COMPRESS_TYPES
+                    or zip_info.flag_bits & 0x1
+                ):
+                    return None
+
+                # The central directory only points to the local file header, whose variable length fields are not
+                # necessarily the same as the ones in the central directory.
+                fp.seek(zip_info.header_offset)
+                header = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+                offset = (
+                    zip_info.header_offset
+                    + zipfile.sizeFileHeader
+                    + header[zipfile._FH_FILENAME_LENGTH]
+                    + header[zipfile._FH_EXTRA_FIELD_LENGTH]
+                )
+                files[file_path] = {
+                    "offset": offset,
+                    "size": zip_info.compress_size,
+                    "compress_type": zip_info.compress_type,
+                    "url": info.get("url"),
+                    "headers": info.get("headers", {}),
+                }
+
+            urls = {url: file_path for url, (file_path, _) in archive._entries_by_url.items()}
+            debug_ids = {}
+            for (debug_id, source_file_type), entry in archive._entries_by_debug_id.items():
+                debug_ids[_get_debug_id_key(debug_id, source_file_type)] = entry[0]
+        finally:
+            archive.close()
+
+    return {
+        "version": ARTIFACT_BUNDLE_INDEX_VERSION,
+        "files": files,
+        "urls": urls,
+        "debug_ids": debug_ids,
+    }
+
+
+class MappedArtifactBundleArchive:
+    """
+    Read-only view of an artifact bundle cached on local disk.
+
+    Individual artifacts are read straight from a memory map of the .zip file using a prebuilt index of their
+    locations, so neither the manifest nor the central directory have to be parsed again.
+    """
+
+    def __init__(self, path: str, index: dict):
+        self._fileobj = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._fileobj.close()
+            raise
+        self._files = index["files"]
+        self._urls = index["urls"]
+        self._debug_ids = index["debug_ids"]
+
+    def close(self):
+        self._mmap.close()
+        self._fileobj.close()
+
+    def read(self, file_path: str) -> bytes:
+        entry = self._files[file_path]
+        offset = entry["offset"]
+        data = self._mmap[offset : offset + entry["size"]]
+        if entry["compress_type"] == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+        return data
+
+    def get_file_by_url(self, url: str) -> Tuple[IO, dict]:
+        file_path = self._urls[url]
+        return BytesIO(self.read(file_path)), self._files[file_path]["headers"]
+
+    def get_file_by_debug_id(
+        self, debug_id: str, source_file_type: SourceFileType
+    ) -> Tuple[IO, dict]:
+        file_path = self._debug_ids[_get_debug_id_key(debug_id, source_file_type)]
+        return BytesIO(self.read(file_path)), self._files[file_path]["headers"]
+
+    def get_file_url_by_debug_id(
+        self, debug_id: str, source_file_type: SourceFileType
+    ) -> Optional[str]:
+        file_path = self._debug_ids.get(_get_debug_id_key(debug_id, source_file_type))
+        if file_path is not None:
+            return self._files[file_path]["url"]
+
+        return None
+
+
+class ArtifactBundleFileCache:
+    """
+    Keeps the .zip files of large artifact bundles on local disk, together with an index of their artifacts.
+
+    Once the cache grows beyond ``artifactbundle.cache-max-size`` bytes, the least recently used bundles are evicted.
+    """
+
+    @property
+    def cache_path(self) -> str:
+        return options.get("artifactbundle.cache-path")
+
+    def should_cache(self, artifact_bundle: ArtifactBundle) -> bool:
+        return artifact_bundle.file.size >= options.get("artifactbundle.cache-limit")
+
+    def _get_paths(self, artifact_bundle: ArtifactBundle) -> Tuple[str, str]:
+        base = os.path.join(self.cache_path, str(artifact_bundle.organization_id))
+        file_id = str(artifact_bundle.file_id)
+        return os.path.join(base, f"{file_id}.zip"), os.path.join(base, f"{file_id}.index")
+
+    def get_archive(
+        self, artifact_bundle: ArtifactBundle
+    ) -> Union[MappedArtifactBundleArchive, ArtifactBundleArchive]:
+        """
+        Returns an archive of the bundle, downloading it into the cache first if necessary.
+
+        The caller is responsible for closing the archive.
+        """
+        zip_path, index_path = self._get_paths(artifact_bundle)
+
+        hit = True
+        try:
+            # The modification time is used to keep track of the least recently used bundles.
+            os.utime(zip_path)
+        except FileNotFoundError:
+            artifact_bundle.file.save_to(zip_path)
+            hit = False
+
+        metrics.timing(
+            "artifact_bundle.cache.get.size", artifact_bundle.file.size, tags={"hit": hit}
+        )
+
+        index = self._get_index(zip_path, index_path)
+        if not hit:
+            self.evict(keep=zip_path)
+
+        if index is None:
+            return ArtifactBundleArchive(open(zip_path, "rb"))
+
+        return MappedArtifactBundleArchive(zip_path, index)
+
+    def _get_index(self, zip_path: str, index_path: str) -> Optional[dict]:
+        try:
+            with open(index_path, "rb") as f:
+                index = json.loads(f.read())
+        except (OSError, ValueError):
+            pass
+        else:
+            if index.get("version") == ARTIFACT_BUNDLE_INDEX_VERSION:
+                os.utime(index_path)
+                return index
+
+        index = build_artifact_bundle_index(zip_path)
+        if index is not None:
+            # Write the index atomically, as other processes might be reading it concurrently.
+            with tempfile.NamedTemporaryFile(
+                "wb", dir=os.path.dirname(index_path), delete=False
+            ) as f:
+                f.write(json.dumps(index).encode("utf-8"))
+            os.replace(f.name, index_path)
+
+        return index
+
+    def _list_entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        try:
+            cache_folders = os.listdir(self.cache_path)
+        except OSError:
+            return entries
+
+        for cache_folder in cache_folders:
+            cache_folder = os.path.join(self.cache_path, cache_folder)
+            try:
+                items = os.listdir(cache_folder)
+            except OSError:
+                continue
+            for item in items:
+                if not item.endswith(".zip"):
+                    continue
+                zip_path = os.path.join(cache_folder, item)
+                try:
+                    stat = os.stat(zip_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, zip_path))
+
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Removes the least recently used bundles until the cache fits into ``artifactbundle.cache-max-size``.
+        """
+        max_size = options.get("artifactbundle.cache-max-size")
+        entries = self._list_entries()
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, zip_path in sorted(entries):
+            if total_size <= max_size:
+                break
+            if zip_path == keep:
+                continue
+
+            for path in (zip_path, zip_path[: -len(".zip")] + ".index"):
+                try:
+                    # Archives that are still open keep working, as the memory map holds on to the file.
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
+            metrics.incr("artifact_bundle.cache.evicted")
+
+    def clear_old_entries(self) -> None:
+        clear_cached_files(self.cache_path)
+
+
+ArtifactBundle.cache = ArtifactBundleFileCache()
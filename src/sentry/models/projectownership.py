@@ -11,7 +11,8 @@ from sentry.db.models.fields import FlexibleForeignKey, JSONField
 from sentry.models import Activity, ActorTuple
 from sentry.models.groupowner import OwnerRuleType
 from sentry.models.project import Project
-from sentry.ownership.grammar import Rule, load_schema, resolve_actors
+from sentry.ownership.compiled import CompiledOwnership, OwnershipEventData, get_compiled_ownership
+from sentry.ownership.grammar import Rule, resolve_actors
 from sentry.types.activity import ActivityType
 from sentry.utils import metrics
 from sentry.utils.cache import cache
@@ -93,6 +94,15 @@ class ProjectOwnership(Model):
             cache.set(cache_key, ownership, READ_CACHE_DURATION)
         return ownership or None
 
+    @classmethod
+    def get_compiled_schema_cached(cls, schema: Mapping[str, Any]) -> CompiledOwnership:
+        """
+        Process-wide cached access to the compiled rules of an ownership (or
+        CODEOWNERS) schema, keyed by the content of the schema so that edits
+        invalidate it.
+        """
+        return get_compiled_ownership(schema)
+
     @classmethod
     def get_owners(
         cls, project_id: int, data: Mapping[str, Any]
@@ -193,8 +203,11 @@ class ProjectOwnership(Model):
             if not ownership:
                 ownership = cls(project_id=project_id)
 
-            ownership_rules = cls._matching_ownership_rules(ownership, data)
-            codeowners_rules = cls._matching_ownership_rules(codeowners, data) if codeowners else []
+            event_data = OwnershipEventData(data)
+            ownership_rules = cls._matching_ownership_rules(ownership, data, event_data)
+            codeowners_rules = (
+                cls._matching_ownership_rules(codeowners, data, event_data) if codeowners else []
+            )
 
             if not (codeowners_rules or ownership_rules):
                 return []
@@ -342,15 +355,15 @@ class ProjectOwnership(Model):
         cls,
         ownership: Union["ProjectOwnership", "ProjectCodeOwners"],
         data: Mapping[str, Any],
+        event_data: Optional[OwnershipEventData] = None,
     ) -> Sequence["Rule"]:
-        rules = []
+        if ownership.schema is None:
+            return []
 
-        if ownership.schema is not None:
-            for rule in load_schema(ownership.schema):
-                if rule.test(data):
-                    rules.append(rule)
+        if event_data is None:
+            event_data = OwnershipEventData(data)
 
-        return rules
+        return cls.get_compiled_schema_cached(ownership.schema).get_matching_rules(event_data)
 
 
 def process_resource_change(instance, change, **kwargs):
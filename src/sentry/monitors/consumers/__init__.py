@@ -21,6 +21,8 @@ def get_monitor_check_ins_consumer(
     strict_offset_reset: bool,
     force_topic: str | None,
     force_cluster: str | None,
+    max_batch_size: int,
+    max_batch_time: int,
 ) -> StreamProcessor[KafkaPayload]:
     topic = force_topic or topic
     consumer_config = get_config(
@@ -34,7 +36,11 @@ def get_monitor_check_ins_consumer(
     return StreamProcessor(
         consumer=consumer,
         topic=Topic(topic),
-        processor_factory=StoreMonitorCheckInStrategyFactory(),
+        processor_factory=StoreMonitorCheckInStrategyFactory(
+            max_batch_size=max_batch_size,
+            # The batch time is given in milliseconds.
+            max_batch_time=max_batch_time / 1000.0,
+        ),
         commit_policy=ONCE_PER_SECOND,
     )
 
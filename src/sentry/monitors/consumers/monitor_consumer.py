@@ -1,13 +1,18 @@
 import datetime
 import logging
-from typing import Dict, Mapping, Optional
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
 
 import msgpack
 from arroyo.backends.kafka.consumer import KafkaPayload
 from arroyo.processing.strategies.abstract import ProcessingStrategy, ProcessingStrategyFactory
 from arroyo.processing.strategies.commit import CommitOffsets
+from arroyo.processing.strategies.reduce import Reduce
 from arroyo.processing.strategies.run_task import RunTask
-from arroyo.types import Commit, Message, Partition
+from arroyo.types import BaseValue, Commit, Message, Partition
 from django.db import transaction
 
 from sentry import ratelimits
@@ -27,12 +32,27 @@ from sentry.monitors.utils import signal_first_checkin, signal_first_monitor_cre
 from sentry.monitors.validators import ConfigValidator
 from sentry.utils import json, metrics
 from sentry.utils.dates import to_datetime
+from sentry.utils.hashlib import md5_text
 
 logger = logging.getLogger(__name__)
 
 CHECKIN_QUOTA_LIMIT = 5
 CHECKIN_QUOTA_WINDOW = 60
 
+DEFAULT_MAX_BATCH_SIZE = 100
+DEFAULT_MAX_BATCH_TIME = 1.0
+
+# Monitors are looked up once per monitor environment and batch. Between
+# batches they are cached for this many seconds, for up to this many
+# monitor environments.
+MONITOR_CACHE_TTL = 60
+MONITOR_CACHE_SIZE = 10000
+
+# A monitor environment and the status updates of its check-ins in a batch.
+_MonitorEnvironmentUpdate = Tuple[
+    Monitor, MonitorEnvironment, List[Tuple[int, datetime.datetime, MonitorCheckIn]]
+]
+
 
 def _ensure_monitor_with_config(
     project: Project,
@@ -90,196 +110,520 @@ def valid_duration(duration: Optional[int]) -> bool:
     return True
 
 
-def _process_message(wrapper: Dict) -> None:
-    # TODO: validate payload schema
-    params = json.loads(wrapper["payload"])
-    start_time = to_datetime(float(wrapper["start_time"]))
-    project_id = int(wrapper["project_id"])
-    source_sdk = wrapper["sdk"]
-
-    environment = params.get("environment")
-    project = Project.objects.get_from_cache(id=project_id)
+@dataclass
+class _CheckInMessage:
+    params: Dict[str, Any]
+    start_time: datetime.datetime
+    project: Project
+    metric_kwargs: Dict[str, str]
+
+    @property
+    def group_key(self) -> Tuple[int, str, Optional[str]]:
+        return self.project.id, self.params["monitor_slug"], self.params.get("environment")
+
+
+class MonitorCache:
+    """
+    Caches the monitor and the id of the monitor environment that check-ins
+    of a monitor slug and environment are stored with, for up to ``ttl``
+    seconds. Check-ins that upsert monitors are cached per config, so changed
+    configs are still applied.
+    """
+
+    def __init__(self, ttl: int = MONITOR_CACHE_TTL, max_size: int = MONITOR_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[Tuple[Any, ...], Tuple[float, Monitor, int]] = OrderedDict()
+
+    def _get_key(
+        self, group_key: Tuple[int, str, Optional[str]], config: Optional[Dict]
+    ) -> Tuple[Any, ...]:
+        config_hash = md5_text(json.dumps(config)).hexdigest() if config else None
+        return (*group_key, config_hash)
+
+    def get(
+        self, group_key: Tuple[int, str, Optional[str]], config: Optional[Dict]
+    ) -> Optional[Tuple[Monitor, int]]:
+        key = self._get_key(group_key, config)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, monitor, monitor_environment_id = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        return monitor, monitor_environment_id
+
+    def set(
+        self,
+        group_key: Tuple[int, str, Optional[str]],
+        config: Optional[Dict],
+        monitor: Monitor,
+        monitor_environment: MonitorEnvironment,
+    ) -> None:
+        key = self._get_key(group_key, config)
+        self._entries[key] = (time.time() + self.ttl, monitor, monitor_environment.id)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, group_key: Tuple[int, str, Optional[str]]) -> None:
+        for key in [key for key in self._entries if key[:3] == group_key]:
+            del self._entries[key]
+
+
+def _get_monitor_config(messages: Sequence[_CheckInMessage]) -> Optional[Dict]:
+    # The most recent config of the monitor wins.
+    for message in reversed(messages):
+        if message.params.get("monitor_config"):
+            return message.params["monitor_config"]
+    return None
+
+
+def _load_cached_monitors(
+    groups: Mapping[Tuple[int, str, Optional[str]], List[_CheckInMessage]],
+    monitor_cache: MonitorCache,
+) -> Dict[Tuple[int, str, Optional[str]], Tuple[Monitor, MonitorEnvironment]]:
+    """
+    Returns the monitors and monitor environments of the groups found in the
+    cache. Monitor environments are always loaded from the database, with one
+    query for the whole batch, since their last check-in is needed.
+    """
+    cached = {}
+    for group_key, messages in groups.items():
+        entry = monitor_cache.get(group_key, _get_monitor_config(messages))
+        if entry is not None:
+            cached[group_key] = entry
+
+    if not cached:
+        return {}
+
+    monitor_environments = MonitorEnvironment.objects.in_bulk(
+        [monitor_environment_id for _, monitor_environment_id in cached.values()]
+    )
+
+    rv = {}
+    for group_key, (monitor, monitor_environment_id) in cached.items():
+        monitor_environment = monitor_environments.get(monitor_environment_id)
+        if monitor_environment is None:
+            monitor_cache.delete(group_key)
+            continue
+        monitor_environment.monitor = monitor
+        rv[group_key] = monitor, monitor_environment
+
+    metrics.incr("monitors.checkin.monitor_cache.hit", amount=len(rv))
+    return rv
+
+
+def _get_monitor(
+    messages: Sequence[_CheckInMessage],
+) -> Optional[Tuple[Monitor, MonitorEnvironment]]:
+    message = messages[0]
+    project = message.project
+    monitor_slug = message.params["monitor_slug"]
 
-    ratelimit_key = f"{params['monitor_slug']}:{environment}"
+    try:
+        monitor = _ensure_monitor_with_config(project, monitor_slug, _get_monitor_config(messages))
 
-    metric_kwargs = {
-        "source": "consumer",
-        "source_sdk": source_sdk,
-    }
+        if not monitor:
+            for message in messages:
+                metrics.incr(
+                    "monitors.checkin.result",
+                    tags={"source": "consumer", "status": "failed_validation"},
+                )
+                logger.info("monitor.validation.failed", extra={**message.params})
+            return None
+    except MonitorLimitsExceeded:
+        for message in messages:
+            metrics.incr(
+                "monitors.checkin.result",
+                tags={**message.metric_kwargs, "status": "failed_monitor_limits"},
+            )
+        logger.debug("monitor exceeds limits for organization: %s", project.organization_id)
+        return None
 
-    if ratelimits.is_limited(
-        f"monitor-checkins:{ratelimit_key}",
-        limit=CHECKIN_QUOTA_LIMIT,
-        window=CHECKIN_QUOTA_WINDOW,
-    ):
-        metrics.incr(
-            "monitors.checkin.dropped.ratelimited",
-            tags={**metric_kwargs},
+    try:
+        monitor_environment = MonitorEnvironment.objects.ensure_environment(
+            project, monitor, message.params.get("environment")
+        )
+    except MonitorEnvironmentLimitsExceeded:
+        for message in messages:
+            metrics.incr(
+                "monitors.checkin.result",
+                tags={"source": "consumer", "status": "failed_monitor_environment_limits"},
+            )
+        logger.debug("monitor environment exceeds limits for monitor: %s", monitor_slug)
+        return None
+
+    return monitor, monitor_environment
+
+
+def _process_check_ins(
+    messages: Sequence[_CheckInMessage],
+    monitor: Monitor,
+    monitor_environment: MonitorEnvironment,
+    existing_check_ins: Mapping[UUID, MonitorCheckIn],
+    new_check_ins: Dict[UUID, MonitorCheckIn],
+    completed: List[_CheckInMessage],
+) -> List[Tuple[int, datetime.datetime, MonitorCheckIn]]:
+    """
+    Creates or updates the check-ins of a monitor environment in order. New
+    check-ins are added to ``new_check_ins`` to be inserted with the rest of
+    the batch, and messages that were stored are added to ``completed``.
+    Returns the status updates of the monitor environment.
+    """
+    status_updates = []
+    monitor_config = monitor.get_validated_config()
+
+    for message in messages:
+        params = message.params
+        start_time = message.start_time
+        metric_kwargs = message.metric_kwargs
+
+        status = getattr(CheckInStatus, params["status"].upper())
+        duration = (
+            # Duration is specified in seconds from the client, it is
+            # stored in the checkin model as milliseconds
+            int(params["duration"] * 1000)
+            if params.get("duration") is not None
+            else None
         )
-        logger.debug("monitor check in rate limited: %s", params["monitor_slug"])
-        return
 
-    try:
-        with transaction.atomic():
-            monitor_config = params.get("monitor_config")
-            try:
-                monitor = _ensure_monitor_with_config(
-                    project, params["monitor_slug"], monitor_config
-                )
+        guid = UUID(params["check_in_id"])
+        check_in = existing_check_ins.get(guid) or new_check_ins.get(guid)
 
-                if not monitor:
-                    metrics.incr(
-                        "monitors.checkin.result",
-                        tags={"source": "consumer", "status": "failed_validation"},
-                    )
-                    logger.info("monitor.validation.failed", extra={**params})
-                    return
-            except MonitorLimitsExceeded:
+        if check_in is not None:
+            if (
+                check_in.project_id != message.project.id
+                or check_in.monitor_id != monitor.id
+                or check_in.monitor_environment_id != monitor_environment.id
+            ):
                 metrics.incr(
                     "monitors.checkin.result",
-                    tags={**metric_kwargs, "status": "failed_monitor_limits"},
+                    tags={"source": "consumer", "status": "guid_mismatch"},
                 )
-                logger.debug("monitor exceeds limits for organization: %s", project.organization_id)
-                return
-
-            try:
-                monitor_environment = MonitorEnvironment.objects.ensure_environment(
-                    project, monitor, environment
+                logger.debug(
+                    "check-in guid %s already associated with %s not payload %s",
+                    params["check_in_id"],
+                    check_in.monitor_id,
+                    monitor.id,
                 )
-            except MonitorEnvironmentLimitsExceeded:
+                continue
+
+            if check_in.status in CheckInStatus.FINISHED_VALUES:
                 metrics.incr(
                     "monitors.checkin.result",
-                    tags={"source": "consumer", "status": "failed_monitor_environment_limits"},
+                    tags={"source": "consumer", "status": "checkin_finished"},
                 )
                 logger.debug(
-                    "monitor environment exceeds limits for monitor: %s", params["monitor_slug"]
+                    "check-in was finished: attempted update from %s to %s",
+                    check_in.status,
+                    status,
                 )
-                return
-
-            status = getattr(CheckInStatus, params["status"].upper())
-            duration = (
-                # Duration is specified in seconds from the client, it is
-                # stored in the checkin model as milliseconds
-                int(params["duration"] * 1000)
-                if params.get("duration") is not None
-                else None
-            )
+                continue
 
-            try:
-                check_in = MonitorCheckIn.objects.select_for_update().get(
-                    guid=params["check_in_id"],
-                )
+            if duration is None:
+                duration = int((start_time - check_in.date_added).total_seconds() * 1000)
 
-                if (
-                    check_in.project_id != project_id
-                    or check_in.monitor_id != monitor.id
-                    or check_in.monitor_environment_id != monitor_environment.id
-                ):
-                    metrics.incr(
-                        "monitors.checkin.result",
-                        tags={"source": "consumer", "status": "guid_mismatch"},
-                    )
-                    logger.debug(
-                        "check-in guid %s already associated with %s not payload %s",
-                        params["check_in_id"],
-                        check_in.monitor_id,
-                        monitor.id,
-                    )
-                    return
-
-                if check_in.status in CheckInStatus.FINISHED_VALUES:
-                    metrics.incr(
-                        "monitors.checkin.result",
-                        tags={"source": "consumer", "status": "checkin_finished"},
-                    )
-                    logger.debug(
-                        "check-in was finished: attempted update from %s to %s",
-                        check_in.status,
-                        status,
-                    )
-                    return
-
-                if duration is None:
-                    duration = int((start_time - check_in.date_added).total_seconds() * 1000)
-
-                if not valid_duration(duration):
-                    metrics.incr(
-                        "monitors.checkin.result",
-                        tags={**metric_kwargs, "status": "failed_duration_check"},
-                    )
-                    logger.debug("check-in duration is invalid: %s", project.organization_id)
-                    return
+            if not valid_duration(duration):
+                metrics.incr(
+                    "monitors.checkin.result",
+                    tags={**metric_kwargs, "status": "failed_duration_check"},
+                )
+                logger.debug("check-in duration is invalid: %s", message.project.organization_id)
+                continue
 
+            if check_in.id:
                 check_in.update(status=status, duration=duration)
+            else:
+                check_in.status = status
+                check_in.duration = duration
+        else:
+            # Infer the original start time of the check-in from the duration.
+            # Note that the clock of this worker may be off from what Relay is reporting.
+            date_added = start_time
+            if duration is not None:
+                date_added -= datetime.timedelta(milliseconds=duration)
+
+            if not valid_duration(duration):
+                metrics.incr(
+                    "monitors.checkin.result",
+                    tags={**metric_kwargs, "status": "failed_duration_check"},
+                )
+                logger.debug("check-in duration is invalid: %s", message.project.organization_id)
+                continue
 
-            except MonitorCheckIn.DoesNotExist:
-                # Infer the original start time of the check-in from the duration.
-                # Note that the clock of this worker may be off from what Relay is reporting.
-                date_added = start_time
-                if duration is not None:
-                    date_added -= datetime.timedelta(milliseconds=duration)
-
-                if not valid_duration(duration):
-                    metrics.incr(
-                        "monitors.checkin.result",
-                        tags={**metric_kwargs, "status": "failed_duration_check"},
-                    )
-                    logger.debug("check-in duration is invalid: %s", project.organization_id)
-                    return
-
-                expected_time = None
-                if monitor_environment.last_checkin:
-                    expected_time = monitor.get_next_scheduled_checkin_without_margin(
-                        monitor_environment.last_checkin
-                    )
-
-                check_in = MonitorCheckIn.objects.create(
-                    project_id=project_id,
-                    monitor=monitor,
-                    monitor_environment=monitor_environment,
-                    guid=params["check_in_id"],
-                    duration=duration,
-                    status=status,
-                    date_added=date_added,
-                    date_updated=start_time,
-                    expected_time=expected_time,
-                    monitor_config=monitor.get_validated_config(),
+            expected_time = None
+            if monitor_environment.last_checkin:
+                expected_time = monitor.get_next_scheduled_checkin_without_margin(
+                    monitor_environment.last_checkin
                 )
 
-                signal_first_checkin(project, monitor)
+            check_in = MonitorCheckIn(
+                project_id=message.project.id,
+                monitor=monitor,
+                monitor_environment=monitor_environment,
+                guid=guid,
+                duration=duration,
+                status=status,
+                date_added=date_added,
+                date_updated=start_time,
+                expected_time=expected_time,
+                monitor_config=monitor_config,
+            )
+            new_check_ins[guid] = check_in
+
+        status_updates.append((check_in.status, start_time, check_in))
+
+        # Mirror the update of the monitor environment, which is only written
+        # once the batch is processed, for the expected time of later check-ins.
+        if (
+            monitor_environment.last_checkin is None
+            or monitor_environment.last_checkin <= start_time
+        ):
+            monitor_environment.last_checkin = start_time
+
+        completed.append(message)
+
+    return status_updates
+
+
+def _update_monitor_environment(
+    monitor: Monitor,
+    monitor_environment: MonitorEnvironment,
+    status_updates: Sequence[Tuple[int, datetime.datetime, MonitorCheckIn]],
+) -> None:
+    """
+    Applies the status updates of a monitor environment in order. Failures
+    are applied one by one, since every failure creates an event, while
+    consecutive successful check-ins are collapsed into a single update.
+    """
+    pending_ok: List[Tuple[int, datetime.datetime, MonitorCheckIn]] = []
+
+    def flush_ok() -> None:
+        if not pending_ok:
+            return
+        # Check-ins that are OK set the status of the monitor environment,
+        # so prefer them over in-progress check-ins.
+        ok_updates = [update for update in pending_ok if update[0] == CheckInStatus.OK]
+        _, _, check_in = (ok_updates or pending_ok)[-1]
+        monitor_environment.mark_ok(check_in, max(ts for _, ts, _ in pending_ok))
+        del pending_ok[:]
+
+    for status, ts, check_in in status_updates:
+        if status == CheckInStatus.ERROR and monitor.status != ObjectStatus.DISABLED:
+            flush_ok()
+            monitor_environment.mark_failed(ts)
+        else:
+            pending_ok.append((status, ts, check_in))
+
+    flush_ok()
+
+
+def _process_groups(
+    groups: Mapping[Tuple[int, str, Optional[str]], List[_CheckInMessage]],
+    monitor_cache: Optional[MonitorCache],
+) -> Tuple[List[_CheckInMessage], List[MonitorCheckIn], List[_MonitorEnvironmentUpdate]]:
+    """
+    Stores the check-ins of the groups. Returns the messages that were stored,
+    the first new check-in of every monitor and the status updates of the
+    monitor environments, which are applied with `_apply_updates` once the
+    check-ins are committed.
+    """
+    monitors = _load_cached_monitors(groups, monitor_cache) if monitor_cache else {}
+
+    guids = {
+        UUID(message.params["check_in_id"]) for messages in groups.values() for message in messages
+    }
+    existing_check_ins = {
+        UUID(str(check_in.guid)): check_in
+        for check_in in MonitorCheckIn.objects.select_for_update().filter(guid__in=guids)
+    }
+    new_check_ins: Dict[UUID, MonitorCheckIn] = {}
+    completed: List[_CheckInMessage] = []
+
+    updates: List[_MonitorEnvironmentUpdate] = []
+    for group_key, messages in groups.items():
+        if group_key not in monitors:
+            resolved = _get_monitor(messages)
+            if resolved is None:
+                continue
+            monitors[group_key] = resolved
+            if monitor_cache is not None:
+                monitor_cache.set(group_key, _get_monitor_config(messages), *resolved)
+
+        monitor, monitor_environment = monitors[group_key]
+        status_updates = _process_check_ins(
+            messages, monitor, monitor_environment, existing_check_ins, new_check_ins, completed
+        )
+        updates.append((monitor, monitor_environment, status_updates))
+
+    first_check_ins: Dict[Tuple[int, int], MonitorCheckIn] = {}
+    if new_check_ins:
+        MonitorCheckIn.objects.bulk_create(new_check_ins.values())
+        for check_in in new_check_ins.values():
+            first_check_ins.setdefault((check_in.project_id, check_in.monitor_id), check_in)
+
+    return completed, list(first_check_ins.values()), updates
+
+
+def _apply_updates(
+    first_check_ins: Sequence[MonitorCheckIn], updates: Sequence[_MonitorEnvironmentUpdate]
+) -> None:
+    """
+    Signals the first check-ins and applies the status updates of the monitor
+    environments. Failures create events and alerts, so this runs after the
+    check-ins are committed and is never retried with the batch.
+    """
+    for check_in in first_check_ins:
+        try:
+            signal_first_checkin(
+                Project.objects.get_from_cache(id=check_in.project_id), check_in.monitor
+            )
+        except Exception:
+            logger.exception("Failed to signal first check-in")
+
+    for monitor, monitor_environment, status_updates in updates:
+        try:
+            _update_monitor_environment(monitor, monitor_environment, status_updates)
+        except Exception:
+            logger.exception("Failed to update monitor environment")
 
-            if check_in.status == CheckInStatus.ERROR and monitor.status != ObjectStatus.DISABLED:
-                monitor_environment.mark_failed(start_time)
-            else:
-                monitor_environment.mark_ok(check_in, start_time)
 
+def _record_completed(messages: Sequence[_CheckInMessage]) -> None:
+    for message in messages:
+        metrics.incr(
+            "monitors.checkin.result",
+            tags={**message.metric_kwargs, "status": "complete"},
+        )
+
+
+def _process_batch(wrappers: Sequence[Dict], monitor_cache: Optional[MonitorCache] = None) -> None:
+    """
+    Stores a batch of check-ins. Check-ins of the same monitor environment
+    are processed in order with one lookup of the monitor, and all new
+    check-ins of the batch are inserted at once.
+    """
+    groups: Dict[Tuple[int, str, Optional[str]], List[_CheckInMessage]] = {}
+
+    for wrapper in wrappers:
+        # TODO: validate payload schema
+        try:
+            params = json.loads(wrapper["payload"])
+            start_time = to_datetime(float(wrapper["start_time"]))
+            project_id = int(wrapper["project_id"])
+            source_sdk = wrapper["sdk"]
+            project = Project.objects.get_from_cache(id=project_id)
+
+            environment = params.get("environment")
+            ratelimit_key = f"{params['monitor_slug']}:{environment}"
+        except Exception:
+            logger.exception("Failed to process message payload")
+            continue
+
+        metric_kwargs = {
+            "source": "consumer",
+            "source_sdk": source_sdk,
+        }
+
+        if ratelimits.is_limited(
+            f"monitor-checkins:{ratelimit_key}",
+            limit=CHECKIN_QUOTA_LIMIT,
+            window=CHECKIN_QUOTA_WINDOW,
+        ):
             metrics.incr(
-                "monitors.checkin.result",
-                tags={**metric_kwargs, "status": "complete"},
+                "monitors.checkin.dropped.ratelimited",
+                tags={**metric_kwargs},
             )
+            logger.debug("monitor check in rate limited: %s", params["monitor_slug"])
+            continue
+
+        message = _CheckInMessage(params, start_time, project, metric_kwargs)
+        groups.setdefault(message.group_key, []).append(message)
+
+    if not groups:
+        return
+
+    try:
+        with transaction.atomic():
+            completed, first_check_ins, updates = _process_groups(groups, monitor_cache)
     except Exception:
-        # Skip this message and continue processing in the consumer.
+        logger.exception("Failed to process check-in batch", exc_info=True)
+        if monitor_cache is not None:
+            for group_key in groups:
+                monitor_cache.delete(group_key)
+    else:
+        _apply_updates(first_check_ins, updates)
+        _record_completed(completed)
+        return
+
+    # Retry the check-ins one by one, so that a check-in that can't be stored
+    # doesn't drop the rest of the batch.
+    messages = [message for group in groups.values() for message in group]
+    if len(messages) == 1:
         metrics.incr(
             "monitors.checkin.result",
-            tags={**metric_kwargs, "status": "error"},
+            tags={**messages[0].metric_kwargs, "status": "error"},
         )
-        logger.exception("Failed to process check-in", exc_info=True)
+        return
+
+    for message in messages:
+        try:
+            with transaction.atomic():
+                completed, first_check_ins, updates = _process_groups(
+                    {message.group_key: [message]}, None
+                )
+        except Exception:
+            # Skip this message and continue processing in the consumer.
+            metrics.incr(
+                "monitors.checkin.result",
+                tags={**message.metric_kwargs, "status": "error"},
+            )
+            logger.exception("Failed to process check-in", exc_info=True)
+        else:
+            _apply_updates(first_check_ins, updates)
+            _record_completed(completed)
+
+
+def _process_message(wrapper: Dict) -> None:
+    _process_batch([wrapper])
 
 
 class StoreMonitorCheckInStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
+    def __init__(
+        self,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_batch_time: float = DEFAULT_MAX_BATCH_TIME,
+    ) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_batch_time = max_batch_time
+        # Kept for the lifetime of the consumer, across rebalances.
+        self.monitor_cache = MonitorCache()
+
     def create_with_partitions(
         self,
         commit: Commit,
         partitions: Mapping[Partition, int],
     ) -> ProcessingStrategy[KafkaPayload]:
-        def process_message(message: Message[KafkaPayload]) -> None:
+        def accumulator(result: List[Dict], value: BaseValue[KafkaPayload]) -> List[Dict]:
+            try:
+                result.append(msgpack.unpackb(value.payload.value))
+            except Exception:
+                logger.exception("Failed to process message payload")
+            return result
+
+        def process_batch(message: Message[List[Dict]]) -> None:
             try:
-                wrapper = msgpack.unpackb(message.payload.value)
-                _process_message(wrapper)
+                with metrics.timer("monitors.checkin.batch.duration"):
+                    _process_batch(message.payload, self.monitor_cache)
             except Exception:
                 logger.exception("Failed to process message payload")
 
-        return RunTask(
-            function=process_message,
-            next_step=CommitOffsets(commit),
+        collect_step: Reduce[KafkaPayload, List[Dict]] = Reduce(
+            self.max_batch_size,
+            self.max_batch_time,
+            accumulator,
+            lambda: [],
+            RunTask(process_batch, CommitOffsets(commit)),
         )
+        return collect_step
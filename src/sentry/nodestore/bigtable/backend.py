@@ -67,6 +67,16 @@ class BigtableNodeStorage(NodeStorage):
     def _set_bytes(self, id, data, ttl=None):
         self.store.set(id, data, ttl)
 
+    def _set_bytes_multi(self, items, ttl=None):
+        if len(items) == 1:
+            for id, data in items.items():
+                self._set_bytes(id, data, ttl=ttl)
+            return
+
+        with sentry_sdk.start_span(op="nodestore.bigtable.set_bytes_multi") as span:
+            span.set_tag("num_ids", len(items))
+            self.store.set_many(items, ttl)
+
     def delete(self, id):
         if self.skip_deletes:
             return
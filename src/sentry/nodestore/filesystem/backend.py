@@ -1,54 +1,233 @@
 import datetime
 import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
 
-from django.conf import settings
-from django.utils import timezone
+import zstandard
 
 from sentry.nodestore.base import NodeStorage
+from sentry.utils.dates import to_timestamp
+from sentry.utils.hashlib import md5_text
+
+# Every zstd frame starts with this magic number, which neither JSON nor
+# pickled payloads can start with.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# The directory holding the id -> bucket index. Bucket names are all digits,
+# so it cannot clash with a bucket.
+INDEX_DIRECTORY = "index"
+
+# A single pool shared by all threads and backend instances. The backend is
+# thread-local, so a pool per instance would mean a pool per thread.
+_read_pool = None
+_read_pool_lock = threading.Lock()
+
+
+def _get_read_pool(max_workers):
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is None:
+            _read_pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="nodestore-filesystem"
+            )
+        return _read_pool
+
+
+def _read_file(paths):
+    # Runs on the threads of the read pool and must not access the (thread-local) backend.
+    for path in paths:
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            continue
+    return None
 
 
 class FileSystemNodeStorage(NodeStorage):
     """
-    A simple backend that saves each node as a file. Only appropriate for
-    debugging and development!
+    A backend that saves each node as a file, suitable for single-node
+    installs.
+
+    Nodes are stored as ``<path>/<bucket>/<shard>/<id>``, where the bucket is
+    the start of the time bucket the node was written in and the shard is
+    derived from the hash of the id. ``<path>/index/<shard>/<id>`` is a
+    symlink to the most recently written version of the node, so that reads
+    open a single path no matter how many buckets there are. Cleanup removes
+    whole buckets along with the index entries pointing into them. Nodes
+    written by previous versions of this backend (``<path>/<id>.json``) are
+    still read and cleaned up.
+
+    :param path: The directory to store nodes in.
+    :param compression: ``"zstd"`` or ``None`` to write uncompressed nodes.
+    :param bucket_size: The size of the time buckets in seconds.
+    :param shard_depth: The number of nested shard directories per bucket,
+        each of which fans out to 256 subdirectories.
+    :param read_workers: The number of threads `get_multi` reads files with.
+        The read pool is shared by the whole process and sized by the first
+        backend that uses it.
     """
 
-    def __init__(self, path=None):
-        self.path: str = ""
+    def __init__(
+        self,
+        path=None,
+        compression="zstd",
+        bucket_size=24 * 60 * 60,
+        shard_depth=2,
+        read_workers=8,
+    ):
+        if compression not in ("zstd", None):
+            raise ValueError('"compression" must be "zstd" or None')
+        assert bucket_size > 0
+        assert 0 <= shard_depth <= 16
 
-        if not settings.DEBUG:
-            raise ValueError("FileSystemNodeStorage should only be used in development!")
         if path:
             self.path = os.path.abspath(os.path.expanduser(path))
         else:
             self.path = os.path.abspath(os.path.join(os.path.dirname(__file__), "./nodes"))
+        self.compression = compression
+        self.bucket_size = bucket_size
+        self.shard_depth = shard_depth
+        self.read_workers = read_workers
+
+    def _get_buckets(self):
+        """Returns the names of all buckets, most recent first."""
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        return sorted((name for name in names if name.isdigit()), key=int, reverse=True)
+
+    def _get_shard(self, id):
+        digest = md5_text(id).hexdigest()
+        return [digest[i * 2 : i * 2 + 2] for i in range(self.shard_depth)]
+
+    def _get_paths(self, id):
+        return [self.index_path(id), self.legacy_node_path(id)]
+
+    def node_path(self, id: str, timestamp=None):
+        """Returns the path a node written at `timestamp` (or now) is stored at."""
+        if timestamp is None:
+            timestamp = time()
+        bucket = str(int(timestamp // self.bucket_size * self.bucket_size))
+        return os.path.join(self.path, bucket, *self._get_shard(id), id)
+
+    def index_path(self, id: str):
+        """Returns the path of the index entry linking to the latest version of a node."""
+        return os.path.join(self.path, INDEX_DIRECTORY, *self._get_shard(id), id)
+
+    def legacy_node_path(self, id: str):
+        return os.path.join(self.path, f"{id}.json")
+
+    def _decompress(self, data):
+        if data is not None and data[:4] == ZSTD_MAGIC:
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
 
     def _get_bytes(self, id: str):
-        with open(self.node_path(id), "rb") as file:
-            return file.read()
+        return self._decompress(_read_file(self._get_paths(id)))
+
+    def _get_bytes_multi(self, id_list):
+        if len(id_list) <= 1 or self.read_workers <= 1:
+            return super()._get_bytes_multi(id_list)
+
+        read_pool = _get_read_pool(self.read_workers)
+        results = read_pool.map(_read_file, [self._get_paths(id) for id in id_list])
+        return {id: self._decompress(data) for id, data in zip(id_list, results)}
 
     def _set_bytes(self, id: str, data: bytes, ttl=0):
-        with open(self.node_path(id), "wb") as file:
-            file.write(data)
+        if self.compression == "zstd":
+            data = zstandard.ZstdCompressor().compress(data)
 
-    def delete(self, id):
-        os.remove(self.node_path(id))
+        path = self.node_path(id)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
 
-    def cleanup(self, cutoff: datetime.datetime):
-        for filename in os.listdir(self.path):
-            path = os.path.join(self.path, filename)
-            creation_datetime = datetime.datetime.fromtimestamp(os.path.getctime(path)).replace(
-                tzinfo=timezone.utc
-            )
+        # Write to a temporary file first so that readers never see partial nodes.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
 
-            if creation_datetime > cutoff:
-                os.remove(path)
+        index_path = self.index_path(id)
+        index_directory = os.path.dirname(index_path)
+        os.makedirs(index_directory, exist_ok=True)
 
-    def bootstrap(self):
+        # Relative links keep the index valid if the whole directory is moved.
+        # The link is swapped in atomically, like the node itself.
+        tmp_path = os.path.join(index_directory, f".tmp-{os.getpid()}-{threading.get_ident()}")
+        self._remove(tmp_path)
         try:
-            os.mkdir(self.path)
-        except FileExistsError:
+            os.symlink(os.path.relpath(path, index_directory), tmp_path)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
             pass
 
-    def node_path(self, id: str):
-        return os.path.join(self.path, f"{id}.json")
+    def _read_index(self, id):
+        """Returns the absolute path the index entry of a node links to, if any."""
+        index_path = self.index_path(id)
+        try:
+            target = os.readlink(index_path)
+        except OSError:
+            return None
+        return os.path.normpath(os.path.join(os.path.dirname(index_path), target))
+
+    def delete(self, id):
+        target = self._read_index(id)
+        self._remove(self.index_path(id))
+        if target is not None:
+            self._remove(target)
+        self._remove(self.legacy_node_path(id))
+        self._delete_cache_item(id)
+
+    def cleanup(self, cutoff: datetime.datetime):
+        cutoff_timestamp = to_timestamp(cutoff)
+
+        for bucket in self._get_buckets():
+            if int(bucket) + self.bucket_size <= cutoff_timestamp:
+                self._remove_bucket(bucket)
+
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if (
+                    entry.name.endswith(".json")
+                    and entry.is_file()
+                    and entry.stat().st_mtime < cutoff_timestamp
+                ):
+                    os.remove(entry.path)
+
+        if self.cache:
+            self.cache.clear()
+
+    def _remove_bucket(self, bucket):
+        bucket_path = os.path.join(self.path, bucket)
+
+        # Drop the index entries that still point into the bucket. Entries of
+        # nodes that were written again since point into a newer bucket and
+        # are kept.
+        for directory, _, names in os.walk(bucket_path):
+            for name in names:
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(directory, name)
+                if self._read_index(name) == path:
+                    self._remove(self.index_path(name))
+
+        shutil.rmtree(bucket_path, ignore_errors=True)
+
+    def bootstrap(self):
+        os.makedirs(self.path, exist_ok=True)
@@ -0,0 +1 @@
+from .backend import TieredNodeStorage  # NOQA
@@ -0,0 +1,325 @@
+import atexit
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from time import time
+
+import sentry_sdk
+import zstandard
+
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import metrics
+from sentry.utils.imports import import_string
+
+# Payloads written by this backend start with a format byte. Neither JSON nor
+# pickled payloads written by the wrapped backends can start with it, so
+# those are still read as they are.
+FORMAT_ZSTD = b"\x01"
+
+logger = logging.getLogger(__name__)
+
+
+class _WriteBatch:
+    """
+    The coalesced writes of a `TieredNodeStorage`.
+
+    Node storages are thread local, so every thread sees its own copy of the
+    storage's attributes. The pending writes, their lock and the background
+    flush timer live here instead, shared by all threads using the storage.
+    """
+
+    def __init__(self, backend, size, window):
+        self.backend = backend
+        self.size = size
+        self.window = window
+
+        self.lock = threading.Lock()
+        # ttl -> id -> data
+        self.pending = {}
+        self.count = 0
+        self.since = None
+        self.timer = None
+        atexit.register(self.flush)
+
+    def get(self, id):
+        if not self.pending:
+            return None
+
+        with self.lock:
+            for items in self.pending.values():
+                if id in items:
+                    return items[id]
+        return None
+
+    def discard(self, id):
+        with self.lock:
+            for items in self.pending.values():
+                if items.pop(id, None) is not None:
+                    self.count -= 1
+
+    def add(self, items, ttl):
+        with self.lock:
+            pending = self.pending.setdefault(ttl, {})
+            for id, data in items.items():
+                if pending.get(id) is None:
+                    self.count += 1
+                pending[id] = data
+
+            if self.since is None:
+                self.since = time()
+                self.timer = threading.Timer(self.window, self._flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+            should_flush = self.count >= self.size
+
+        if should_flush:
+            self.flush()
+
+    def flush(self, id_list=None):
+        if not self.pending:
+            return
+
+        # The lock is held while writing, so that pending writes stay visible
+        # to reads until they are written.
+        with self.lock:
+            if id_list is None:
+                flushed = self.pending
+            else:
+                flushed = {}
+                for ttl, items in self.pending.items():
+                    selected = {id: items[id] for id in id_list if id in items}
+                    if selected:
+                        flushed[ttl] = selected
+
+            count = sum(len(items) for items in flushed.values())
+            if not count:
+                return
+
+            since = self.since
+            with sentry_sdk.start_span(op="nodestore.tiered.flush") as span:
+                span.set_data("num_ids", count)
+                for ttl, items in flushed.items():
+                    self.backend._set_bytes_multi(items, ttl=ttl)
+
+            for ttl, items in flushed.items():
+                pending = self.pending[ttl]
+                for id in items:
+                    del pending[id]
+            self.pending = {ttl: items for ttl, items in self.pending.items() if items}
+            self.count -= count
+
+            # Writes that were not flushed keep the timer of the batch.
+            if not self.pending:
+                self.since = None
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+
+        metrics.timing("nodestore.tiered.flush-size", count)
+        metrics.timing("nodestore.tiered.flush-lag", time() - since)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            metrics.incr("nodestore.tiered.flush-failed")
+            logger.exception("Failed to flush coalesced nodestore writes")
+
+
+_write_batches_lock = threading.Lock()
+_write_batches = weakref.WeakKeyDictionary()
+
+
+def _get_write_batch(storage):
+    """
+    Returns the write batch of a storage, which is created by the first
+    thread that initializes it.
+    """
+    with _write_batches_lock:
+        batch = _write_batches.get(storage)
+        if batch is None:
+            batch = _write_batches[storage] = _WriteBatch(
+                storage.backend, storage.write_batch_size, storage.write_batch_window
+            )
+        return batch
+
+
+class TieredNodeStorage(NodeStorage):
+    """
+    A backend that wraps another nodestore backend and adds:
+
+    * zstd compression of the payloads written to the wrapped backend, behind
+      a format byte so that previously written payloads remain readable.
+    * A size-bounded LRU of recently written payloads, so that re-reading an
+      event shortly after it was saved (e.g. in post processing) doesn't hit
+      the wrapped backend.
+    * Optional coalescing of writes into `_set_bytes_multi` batches. Pending
+      writes are visible to reads through this backend, but not to other
+      processes until they are flushed, so writers have to call `flush`
+      before handing out the ids they wrote, as saving events does. Batches
+      are shared by all threads using the storage, and are also flushed in
+      the background once they are `write_batch_window` seconds old, and
+      when the process exits.
+
+    :param backend: Import path of the wrapped backend.
+    :param backend_options: Passed to the wrapped backend.
+    :param compression: ``"zstd"`` or ``None`` to write uncompressed payloads.
+    :param compression_level: The zstd compression level.
+    :param local_cache_size: Maximum total size in bytes of the (compressed)
+        payloads kept in the local LRU, ``0`` disables it.
+    :param write_batch_size: Number of writes coalesced before they are
+        flushed, ``1`` disables coalescing.
+    :param write_batch_window: Maximum age in seconds of a pending write
+        before the batch is flushed in the background.
+
+    >>> TieredNodeStorage(
+    ...     backend="sentry.nodestore.bigtable.BigtableNodeStorage",
+    ...     backend_options={"project": "some-project"},
+    ...     local_cache_size=64 * 1024 * 1024,
+    ... )
+    """
+
+    def __init__(
+        self,
+        backend="sentry.nodestore.django.DjangoNodeStorage",
+        backend_options=None,
+        compression="zstd",
+        compression_level=3,
+        local_cache_size=32 * 1024 * 1024,
+        write_batch_size=1,
+        write_batch_window=1.0,
+    ):
+        if compression not in ("zstd", None):
+            raise ValueError('"compression" must be "zstd" or None')
+        assert write_batch_size > 0
+
+        self.backend = import_string(backend)(**(backend_options or {}))
+        self.compression = compression
+        self.compression_level = compression_level
+        self.local_cache_size = local_cache_size
+        self.write_batch_size = write_batch_size
+        self.write_batch_window = write_batch_window
+
+        self._local_cache = OrderedDict()
+        self._local_cache_bytes = 0
+        self._write_batch = None
+        if self.write_batch_size > 1:
+            self._write_batch = _get_write_batch(self)
+
+    def _compress(self, data):
+        if self.compression is None:
+            return data
+        return FORMAT_ZSTD + zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+
+    def _decompress(self, value):
+        if value is not None and value[:1] == FORMAT_ZSTD:
+            return zstandard.ZstdDecompressor().decompress(value[1:])
+        return value
+
+    def _decode(self, value, subkey):
+        return self.backend._decode(self._decompress(value), subkey=subkey)
+
+    def _cache_local(self, id, data):
+        if len(data) > self.local_cache_size:
+            return
+
+        old = self._local_cache.pop(id, None)
+        if old is not None:
+            self._local_cache_bytes -= len(old)
+
+        self._local_cache[id] = data
+        self._local_cache_bytes += len(data)
+        while self._local_cache_bytes > self.local_cache_size:
+            _, evicted = self._local_cache.popitem(last=False)
+            self._local_cache_bytes -= len(evicted)
+
+    def _uncache_local(self, id):
+        data = self._local_cache.pop(id, None)
+        if data is not None:
+            self._local_cache_bytes -= len(data)
+
+        if self._write_batch is not None:
+            self._write_batch.discard(id)
+
+    def _get_local(self, id):
+        if self._write_batch is not None:
+            data = self._write_batch.get(id)
+            if data is not None:
+                return data
+
+        data = self._local_cache.get(id)
+        if data is not None:
+            self._local_cache.move_to_end(id)
+        return data
+
+    def _get_bytes(self, id):
+        data = self._get_local(id)
+        if data is not None:
+            metrics.incr("nodestore.tiered.local_cache.hit", sample_rate=0.1)
+            return data
+
+        metrics.incr("nodestore.tiered.local_cache.miss", sample_rate=0.1)
+        return self.backend._get_bytes(id)
+
+    def _get_bytes_multi(self, id_list):
+        rv = {}
+        missing = []
+        for id in id_list:
+            data = self._get_local(id)
+            if data is None:
+                missing.append(id)
+            else:
+                rv[id] = data
+
+        metrics.incr("nodestore.tiered.local_cache.hit", amount=len(rv), sample_rate=0.1)
+        if missing:
+            metrics.incr("nodestore.tiered.local_cache.miss", amount=len(missing), sample_rate=0.1)
+            rv.update(self.backend._get_bytes_multi(missing))
+        return rv
+
+    def _set_bytes(self, id, data, ttl=None):
+        self._set_bytes_multi({id: data}, ttl=ttl)
+
+    def _set_bytes_multi(self, items, ttl=None):
+        items = {id: self._compress(data) for id, data in items.items()}
+
+        if self._write_batch is None:
+            self.backend._set_bytes_multi(items, ttl=ttl)
+        else:
+            self._write_batch.add(items, ttl)
+
+        if self.local_cache_size:
+            for id, data in items.items():
+                self._cache_local(id, data)
+
+    def flush(self, id_list=None):
+        """
+        Writes the coalesced writes of ``id_list``, or all of them, to the
+        wrapped backend.
+        """
+        if self._write_batch is not None:
+            self._write_batch.flush(id_list)
+
+    def delete(self, id):
+        self._uncache_local(id)
+        self.backend.delete(id)
+        self._delete_cache_item(id)
+
+    def delete_multi(self, id_list):
+        for id in id_list:
+            self._uncache_local(id)
+        self.backend.delete_multi(id_list)
+        self._delete_cache_items(id_list)
+
+    def cleanup(self, cutoff_timestamp):
+        self.flush()
+        self._local_cache.clear()
+        self._local_cache_bytes = 0
+        self.backend.cleanup(cutoff_timestamp)
+
+    def bootstrap(self):
+        self.backend.bootstrap()
+
+    def validate(self):
+        self.backend.validate()
@@ -96,6 +96,21 @@ register(
     default=1024 * 1024 * 1024,
     flags=FLAG_PRIORITIZE_DISK,
 )
+register(
+    "artifactbundle.cache-path",
+    type=String,
+    default="/tmp/sentry-artifactbundle-cache",
+    flags=FLAG_PRIORITIZE_DISK,
+)
+register(
+    "artifactbundle.cache-limit", type=Int, default=10 * 1024 * 1024, flags=FLAG_PRIORITIZE_DISK
+)
+register(
+    "artifactbundle.cache-max-size",
+    type=Int,
+    default=10 * 1024 * 1024 * 1024,
+    flags=FLAG_PRIORITIZE_DISK,
+)
 
 
 # Mail
@@ -317,6 +332,11 @@ register("snuba.search.chunk-growth-rate", default=1.5)
 register("snuba.search.max-chunk-size", default=2000)
 register("snuba.search.max-total-chunk-time-seconds", default=30.0)
 register("snuba.search.hits-sample-size", default=100)
+# Number of seconds issue search results from snuba are cached for. Time windows relative to now
+# are aligned to this interval. Set to 0 to disable the cache.
+register("snuba.search.result-cache-ttl", default=0)
+# Number of seconds stale issue search results are returned while they are being refreshed.
+register("snuba.search.result-cache-stale-ttl", default=60)
 register("snuba.track-outcomes-sample-rate", default=0.0)
 
 # The percentage of tagkeys that we want to cache. Set to 1.0 in order to cache everything, <=0.0 to stop caching
@@ -449,6 +469,17 @@ register("store.load-shed-symbolicate-event-projects", type=Any, default=[])
 register("store.symbolicate-event-lpq-never", type=Sequence, default=[])
 register("store.symbolicate-event-lpq-always", type=Sequence, default=[])
 register("post_process.get-autoassign-owners", type=Sequence, default=[])
+# Number of seconds in which group level post process steps (snoozes, inbox, owners, commits and
+# code mappings) only run for the first event of a group. Set to 0 to run them for every event.
+register("post-process.group-coalescing-window", default=0)
+# Record events in the similarity index in batches from the `record_similarity` task rather than
+# in post process.
+register("similarity.record.buffered", default=False)
+# Number of events `record_similarity` loads and records at once.
+register("similarity.record.batch-size", default=100)
+# Number of seconds in which only the first event of a group is recorded in the similarity index
+# when recording is buffered. Set to 0 to record every event.
+register("similarity.record.group-sample-window", default=60)
 register("api.organization.disable-last-deploys", type=Sequence, default=[])
 
 # Switch for more performant project counter incr
@@ -493,6 +524,10 @@ register("post-process-forwarder:kafka-headers", default=True)
 # Subscription queries sampling rate
 register("subscriptions-query.sample-rate", default=0.01)
 
+# The number of threads processing updates of different alert rule subscriptions
+# concurrently in batched query subscription consumers
+register("incidents.subscription-processor.concurrency", default=1)
+
 # The ratio of symbolication requests for which metrics will be submitted to redis.
 #
 # This is to allow gradual rollout of metrics collection for symbolication requests and can be
@@ -712,3 +747,9 @@ register("sourcemaps.enable-artifact-bundles", default=0.0)
 register("txnames.bump-lifetime-sample-rate", default=0.1)
 # Decides whether artifact bundles asynchronous renewal is enabled.
 register("sourcemaps.artifact-bundles.enable-renewal", default=0.0)
+# Number of seconds an event waits for its artifact bundles to be downloaded concurrently before the remaining ones
+# are fetched one by one. Set to 0 to disable concurrent fetching.
+register("sourcemaps.artifact-bundles.prefetch-timeout", default=10.0)
+# Number of seconds the results of issue alert frequency conditions are shared between post process workers.
+# Set to 0 to only deduplicate queries within the rules of a single event.
+register("rules.event-frequency.cache-ttl", default=5)
@@ -0,0 +1,244 @@
+"""
+Compiled ownership rules.
+
+Testing an ownership schema naively means extracting the stack frames of the
+event for every rule and running every path, module and URL pattern against
+every frame. ``CompiledOwnership`` indexes the rules of a schema by a literal
+token of their pattern: tokens that must appear as a whole path segment
+(such as ``js`` in ``*.js``) are looked up in a dictionary, all others are
+found with one combined regex. The event is only inspected once (see
+``OwnershipEventData``), and the original matching functions still run for
+the candidate rules, so the index never changes which rules match.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from sentry.ownership.grammar import CODEOWNERS, MODULE, PATH, URL, Matcher, Rule, load_schema
+from sentry.utils import json, metrics
+from sentry.utils.codeowners import codeowners_match
+from sentry.utils.glob import glob_match
+from sentry.utils.hashlib import md5_text
+from sentry.utils.safe import PathSearchable, get_path
+
+# Maximum number of compiled schemas kept in memory per process.
+MAX_CACHED_SCHEMAS = 200
+
+# Characters of a pattern that don't stand for themselves. Tokens next to
+# them can be part of a longer segment of the value.
+NON_LITERAL_CHARS = frozenset("*?[]{}!\\")
+
+_token_re = re.compile(r"[a-z0-9]+")
+_pattern_groups_re = re.compile(r"\[[^\]]*\]?|\{[^}]*\}?")
+
+
+def _get_anchor(pattern: str) -> Optional[Tuple[bool, str]]:
+    """
+    Returns a token that every value matching ``pattern`` contains, and
+    whether the token is a whole segment of such values. Prefers whole
+    segments and then longer tokens.
+    """
+    # Character classes and alternations don't contain literal tokens.
+    masked = _pattern_groups_re.sub("*", pattern.lower())
+
+    best = None
+    for match in _token_re.finditer(masked):
+        start, end = match.span()
+        # A token at the start of the pattern could be the end of a longer
+        # segment depending on how the value is normalized.
+        is_segment = (
+            start > 0
+            and masked[start - 1] not in NON_LITERAL_CHARS
+            and (end == len(masked) or masked[end] not in NON_LITERAL_CHARS)
+        )
+        candidate = (is_segment, match.group())
+        if best is None or (candidate[0], len(candidate[1])) > (best[0], len(best[1])):
+            best = candidate
+
+    return best
+
+
+def _glob_path_match(value: str, pattern: str) -> bool:
+    return bool(glob_match(value, pattern, ignorecase=True, path_normalize=True))
+
+
+def _glob_url_match(value: str, pattern: str) -> bool:
+    return bool(glob_match(value, pattern, ignorecase=True))
+
+
+def _codeowners_match(value: str, pattern: str) -> bool:
+    return bool(codeowners_match(value, pattern))
+
+
+# matcher type -> (value kind, match function), mirroring `Matcher.test`
+MATCHER_TYPES: Mapping[str, Tuple[str, Callable[[str, str], bool]]] = {
+    PATH: ("paths", _glob_path_match),
+    CODEOWNERS: ("paths", _codeowners_match),
+    MODULE: ("modules", _glob_path_match),
+    URL: ("urls", _glob_url_match),
+}
+
+
+class OwnershipEventData:
+    """
+    The values of an event that ownership rules are matched against,
+    extracted once so that they can be shared between schemas.
+    """
+
+    def __init__(self, data: PathSearchable):
+        self.data = data
+        # Values that can't be indexed make the compiled rules fall back to
+        # testing every rule.
+        self.indexable = True
+
+        frames, keys = Matcher.munge_if_needed(data)
+        frames = [frame for frame in frames if isinstance(frame, Mapping)]
+        self.values: Dict[str, List[str]] = {
+            "paths": self._get_values(frames, keys),
+            "modules": self._get_values(frames, ["module"]),
+            "urls": [],
+        }
+
+        if isinstance(data, Mapping):
+            url = get_path(data, "request", "url")
+            if url:
+                self.values["urls"] = self._check_values([url])
+
+    def _check_values(self, values: List[Any]) -> List[str]:
+        if not all(isinstance(value, str) for value in values):
+            self.indexable = False
+            return []
+        return values
+
+    def _get_values(self, frames: Sequence[Mapping[str, Any]], keys: Sequence[str]) -> List[str]:
+        values = [frame.get(key) for frame in frames for key in keys]
+        return self._check_values(list(dict.fromkeys(value for value in values if value)))
+
+
+class _ValueIndex:
+    """Finds the candidate rules for the values of one kind."""
+
+    def __init__(self) -> None:
+        self.segments: Dict[str, List[int]] = {}
+        self.substrings: Dict[str, List[int]] = {}
+        self.unanchored: List[int] = []
+        self._substrings_re: Optional[re.Pattern[str]] = None
+        self._prefixes: Dict[str, List[str]] = {}
+
+    def add(self, rule_idx: int, pattern: str) -> None:
+        anchor = _get_anchor(pattern)
+        if anchor is None:
+            self.unanchored.append(rule_idx)
+        else:
+            is_segment, token = anchor
+            index = self.segments if is_segment else self.substrings
+            index.setdefault(token, []).append(rule_idx)
+
+    def compile(self) -> None:
+        if not self.substrings:
+            return
+
+        # At every position the regex finds the longest token only, all
+        # shorter tokens found at the same position are prefixes of it.
+        tokens = sorted(self.substrings, key=len, reverse=True)
+        self._substrings_re = re.compile(
+            "(?=(%s))" % "|".join(re.escape(token) for token in tokens)
+        )
+        self._prefixes = {
+            token: [other for other in tokens if token.startswith(other)] for token in tokens
+        }
+
+    def get_candidates(self, values: Sequence[str], candidates: Dict[int, Set[str]]) -> None:
+        for value in values:
+            lowered = value.lower()
+
+            for token in set(_token_re.findall(lowered)):
+                for rule_idx in self.segments.get(token, ()):
+                    candidates.setdefault(rule_idx, set()).add(value)
+
+            if self._substrings_re is not None:
+                found = {match.group(1) for match in self._substrings_re.finditer(lowered)}
+                for token in {prefix for token in found for prefix in self._prefixes[token]}:
+                    for rule_idx in self.substrings[token]:
+                        candidates.setdefault(rule_idx, set()).add(value)
+
+            for rule_idx in self.unanchored:
+                candidates.setdefault(rule_idx, set()).add(value)
+
+
+class CompiledOwnership:
+    """The rules of an ownership schema, compiled for matching events."""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+
+        self._indexes: Dict[str, _ValueIndex] = {}
+        # Rules that are tested against the whole event, such as tag rules.
+        self._other: List[int] = []
+
+        for rule_idx, rule in enumerate(self.rules):
+            matcher_type = MATCHER_TYPES.get(rule.matcher.type)
+            if matcher_type is None:
+                self._other.append(rule_idx)
+            else:
+                kind, _ = matcher_type
+                self._indexes.setdefault(kind, _ValueIndex()).add(rule_idx, rule.matcher.pattern)
+
+        for index in self._indexes.values():
+            index.compile()
+
+    def get_matching_rules(self, event_data: OwnershipEventData) -> List[Rule]:
+        """Returns the rules matching the event in schema order."""
+        if not event_data.indexable:
+            return [rule for rule in self.rules if rule.test(event_data.data)]
+
+        candidates: Dict[int, Set[str]] = {}
+        for kind, index in self._indexes.items():
+            index.get_candidates(event_data.values[kind], candidates)
+
+        matching = []
+        for rule_idx, values in candidates.items():
+            matcher = self.rules[rule_idx].matcher
+            _, match = MATCHER_TYPES[matcher.type]
+            if any(match(value, matcher.pattern) for value in values):
+                matching.append(rule_idx)
+
+        matching.extend(
+            rule_idx for rule_idx in self._other if self.rules[rule_idx].test(event_data.data)
+        )
+
+        return [self.rules[rule_idx] for rule_idx in sorted(matching)]
+
+
+_cache_lock = threading.Lock()
+_compiled_cache: OrderedDict[str, CompiledOwnership] = OrderedDict()
+
+
+def get_compiled_ownership(schema: Mapping[str, Any]) -> CompiledOwnership:
+    """
+    Returns the compiled rules of an ownership schema. Compiled rules are
+    shared between all schemas with the same content.
+    """
+    key = md5_text(json.dumps(schema)).hexdigest()
+
+    with _cache_lock:
+        rv = _compiled_cache.get(key)
+        if rv is not None:
+            _compiled_cache.move_to_end(key)
+            metrics.incr("ownership.compiled.hit", sample_rate=0.01)
+            return rv
+
+    metrics.incr("ownership.compiled.miss")
+    with metrics.timer("ownership.compiled.compile"):
+        rv = CompiledOwnership(load_schema(schema))
+
+    with _cache_lock:
+        _compiled_cache[key] = rv
+        while len(_compiled_cache) > MAX_CACHED_SCHEMAS:
+            _compiled_cache.popitem(last=False)
+
+    return rv
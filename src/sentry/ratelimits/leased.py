@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import time
+from typing import TYPE_CHECKING, Any
+
+from redis.exceptions import RedisError
+
+from sentry.ratelimits.redis import RedisRateLimiter, _bucket_start_time, _time_bucket
+from sentry.utils import metrics
+
+if TYPE_CHECKING:
+    from sentry.models.project import Project
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Lease:
+    # Tokens leased from redis that this process has not handed out yet.
+    remaining: int
+    # The value of the last token of the lease.
+    value: int
+    # Set to the value of the redis counter once the limit was reached. All
+    # requests in the window after the remaining tokens are handed out are
+    # limited without asking redis.
+    limited_value: int | None = None
+
+
+class LeasedRedisRateLimiter(RedisRateLimiter):
+    """
+    A `RedisRateLimiter` that leases tokens from redis in chunks and hands
+    them out from an in-process token bucket per rate limit key and window.
+
+    Instead of one redis round-trip per check, a process only talks to redis
+    once its lease is used up, or once per window after the limit was
+    reached. Tokens are counted in redis as soon as they are leased, so keys
+    are never allowed more requests than their limit. In exchange, leased
+    tokens that a process doesn't use before the window ends are lost to
+    other processes, which can limit a key earlier than the plain redis
+    limiter by up to ``lease_size`` requests per process.
+
+    :param lease_size: The maximum number of tokens leased at once.
+    :param max_lease_ratio: The maximum share of a limit leased at once. Keys
+        with low limits lease single tokens, which is equivalent to the plain
+        redis limiter.
+    :param max_keys: The maximum number of leases kept per process.
+    """
+
+    def __init__(
+        self,
+        lease_size: int = 10,
+        max_lease_ratio: float = 0.1,
+        max_keys: int = 10000,
+        **options: Any,
+    ) -> None:
+        super().__init__(**options)
+        self.lease_size = lease_size
+        self.max_lease_ratio = max_lease_ratio
+        self.max_keys = max_keys
+        self._leases: OrderedDict[str, _Lease] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_lease_size(self, limit: int) -> int:
+        return max(1, min(self.lease_size, int(limit * self.max_lease_ratio)))
+
+    def _take_token(self, redis_key: str) -> tuple[bool, int] | None:
+        """Returns whether the key is limited and its estimated value, if the lease can tell."""
+        with self._lock:
+            lease = self._leases.get(redis_key)
+            if lease is None:
+                return None
+            if lease.remaining > 0:
+                lease.remaining -= 1
+                return False, lease.value - lease.remaining
+            if lease.limited_value is not None:
+                return True, lease.limited_value
+            return None
+
+    def _store_lease(self, redis_key: str, lease: _Lease) -> None:
+        with self._lock:
+            self._leases[redis_key] = lease
+            self._leases.move_to_end(redis_key)
+            while len(self._leases) > self.max_keys:
+                self._leases.popitem(last=False)
+
+    def current_value(
+        self, key: str, project: Project | None = None, window: int | None = None
+    ) -> int:
+        value = super().current_value(key, project=project, window=window)
+        redis_key = self._construct_redis_key(key, project=project, window=window)
+        with self._lock:
+            lease = self._leases.get(redis_key)
+            if lease is not None:
+                value -= lease.remaining
+        return max(value, 0)
+
+    def is_limited_with_value(
+        self, key: str, limit: int, project: Project | None = None, window: int | None = None
+    ) -> tuple[bool, int, int]:
+        request_time = time()
+        if window is None or window == 0:
+            window = self.window
+        redis_key = self._construct_redis_key(
+            key, project=project, window=window, request_time=request_time
+        )
+        # Reset Time = next time bucket's start time
+        reset_time = _bucket_start_time(_time_bucket(request_time, window) + 1, window)
+
+        taken = self._take_token(redis_key)
+        if taken is not None:
+            is_limited, value = taken
+            return is_limited, value, reset_time
+
+        lease_size = self._get_lease_size(limit)
+        expiration = window - int(request_time % window)
+        try:
+            result = self.client.incrby(redis_key, lease_size)
+            self.client.expire(redis_key, expiration)
+        except RedisError:
+            # We don't want rate limited endpoints to fail when ratelimits
+            # can't be updated. We do want to know when that happens.
+            logger.exception("Failed to retrieve current value from redis")
+            return False, 0, reset_time
+
+        metrics.incr("ratelimits.lease.refill", sample_rate=0.1)
+
+        # The lease may only be partially covered by the limit.
+        previous = result - lease_size
+        granted = max(0, min(lease_size, limit - previous))
+        if granted < lease_size:
+            metrics.timing("ratelimits.lease.overshoot", lease_size - granted)
+
+        lease = _Lease(
+            remaining=max(0, granted - 1),
+            value=previous + granted,
+            limited_value=result if granted < lease_size else None,
+        )
+        self._store_lease(redis_key, lease)
+        if granted == 0:
+            return True, result, reset_time
+        return False, previous + 1, reset_time
@@ -6,6 +6,10 @@ proper steps are taken to migrate your data.
 """
 import dataclasses
 import logging
+import os
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime
 from io import BytesIO
@@ -180,6 +184,116 @@ def make_filename(segment: RecordingSegmentStorageMeta) -> str:
     )
 
 
+class SegmentDiskCache:
+    """Local least-recently-used cache of recording segment blobs.
+
+    Blobs are stored as they were downloaded, so compressed segments stay compressed on disk.
+    Files are written atomically and reads bump their modification time, which orders the
+    files for eviction.  The cache is shared by all processes using the same directory.
+    Deleted replays are never looked up again and are evicted like any other file.
+    """
+
+    # Evict files once every `eviction_interval` writes.
+    eviction_interval = 100
+
+    def __init__(self, directory: str, max_size: int, ttl: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _make_path(self, segment: RecordingSegmentStorageMeta) -> str:
+        return os.path.join(self.directory, make_filename(segment).replace("/", "-"))
+
+    def get(self, segment: RecordingSegmentStorageMeta) -> Optional[bytes]:
+        path = self._make_path(segment)
+        try:
+            if os.stat(path).st_mtime < time.time() - self.ttl:
+                metrics.incr("replays.lib.storage.SegmentDiskCache.miss")
+                return None
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            metrics.incr("replays.lib.storage.SegmentDiskCache.miss")
+            return None
+
+        metrics.incr("replays.lib.storage.SegmentDiskCache.hit")
+        return value
+
+    def set(self, segment: RecordingSegmentStorageMeta, value: bytes) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(value)
+                os.replace(tmp_path, self._make_path(segment))
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError:
+            logger.warning("Could not write segment to the disk cache.", exc_info=True)
+            return
+
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.eviction_interval == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove expired files and the least recently used files above the maximum size."""
+        expires_at = time.time() - self.ttl
+
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    # Temporary files are still being written unless they were left behind.
+                    if entry.name.startswith(".tmp-") and stat.st_mtime >= expires_at:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        total_size = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size and mtime >= expires_at:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            metrics.incr("replays.lib.storage.SegmentDiskCache.evict")
+
+
+_segment_cache: Optional[SegmentDiskCache] = None
+
+
+def get_segment_cache() -> Optional[SegmentDiskCache]:
+    """Return the disk cache for recording segments or None if no directory is configured."""
+    global _segment_cache
+
+    directory = settings.SENTRY_REPLAYS_SEGMENT_CACHE_DIR
+    if not directory:
+        return None
+
+    if _segment_cache is None or _segment_cache.directory != directory:
+        _segment_cache = SegmentDiskCache(
+            directory,
+            max_size=settings.SENTRY_REPLAYS_SEGMENT_CACHE_MAX_SIZE,
+            ttl=settings.SENTRY_REPLAYS_SEGMENT_CACHE_TTL,
+        )
+    return _segment_cache
+
+
 def make_storage_driver(organization_id: int) -> Union[FilestoreBlob, StorageBlob]:
     """Return a storage driver instance."""
     return _make_storage_driver(
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import functools
+import itertools
+import threading
 import uuid
 import zlib
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Iterator, List, Optional
+from typing import Deque, Iterator, List, Optional
 
 import sentry_sdk
 from django.db.models import Prefetch
@@ -25,7 +28,12 @@ from snuba_sdk import (
 )
 
 from sentry.models.files.file import File, FileBlobIndex
-from sentry.replays.lib.storage import RecordingSegmentStorageMeta, filestore, storage
+from sentry.replays.lib.storage import (
+    RecordingSegmentStorageMeta,
+    filestore,
+    get_segment_cache,
+    storage,
+)
 from sentry.replays.models import ReplayRecordingSegment
 from sentry.utils.snuba import raw_snql_query
 
@@ -241,6 +249,29 @@ def _fetch_segments_from_snuba(
 # BLOB DOWNLOAD BEHAVIOR.
 
 
+# Segments are downloaded by a thread pool shared by all requests of the process.
+DOWNLOAD_POOL_SIZE = 32
+# The number of segments of a request downloaded ahead of the response.  Segments are only
+# downloaded as fast as the client reads the response.
+MAX_SEGMENTS_IN_FLIGHT = 10
+# The maximum size of the decompressed chunks written to the response.
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+_download_pool: Optional[ThreadPoolExecutor] = None
+_download_pool_lock = threading.Lock()
+
+
+def _get_download_pool() -> ThreadPoolExecutor:
+    global _download_pool
+
+    with _download_pool_lock:
+        if _download_pool is None:
+            _download_pool = ThreadPoolExecutor(
+                max_workers=DOWNLOAD_POOL_SIZE, thread_name_prefix="replays-download-segment"
+            )
+        return _download_pool
+
+
 def download_segments(segments: List[RecordingSegmentStorageMeta]) -> Iterator[bytes]:
     """Download segment data from remote storage."""
 
@@ -251,25 +282,40 @@ def download_segments(segments: List[RecordingSegmentStorageMeta]) -> Iterator[b
         sampled=True,
     )
 
-    download_segment_with_fixed_args = functools.partial(
-        download_segment, transaction=transaction, current_hub=sentry_sdk.Hub.current
+    download_blob_with_fixed_args = functools.partial(
+        download_segment_blob, transaction=transaction, current_hub=sentry_sdk.Hub.current
+    )
+
+    pool = _get_download_pool()
+    remaining = iter(segments)
+    pending: Deque[Future[Optional[bytes]]] = deque(
+        pool.submit(download_blob_with_fixed_args, segment)
+        for segment in itertools.islice(remaining, MAX_SEGMENTS_IN_FLIGHT)
     )
 
-    yield b"["
-    # Map all of the segments to a worker process for download.
-    with ThreadPoolExecutor(max_workers=10) as exe:
-        results = exe.map(download_segment_with_fixed_args, segments)
+    try:
+        yield b"["
+        while pending:
+            result = pending.popleft().result()
+
+            # Replace the finished download before the segment is written to the response.
+            segment = next(remaining, None)
+            if segment is not None:
+                pending.append(pool.submit(download_blob_with_fixed_args, segment))
 
-        for i, result in enumerate(results):
             if result is None:
                 yield b"[]"
             else:
-                yield result
+                yield from iter_decompressed(result)
 
-            if i < len(segments) - 1:
+            if pending:
                 yield b","
-    yield b"]"
-    transaction.finish()
+        yield b"]"
+    finally:
+        # The client may disconnect before the response is finished.
+        for future in pending:
+            future.cancel()
+        transaction.finish()
 
 
 def download_segment(
@@ -278,25 +324,45 @@ def download_segment(
     current_hub: sentry_sdk.Hub,
 ) -> Optional[bytes]:
     """Return the segment blob data."""
+    result = download_segment_blob(segment, transaction, current_hub)
+    if result is None:
+        return None
+
+    with sentry_sdk.Hub(current_hub):
+        with transaction.start_child(
+            op="download_segment",
+            description="decompress",
+        ):
+            return decompress(result)
+
+
+def download_segment_blob(
+    segment: RecordingSegmentStorageMeta,
+    transaction: Span,
+    current_hub: sentry_sdk.Hub,
+) -> Optional[bytes]:
+    """Return the segment blob data as stored, from the disk cache if possible."""
     with sentry_sdk.Hub(current_hub):
         with transaction.start_child(
             op="download_segment",
             description="thread_task",
         ):
+            cache = get_segment_cache()
+            if cache is not None:
+                result = cache.get(segment)
+                if result is not None:
+                    return result
+
             driver = filestore if segment.file_id else storage
             with sentry_sdk.start_span(
                 op="download_segment",
                 description="download",
             ):
                 result = driver.get(segment)
-            if result is None:
-                return None
 
-            with sentry_sdk.start_span(
-                op="download_segment",
-                description="decompress",
-            ):
-                return decompress(result)
+            if result is not None and cache is not None:
+                cache.set(segment, result)
+            return result
 
 
 def decompress(buffer: bytes) -> bytes:
@@ -309,3 +375,27 @@ def decompress(buffer: bytes) -> bytes:
         return buffer
 
     return zlib.decompress(buffer, zlib.MAX_WBITS | 32)
+
+
+def iter_decompressed(buffer: bytes, chunk_size: int = DECOMPRESS_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield decompressed output in chunks of at most `chunk_size` bytes.
+
+    The output is the same as `decompress` without holding the decompressed segment in memory.
+    """
+    if buffer.startswith(b"["):
+        yield buffer
+        return
+
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+    while buffer:
+        chunk = decompressor.decompress(buffer, chunk_size)
+        if chunk:
+            yield chunk
+        buffer = decompressor.unconsumed_tail
+
+    chunk = decompressor.flush()
+    if chunk:
+        yield chunk
+
+    if not decompressor.eof:
+        raise zlib.error("Error -5 while decompressing data: incomplete or truncated stream")
@@ -5,13 +5,13 @@ import contextlib
 import logging
 import re
 from datetime import datetime, timedelta
-from typing import Any, Dict, Mapping, Tuple
+from typing import Any, Callable, Dict, Hashable, Iterable, Mapping, MutableMapping, Sequence, Tuple
 
 from django import forms
 from django.core.cache import cache
 from django.utils import timezone
 
-from sentry import release_health, tsdb
+from sentry import options, release_health, tsdb
 from sentry.eventstore.models import GroupEvent
 from sentry.issues.constants import get_issue_tsdb_group_model, get_issue_tsdb_user_group_model
 from sentry.receivers.rules import DEFAULT_RULE_LABEL
@@ -23,6 +23,7 @@ from sentry.types.condition_activity import (
     round_to_five_minute,
 )
 from sentry.utils import metrics
+from sentry.utils.hashlib import hash_values
 from sentry.utils.snuba import options_override
 
 standard_intervals = {
@@ -88,6 +89,63 @@ class EventFrequencyForm(forms.Form):  # type: ignore
         return cleaned_data
 
 
+QueryKey = Tuple[Hashable, ...]
+
+
+class EventFrequencyQueryCache:
+    """
+    Shares the results of frequency queries between all rules evaluated for
+    an event. All queries are made relative to the same point in time, so
+    that conditions asking for the same group, environment and window run a
+    single query. Results are additionally shared with other post process
+    workers for `rules.event-frequency.cache-ttl` seconds.
+    """
+
+    def __init__(self, now: datetime | None = None) -> None:
+        self.now = now or timezone.now()
+        self._results: MutableMapping[QueryKey, int] = {}
+        # Keys that were already looked up in the shared cache.
+        self._fetched: set[QueryKey] = set()
+
+    def _get_cache_key(self, key: QueryKey) -> str:
+        return "r.c.fq:%s" % hash_values(key)
+
+    def prefetch(self, keys: Iterable[QueryKey]) -> None:
+        """Loads the shared results for `keys` with a single cache lookup."""
+        cache_keys = {
+            self._get_cache_key(key): key
+            for key in keys
+            if key not in self._results and key not in self._fetched
+        }
+        if not cache_keys or not options.get("rules.event-frequency.cache-ttl"):
+            return
+
+        for cache_key, result in cache.get_many(list(cache_keys)).items():
+            self._results[cache_keys[cache_key]] = result
+        self._fetched.update(cache_keys.values())
+        metrics.incr("rules.conditions.frequency_cache.prefetched", amount=len(cache_keys))
+
+    def get(self, key: QueryKey, query: Callable[[], int]) -> int:
+        if key in self._results:
+            metrics.incr("rules.conditions.frequency_cache.hit")
+            return self._results[key]
+
+        ttl = options.get("rules.event-frequency.cache-ttl")
+        cache_key = self._get_cache_key(key)
+        if ttl and key not in self._fetched:
+            result = cache.get(cache_key)
+            if result is not None:
+                metrics.incr("rules.conditions.frequency_cache.hit")
+                self._results[key] = result
+                return result
+
+        metrics.incr("rules.conditions.frequency_cache.miss")
+        result = self._results[key] = query()
+        if ttl:
+            cache.set(cache_key, result, ttl)
+        return result
+
+
 class BaseEventFrequencyCondition(EventCondition, abc.ABC):
     intervals = standard_intervals
     form_cls = EventFrequencyForm
@@ -95,6 +153,7 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.tsdb = kwargs.pop("tsdb", tsdb)
+        self.query_cache: EventFrequencyQueryCache | None = kwargs.pop("query_cache", None)
         self.form_fields = {
             "value": {"type": "number", "placeholder": 100},
             "interval": {
@@ -179,26 +238,75 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         """ """
         raise NotImplementedError  # subclass must implement
 
+    def _get_query_windows(self, interval: str) -> Sequence[Tuple[timedelta, timedelta]]:
+        """Returns the (duration, offset from now) of every window `get_rate` queries."""
+        _, duration = self.intervals[interval]
+        windows = [(duration, timedelta())]
+        if self.get_option("comparisonType", COMPARISON_TYPE_COUNT) == COMPARISON_TYPE_PERCENT:
+            windows.append(
+                (duration, comparison_intervals[self.get_option("comparisonInterval")][1])
+            )
+        return windows
+
+    def _get_query_key(
+        self, event: GroupEvent, environment_id: str, duration: timedelta, offset: timedelta
+    ) -> QueryKey:
+        return (
+            self.id,
+            event.group_id,
+            environment_id,
+            int(duration.total_seconds()),
+            int(offset.total_seconds()),
+        )
+
+    def get_query_keys(self, event: GroupEvent, environment_id: str) -> Sequence[QueryKey]:
+        """
+        Returns the keys of the queries `passes` would run, used to prefetch
+        them from the shared cache.
+        """
+        interval, value = self._get_options()
+        if not (interval and value is not None):
+            return []
+
+        return [
+            self._get_query_key(event, environment_id, duration, offset)
+            for duration, offset in self._get_query_windows(interval)
+        ]
+
+    def _query_window(
+        self,
+        event: GroupEvent,
+        end: datetime,
+        duration: timedelta,
+        offset: timedelta,
+        environment_id: str,
+    ) -> int:
+        window_end = end - offset
+
+        def query() -> int:
+            return self.query(
+                event, window_end - duration, window_end, environment_id=environment_id
+            )
+
+        if self.query_cache is None:
+            return query()
+        return self.query_cache.get(
+            self._get_query_key(event, environment_id, duration, offset), query
+        )
+
     def get_rate(self, event: GroupEvent, interval: str, environment_id: str) -> int:
         _, duration = self.intervals[interval]
-        end = timezone.now()
+        end = self.query_cache.now if self.query_cache is not None else timezone.now()
         # For conditions with interval >= 1 hour we don't need to worry about read your writes
         # consistency. Disable it so that we can scale to more nodes.
         option_override_cm = contextlib.nullcontext()
         if duration >= timedelta(hours=1):
             option_override_cm = options_override({"consistent": False})
         with option_override_cm:
-            result: int = self.query(event, end - duration, end, environment_id=environment_id)
-            comparison_type = self.get_option("comparisonType", COMPARISON_TYPE_COUNT)
-            if comparison_type == COMPARISON_TYPE_PERCENT:
-                comparison_interval = comparison_intervals[self.get_option("comparisonInterval")][1]
-                comparison_end = end - comparison_interval
-                # TODO: Figure out if there's a way we can do this less frequently. All queries are
-                # automatically cached for 10s. We could consider trying to cache this and the main
-                # query for 20s to reduce the load.
-                comparison_result = self.query(
-                    event, comparison_end - duration, comparison_end, environment_id=environment_id
-                )
+            windows = self._get_query_windows(interval)
+            result: int = self._query_window(event, end, *windows[0], environment_id)
+            if len(windows) > 1:
+                comparison_result = self._query_window(event, end, *windows[1], environment_id)
                 result = percent_increase(result, comparison_result)
 
         return result
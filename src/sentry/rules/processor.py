@@ -12,6 +12,10 @@ from sentry import analytics
 from sentry.eventstore.models import GroupEvent
 from sentry.models import Environment, GroupRuleStatus, Rule, RuleSnooze
 from sentry.rules import EventState, history, rules
+from sentry.rules.conditions.event_frequency import (
+    BaseEventFrequencyCondition,
+    EventFrequencyQueryCache,
+)
 from sentry.types.rules import RuleFuture
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import safe_execute
@@ -52,6 +56,8 @@ class RuleProcessor:
         self.grouped_futures: MutableMapping[
             str, Tuple[Callable[[GroupEvent, Sequence[RuleFuture]], None], List[RuleFuture]]
         ] = {}
+        # Shares frequency queries between the conditions of all rules.
+        self.query_cache = EventFrequencyQueryCache()
 
     def get_rules(self) -> Sequence[Rule]:
         """Get all of the rules for this project from the DB (or cache)."""
@@ -127,12 +133,36 @@ class RuleProcessor:
             self.logger.warning("Unregistered condition %r", condition["id"])
             return None
 
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
+        if issubclass(condition_cls, BaseEventFrequencyCondition):
+            condition_inst = condition_cls(
+                self.project, data=condition, rule=rule, query_cache=self.query_cache
+            )
+        else:
+            condition_inst = condition_cls(self.project, data=condition, rule=rule)
         passes: bool = safe_execute(
             condition_inst.passes, self.event, state, _with_transaction=False
         )
         return passes
 
+    def prefetch_frequency_queries(self, rule_list: Sequence[Rule]) -> None:
+        """
+        Loads the results of the frequency conditions of `rule_list` that
+        other workers already queried for this group in a single cache lookup.
+        """
+        keys = []
+        for rule in rule_list:
+            for condition in rule.data.get("conditions", ()):
+                condition_cls = rules.get(condition["id"])
+                if condition_cls is None or not issubclass(
+                    condition_cls, BaseEventFrequencyCondition
+                ):
+                    continue
+                condition_inst = condition_cls(self.project, data=condition, rule=rule)
+                keys.extend(condition_inst.get_query_keys(self.event, rule.environment_id))
+
+        if keys:
+            self.query_cache.prefetch(keys)
+
     def get_rule_type(self, condition: Mapping[str, Any]) -> str | None:
         rule_cls = rules.get(condition["id"])
         if rule_cls is None:
@@ -268,8 +298,10 @@ class RuleProcessor:
             "rule", flat=True
         )
         rule_statuses = self.bulk_get_rule_status(rules)
-        for rule in rules:
-            if rule.id not in snoozed_rules:
-                self.apply_rule(rule, rule_statuses[rule.id])
+        self.query_cache = EventFrequencyQueryCache()
+        active_rules = [rule for rule in rules if rule.id not in snoozed_rules]
+        safe_execute(self.prefetch_frequency_queries, active_rules, _with_transaction=False)
+        for rule in active_rules:
+            self.apply_rule(rule, rule_statuses[rule.id])
 
         return self.grouped_futures.values()
@@ -474,6 +474,12 @@ def post_process_forwarder(**options):
 )
 @click.option("--input-block-size", type=int, default=DEFAULT_BLOCK_SIZE)
 @click.option("--output-block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+@click.option(
+    "--batched",
+    is_flag=True,
+    default=False,
+    help="Process subscription updates in batches instead of one at a time.",
+)
 @strict_offset_reset_option()
 @log_options()
 @configuration
@@ -491,6 +497,7 @@ def query_subscription_consumer(**options):
         processes=options["processes"],
         input_block_size=options["input_block_size"],
         output_block_size=options["output_block_size"],
+        batched=options["batched"],
     )
     run_processor_with_signals(subscriber)
 
@@ -667,7 +674,7 @@ def replays_recordings_consumer(**options):
 @run.command("ingest-monitors")
 @log_options()
 @click.option("--topic", default="ingest-monitors", help="Topic to get monitor check-in data from.")
-@kafka_options("ingest-monitors")
+@kafka_options("ingest-monitors", include_batching_options=True, default_max_batch_size=100)
 @strict_offset_reset_option()
 @configuration
 def monitors_consumer(**options):
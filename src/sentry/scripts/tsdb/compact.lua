@@ -0,0 +1,31 @@
+--[[
+
+Adds the counters of a compacted bucket to a counter hash of a coarser rollup.
+
+Buckets are compacted in ascending order, so the hash stores the epoch of the
+last bucket added to it in a marker field, in the same step. Compacting a
+bucket again (e.g. after a compaction failed halfway) doesn't count it twice.
+
+KEYS[1]: the counter hash
+ARGV[1]: the marker field
+ARGV[2]: the epoch of the compacted bucket
+ARGV[3]: the expiration timestamp of the counter hash
+ARGV[4...]: pairs of hash field and count
+
+Returns 1 if the counters were added, 0 if the bucket was already compacted.
+
+]]--
+
+local epoch = tonumber(ARGV[2])
+local compacted = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+if compacted ~= nil and epoch <= compacted then
+    return 0
+end
+
+redis.call('HSET', KEYS[1], ARGV[1], epoch)
+for i = 4, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+
+redis.call('EXPIREAT', KEYS[1], ARGV[3])
+return 1
@@ -48,6 +48,7 @@ from sentry.models import Environment, Group, Organization, Project
 from sentry.search.events.filter import convert_search_filter_to_snuba_query, format_search_filter
 from sentry.search.utils import validate_cdc_search_filters
 from sentry.utils import json, metrics, snuba
+from sentry.utils.cache import cache
 from sentry.utils.cursors import Cursor, CursorResult
 from sentry.utils.snuba import SnubaQueryParams, aliased_query_params, bulk_raw_query
 
@@ -92,6 +93,14 @@ def get_search_filter(
     return found_val
 
 
+def _quantize_datetime(value: datetime, interval: int, round_up: bool = False) -> datetime:
+    timestamp = value.timestamp()
+    quantized = timestamp - timestamp % interval
+    if round_up and quantized < timestamp:
+        quantized += interval
+    return datetime.fromtimestamp(quantized, tz=value.tzinfo)
+
+
 class AbstractQueryExecutor(metaclass=ABCMeta):
     """This class serves as a template for Query Executors.
     We subclass it in order to implement query methods (we use it to implement two classes: joined
@@ -456,6 +465,81 @@ class AbstractQueryExecutor(metaclass=ABCMeta):
 
         return [(row["group_id"], row[sort_field]) for row in rows], total  # type: ignore[literal-required]
 
+    def get_snuba_search_cache_key(
+        self,
+        start: datetime,
+        end: datetime,
+        project_ids: Sequence[int],
+        environment_ids: Optional[Sequence[int]],
+        sort_field: str,
+        organization: Organization,
+        cursor: Optional[Cursor] = None,
+        group_ids: Optional[Sequence[int]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        get_sample: bool = False,
+        search_filters: Optional[Sequence[SearchFilter]] = None,
+        referrer: Optional[str] = None,
+        actor: Optional[Any] = None,
+        aggregate_kwargs: Optional[PrioritySortWeights] = None,
+    ) -> str:
+        """
+        Returns a fingerprint of the arguments of `snuba_search` that doesn't
+        depend on the order of projects, environments, candidate groups and
+        search filters. The referrer and actor don't change the results and
+        are left out, so that searches of different users share results.
+        """
+        fingerprint = [
+            type(self).__name__,
+            organization.id,
+            sorted(project_ids),
+            sorted(environment_ids) if environment_ids is not None else None,
+            sort_field,
+            start.timestamp(),
+            end.timestamp(),
+            str(cursor) if cursor is not None else None,
+            sorted(group_ids) if group_ids else None,
+            limit,
+            offset,
+            get_sample,
+            sorted(repr(sf) for sf in search_filters or ()),
+            sorted(aggregate_kwargs.items()) if aggregate_kwargs else None,
+        ]
+        return "search:snuba:%s" % md5(json.dumps(fingerprint).encode("utf-8")).hexdigest()
+
+    def cached_snuba_search(self, **kwargs: Any) -> Tuple[List[Tuple[int, Any]], int]:
+        """
+        Returns the results of `snuba_search` from the cache if the same search
+        was run within the last ``snuba.search.result-cache-ttl`` seconds.
+
+        Results stay in the cache for ``snuba.search.result-cache-stale-ttl``
+        seconds longer. Once stale, the next search refreshes them while
+        concurrent searches keep returning the stale results.
+        """
+        ttl = options.get("snuba.search.result-cache-ttl")
+        if not ttl:
+            return self.snuba_search(**kwargs)
+
+        key = self.get_snuba_search_cache_key(**kwargs)
+        refresh_key = f"{key}:refresh"
+        now = time.time()
+
+        cached = cache.get(key)
+        if cached is not None:
+            cached_at, result = cached
+            if now - cached_at < ttl:
+                metrics.incr("snuba.search.result_cache", tags={"status": "hit"})
+                return result
+            if not cache.add(refresh_key, True, ttl):
+                metrics.incr("snuba.search.result_cache", tags={"status": "stale"})
+                return result
+
+        metrics.incr("snuba.search.result_cache", tags={"status": "miss"})
+        result = self.snuba_search(**kwargs)
+        cache.set(key, (now, result), ttl + options.get("snuba.search.result-cache-stale-ttl"))
+        cache.delete(refresh_key)
+        return result
+
     def has_sort_strategy(self, sort_by: str) -> bool:
         return sort_by in self.sort_strategies.keys()
 
@@ -599,6 +683,15 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             # is invalid.
             return self.empty_result
 
+        # Align time windows relative to now, so that searches made within
+        # the same interval share cached results.
+        cache_ttl = options.get("snuba.search.result-cache-ttl")
+        if cache_ttl:
+            if not end_params:
+                end = _quantize_datetime(end, cache_ttl, round_up=True)
+            if start == retention_date:
+                start = _quantize_datetime(start, cache_ttl, round_up=True)
+
         # If the requested sort is `date` (`last_seen`) and there
         # are no other Snuba-based search predicates, we can simply
         # return the results from Postgres.
@@ -726,7 +819,7 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             chunk_limit = max(chunk_limit, len(group_ids))
 
             # {group_id: group_score, ...}
-            snuba_groups, total = self.snuba_search(
+            snuba_groups, total = self.cached_snuba_search(
                 start=start,
                 end=end,
                 project_ids=[p.id for p in projects],
@@ -894,7 +987,7 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             if not too_many_candidates:
                 kwargs["group_ids"] = group_ids
 
-            snuba_groups, snuba_total = self.snuba_search(**kwargs)
+            snuba_groups, snuba_total = self.cached_snuba_search(**kwargs)
             snuba_count = len(snuba_groups)
             if snuba_count == 0:
                 # Maybe check for 0 hits and return EMPTY_RESULT in ::query? self.empty_result
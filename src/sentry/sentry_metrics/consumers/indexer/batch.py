@@ -5,6 +5,7 @@ from collections import defaultdict
 from typing import (
     Any,
     Dict,
+    Iterable,
     List,
     Mapping,
     MutableMapping,
@@ -12,8 +13,8 @@ from typing import (
     Optional,
     Sequence,
     Set,
+    Tuple,
     Union,
-    cast,
 )
 
 import rapidjson
@@ -23,15 +24,13 @@ from arroyo.types import BrokerValue, Message
 from django.conf import settings
 from sentry_kafka_schemas.codecs import Codec, ValidationError
 from sentry_kafka_schemas.schema_types.ingest_metrics_v1 import IngestMetric
-from sentry_kafka_schemas.schema_types.snuba_generic_metrics_v1 import GenericMetric
-from sentry_kafka_schemas.schema_types.snuba_metrics_v1 import Metric
 
 from sentry.sentry_metrics.consumers.indexer.common import IndexerOutputMessageBatch, MessageBatch
 from sentry.sentry_metrics.consumers.indexer.parsed_message import ParsedMessage
 from sentry.sentry_metrics.consumers.indexer.routing_producer import RoutingPayload
 from sentry.sentry_metrics.indexer.base import Metadata
 from sentry.sentry_metrics.use_case_id_registry import UseCaseID
-from sentry.utils import json, metrics
+from sentry.utils import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +43,9 @@ MRI_RE_PATTERN = re.compile("^([c|s|d|g|e]):([a-zA-Z0-9_]+)/.*$")
 
 OrgId = int
 
+# The fields of an ingest message that are copied to the output message unchanged.
+PASSTHROUGH_FIELDS = ("org_id", "project_id", "timestamp", "type", "value")
+
 
 class PartitionIdxOffset(NamedTuple):
     partition_idx: int
@@ -65,8 +67,12 @@ def _should_sample_debug_log() -> bool:
 
 
 def invalid_metric_tags(tags: Mapping[str, str]) -> Sequence[str]:
+    return _invalid_tag_strings(tags.items())
+
+
+def _invalid_tag_strings(tags: Iterable[Tuple[str, str]]) -> Sequence[str]:
     invalid_strs: List[str] = []
-    for key, value in tags.items():
+    for key, value in tags:
         if key is None or len(key) > MAX_TAG_KEY_LENGTH:
             invalid_strs.append(key)
         if value is None or len(value) > MAX_TAG_VALUE_LENGTH:
@@ -75,6 +81,10 @@ def invalid_metric_tags(tags: Mapping[str, str]) -> Sequence[str]:
     return invalid_strs
 
 
+def _is_global_quota(metadata: Optional[Metadata]) -> bool:
+    return bool(metadata and metadata.fetch_type_ext and metadata.fetch_type_ext.is_global)
+
+
 # TODO: Move this to where we do use case registration
 def extract_use_case_id(mri: str) -> UseCaseID:
     """
@@ -87,6 +97,57 @@ def extract_use_case_id(mri: str) -> UseCaseID:
     raise ValidationError(f"Invalid mri: {mri}")
 
 
+class MessageColumns:
+    """
+    The parsed messages of a batch in columnar form.
+
+    Every message is a row, ``rows`` maps the partition offset of a message to
+    its row. The tags of all messages are stored in two flat lists, the tags
+    of row ``i`` are ``tag_keys[tag_offsets[i]:tag_offsets[i + 1]]`` (and the
+    same slice of ``tag_values``). The fields that are copied to the output
+    unchanged are serialized once, as the members of a JSON object, so that
+    `IndexerBatch.reconstruct_messages` only has to serialize the resolved
+    ids and splice them in.
+    """
+
+    def __init__(self) -> None:
+        self.rows: Dict[PartitionIdxOffset, int] = {}
+        self.names: List[str] = []
+        self.types: List[str] = []
+        self.org_ids: List[int] = []
+        self.use_case_ids: List[UseCaseID] = []
+        self.tag_keys: List[str] = []
+        self.tag_values: List[str] = []
+        self.tag_offsets: List[int] = [0]
+        self.passthrough: List[bytes] = []
+
+    def append(self, partition_offset: PartitionIdxOffset, message: ParsedMessage) -> None:
+        """
+        Adds a message as a new row. Raises `KeyError` if a required field
+        is missing, in which case no row is added.
+        """
+        fields = {field: message[field] for field in PASSTHROUGH_FIELDS}  # type: ignore
+        fields["use_case_id"] = message["use_case_id"].value
+        # XXX: relay actually sends this value unconditionally
+        fields["retention_days"] = message.get("retention_days", 90)
+        passthrough = rapidjson.dumps(fields)[1:-1].encode()
+        tags = message.get("tags", {})
+
+        self.rows[partition_offset] = len(self.names)
+        self.names.append(message["name"])
+        self.types.append(message["type"])
+        self.org_ids.append(message["org_id"])
+        self.use_case_ids.append(message["use_case_id"])
+        self.tag_keys.extend(tags.keys())
+        self.tag_values.extend(tags.values())
+        self.tag_offsets.append(len(self.tag_keys))
+        self.passthrough.append(passthrough)
+
+    def get_tags(self, row: int) -> Tuple[Sequence[str], Sequence[str]]:
+        start, end = self.tag_offsets[row], self.tag_offsets[row + 1]
+        return self.tag_keys[start:end], self.tag_values[start:end]
+
+
 class IndexerBatch:
     def __init__(
         self,
@@ -110,15 +171,16 @@ class IndexerBatch:
     def _extract_messages(self) -> None:
         self.skipped_offsets: Set[PartitionIdxOffset] = set()
         self.parsed_payloads_by_offset: MutableMapping[PartitionIdxOffset, ParsedMessage] = {}
+        self.columns = MessageColumns()
 
         for msg in self.outer_message.payload:
             assert isinstance(msg.value, BrokerValue)
             partition_offset = PartitionIdxOffset(msg.value.partition.index, msg.value.offset)
 
             try:
-                parsed_payload: ParsedMessage = json.loads(
-                    msg.payload.value.decode("utf-8"), use_rapid_json=True
-                )
+                # Decode the payload bytes directly, without the intermediate
+                # string and the span that `json.loads` creates per message.
+                parsed_payload: ParsedMessage = rapidjson.loads(msg.payload.value)
             except rapidjson.JSONDecodeError:
                 self.skipped_offsets.add(partition_offset)
                 logger.error(
@@ -155,6 +217,17 @@ class IndexerBatch:
                 )
                 continue
 
+            try:
+                self.columns.append(partition_offset, parsed_payload)
+            except KeyError:
+                self.skipped_offsets.add(partition_offset)
+                logger.error(
+                    "process_messages.missing_field",
+                    extra={"payload_value": str(msg.payload.value)},
+                    exc_info=True,
+                )
+                continue
+
             self.__message_count[use_case_id] += 1
             self.__message_size_max[use_case_id] = max(
                 len(msg.payload.value), self.__message_size_max[use_case_id]
@@ -203,17 +276,18 @@ class IndexerBatch:
             lambda: defaultdict(set)
         )
 
-        for partition_offset, message in self.parsed_payloads_by_offset.items():
+        columns = self.columns
+        for partition_offset, row in columns.rows.items():
             if partition_offset in self.skipped_offsets:
                 continue
 
             partition_idx, offset = partition_offset
 
-            metric_name = message["name"]
-            metric_type = message["type"]
-            use_case_id = message["use_case_id"]
-            org_id = message["org_id"]
-            tags = message.get("tags", {})
+            metric_name = columns.names[row]
+            metric_type = columns.types[row]
+            use_case_id = columns.use_case_ids[row]
+            org_id = columns.org_ids[row]
+            tag_keys, tag_values = columns.get_tags(row)
 
             if not valid_metric_name(metric_name):
                 logger.error(
@@ -242,9 +316,9 @@ class IndexerBatch:
                 self.skipped_offsets.add(partition_offset)
                 continue
 
-            if invalid_strs := invalid_metric_tags(tags):
+            if invalid_strs := _invalid_tag_strings(zip(tag_keys, tag_values)):
                 # sentry doesn't seem to actually capture nested logger.error extra args
-                sentry_sdk.set_extra("all_metric_tags", tags)
+                sentry_sdk.set_extra("all_metric_tags", dict(zip(tag_keys, tag_values)))
                 logger.error(
                     "process_messages.invalid_tags",
                     extra={
@@ -261,11 +335,11 @@ class IndexerBatch:
 
             strings_in_message = {
                 metric_name,
-                *tags.keys(),
+                *tag_keys,
             }
 
             if self.__should_index_tag_values:
-                strings_in_message.update(tags.values())
+                strings_in_message.update(tag_values)
 
             strings[use_case_id][org_id].update(strings_in_message)
 
@@ -285,6 +359,7 @@ class IndexerBatch:
         bulk_record_meta: Mapping[UseCaseID, Mapping[OrgId, Mapping[str, Metadata]]],
     ) -> IndexerOutputMessageBatch:
         new_messages: IndexerOutputMessageBatch = []
+        columns = self.columns
 
         for message in self.outer_message.payload:
             used_tags: Set[str] = set()
@@ -302,13 +377,14 @@ class IndexerBatch:
                     },
                 )
                 continue
-            old_payload_value = self.parsed_payloads_by_offset.pop(partition_offset)
+            self.parsed_payloads_by_offset.pop(partition_offset, None)
+            row = columns.rows[partition_offset]
 
-            metric_name = old_payload_value["name"]
-            org_id = old_payload_value["org_id"]
-            use_case_id = old_payload_value["use_case_id"]
+            metric_name = columns.names[row]
+            org_id = columns.org_ids[row]
+            use_case_id = columns.use_case_ids[row]
             sentry_sdk.set_tag("sentry_metrics.organization_id", org_id)
-            tags = old_payload_value.get("tags", {})
+            tag_keys, tag_values = columns.get_tags(row)
             used_tags.add(metric_name)
 
             new_tags: Dict[str, Union[str, int]] = {}
@@ -316,16 +392,14 @@ class IndexerBatch:
             exceeded_org_quotas = 0
 
             try:
-                for k, v in tags.items():
-                    used_tags.update({k, v})
-                    new_k = mapping[use_case_id][org_id][k]
+                org_mapping = mapping[use_case_id][org_id]
+                org_meta = bulk_record_meta.get(use_case_id, {}).get(org_id, {})
+                for k, v in zip(tag_keys, tag_values):
+                    used_tags.add(k)
+                    used_tags.add(v)
+                    new_k = org_mapping[k]
                     if new_k is None:
-                        metadata = bulk_record_meta[use_case_id][org_id].get(k)
-                        if (
-                            metadata
-                            and metadata.fetch_type_ext
-                            and metadata.fetch_type_ext.is_global
-                        ):
+                        if _is_global_quota(org_meta.get(k)):
                             exceeded_global_quotas += 1
                         else:
                             exceeded_org_quotas += 1
@@ -333,14 +407,9 @@ class IndexerBatch:
 
                     value_to_write: Union[int, str] = v
                     if self.__should_index_tag_values:
-                        new_v = mapping[use_case_id][org_id][v]
+                        new_v = org_mapping[v]
                         if new_v is None:
-                            metadata = bulk_record_meta[use_case_id][org_id].get(v)
-                            if (
-                                metadata
-                                and metadata.fetch_type_ext
-                                and metadata.fetch_type_ext.is_global
-                            ):
+                            if _is_global_quota(org_meta.get(v)):
                                 exceeded_global_quotas += 1
                             else:
                                 exceeded_org_quotas += 1
@@ -350,7 +419,11 @@ class IndexerBatch:
 
                     new_tags[str(new_k)] = value_to_write
             except KeyError:
-                logger.error("process_messages.key_error", extra={"tags": tags}, exc_info=True)
+                logger.error(
+                    "process_messages.key_error",
+                    extra={"tags": dict(zip(tag_keys, tag_values))},
+                    exc_info=True,
+                )
                 continue
 
             if exceeded_org_quotas or exceeded_global_quotas:
@@ -369,15 +442,15 @@ class IndexerBatch:
                             "string_type": "tags",
                             "num_global_quotas": exceeded_global_quotas,
                             "num_org_quotas": exceeded_org_quotas,
-                            "org_batch_size": len(mapping[use_case_id][org_id]),
+                            "org_batch_size": len(org_mapping),
                         },
                     )
                 continue
 
             fetch_types_encountered = set()
             for tag in used_tags:
-                if tag in bulk_record_meta[use_case_id][org_id]:
-                    metadata = bulk_record_meta[use_case_id][org_id][tag]
+                metadata = org_meta.get(tag)
+                if metadata is not None:
                     fetch_types_encountered.add(metadata.fetch_type)
                     output_message_meta[metadata.fetch_type.value][str(metadata.id)] = tag
 
@@ -385,9 +458,9 @@ class IndexerBatch:
                 "".join(sorted(t.value for t in fetch_types_encountered)), "utf-8"
             )
 
-            numeric_metric_id = mapping[use_case_id][org_id][metric_name]
+            numeric_metric_id = org_mapping[metric_name]
             if numeric_metric_id is None:
-                metadata = bulk_record_meta[use_case_id][org_id].get(metric_name)
+                metadata = org_meta.get(metric_name)
                 metrics.incr(
                     "sentry_metrics.indexer.process_messages.dropped_message",
                     tags={
@@ -400,67 +473,48 @@ class IndexerBatch:
                         "process_messages.dropped_message",
                         extra={
                             "string_type": "metric_id",
-                            "is_global_quota": bool(
-                                metadata
-                                and metadata.fetch_type_ext
-                                and metadata.fetch_type_ext.is_global
-                            ),
-                            "org_batch_size": len(mapping[use_case_id][org_id]),
+                            "is_global_quota": _is_global_quota(metadata),
+                            "org_batch_size": len(org_mapping),
                         },
                     )
                 continue
 
-            new_payload_value: Mapping[str, Any]
-
             # timestamp when the message was produced to ingest-* topic,
             # used for end-to-end latency metrics
             sentry_received_timestamp = message.value.timestamp.timestamp()
 
-            if self.__should_index_tag_values:
-                new_payload_v1: Metric = {
-                    "tags": new_tags,
-                    # XXX: relay actually sends this value unconditionally
-                    "retention_days": old_payload_value.get("retention_days", 90),
-                    "mapping_meta": output_message_meta,
-                    "use_case_id": old_payload_value["use_case_id"].value,
-                    "metric_id": numeric_metric_id,
-                    "org_id": old_payload_value["org_id"],
-                    "timestamp": old_payload_value["timestamp"],
-                    "project_id": old_payload_value["project_id"],
-                    "type": old_payload_value["type"],
-                    "value": old_payload_value["value"],
-                    "sentry_received_timestamp": sentry_received_timestamp,
-                }
-
-                new_payload_value = new_payload_v1
-            else:
-                # When sending tag values as strings, set the version on the payload
-                # to 2. This is used by the consumer to determine how to decode the
-                # tag values.
-                new_payload_v2: GenericMetric = {
-                    "tags": cast(Dict[str, str], new_tags),
-                    "version": 2,
-                    "retention_days": old_payload_value.get("retention_days", 90),
-                    "mapping_meta": output_message_meta,
-                    "use_case_id": old_payload_value["use_case_id"].value,
-                    "metric_id": numeric_metric_id,
-                    "org_id": old_payload_value["org_id"],
-                    "timestamp": old_payload_value["timestamp"],
-                    "project_id": old_payload_value["project_id"],
-                    "type": old_payload_value["type"],
-                    "value": old_payload_value["value"],
-                    "sentry_received_timestamp": sentry_received_timestamp,
-                }
-                new_payload_value = new_payload_v2
+            # The resolved ids are spliced into the pre-serialized fields of
+            # the input message instead of building and serializing the whole
+            # output message. See the `Metric` (tag values indexed) and
+            # `GenericMetric` (tag values as strings) schemas.
+            new_payload_value = b"".join(
+                (
+                    b'{"tags":',
+                    rapidjson.dumps(new_tags).encode(),
+                    b',"mapping_meta":',
+                    rapidjson.dumps(output_message_meta).encode(),
+                    b',"metric_id":',
+                    str(numeric_metric_id).encode(),
+                    # When sending tag values as strings, set the version on the payload
+                    # to 2. This is used by the consumer to determine how to decode the
+                    # tag values.
+                    b"" if self.__should_index_tag_values else b',"version":2',
+                    b',"sentry_received_timestamp":',
+                    rapidjson.dumps(sentry_received_timestamp).encode(),
+                    b",",
+                    columns.passthrough[row],
+                    b"}",
+                )
+            )
 
             kafka_payload = KafkaPayload(
                 key=message.payload.key,
-                value=rapidjson.dumps(new_payload_value).encode(),
+                value=new_payload_value,
                 headers=[
                     *message.payload.headers,
                     ("mapping_sources", mapping_header_content),
                     # XXX: type mismatch, but seems to work fine in prod
-                    ("metric_type", new_payload_value["type"]),  # type: ignore
+                    ("metric_type", columns.types[row]),  # type: ignore
                 ],
             )
             if self.is_output_sliced:
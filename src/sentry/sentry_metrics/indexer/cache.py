@@ -1,12 +1,16 @@
 import logging
 import random
-from typing import Mapping, MutableMapping, Optional, Sequence, Set
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Mapping, MutableMapping, Optional, Sequence, Set, Tuple
 
 from django.conf import settings
 from django.core.cache import caches
 
 from sentry.sentry_metrics.indexer.base import (
     FetchType,
+    Metadata,
     OrgId,
     StringIndexer,
     UseCaseKeyCollection,
@@ -24,6 +28,14 @@ logger = logging.getLogger(__name__)
 _INDEXER_CACHE_METRIC = "sentry_metrics.indexer.memcache"
 # only used to compare to the older version of the PGIndexer
 _INDEXER_CACHE_FETCH_METRIC = "sentry_metrics.indexer.memcache.fetch"
+_INDEXER_LOCAL_CACHE_METRIC = "sentry_metrics.indexer.local_cache"
+
+
+def _randomized_ttl(ttl: int) -> int:
+    # introduce jitter in the cache_ttl so that when we have large
+    # amount of new keys written into the cache, they don't expire all at once
+    jitter = random.uniform(0, 0.25) * ttl
+    return int(ttl + jitter)
 
 
 class StringIndexerCache:
@@ -34,11 +46,7 @@ class StringIndexerCache:
 
     @property
     def randomized_ttl(self) -> int:
-        # introduce jitter in the cache_ttl so that when we have large
-        # amount of new keys written into the cache, they don't expire all at once
-        cache_ttl = settings.SENTRY_METRICS_INDEXER_CACHE_TTL
-        jitter = random.uniform(0, 0.25) * cache_ttl
-        return int(cache_ttl + jitter)
+        return _randomized_ttl(settings.SENTRY_METRICS_INDEXER_CACHE_TTL)
 
     def make_cache_key(self, key: str) -> str:
         use_case_id, org_id, string = key.split(":", 2)
@@ -97,17 +105,148 @@ class StringIndexerCache:
         self.cache.delete_many(cache_keys, version=self.version)
 
 
+class LocalStringIndexerCache:
+    """
+    A bounded, process-local LRU of indexer results, keyed like
+    `StringIndexerCache` ("use_case_id:org_id:string").
+
+    Besides ids, it keeps negative entries for strings that could not be
+    indexed (such as rate limited strings) along with their fetch metadata,
+    which expire after ``negative_ttl`` seconds. Expiration times are
+    jittered like `StringIndexerCache.randomized_ttl`.
+    """
+
+    def __init__(self, max_size: int, ttl: int, negative_ttl: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[str, Tuple[float, Metadata]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[str]) -> MutableMapping[str, Metadata]:
+        now = time.time()
+        results: MutableMapping[str, Metadata] = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, metadata = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                results[key] = metadata
+        return results
+
+    def set_many(self, key_values: Mapping[str, Metadata]) -> None:
+        now = time.time()
+        with self._lock:
+            for key, metadata in key_values.items():
+                ttl = self.ttl if metadata.id is not None else self.negative_ttl
+                self._entries[key] = (now + _randomized_ttl(ttl), metadata)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _get_key_collection(keys: Sequence[str]) -> UseCaseKeyCollection:
+    mapping: MutableMapping[UseCaseID, MutableMapping[OrgId, Set[str]]] = defaultdict(
+        lambda: defaultdict(set)
+    )
+    for key in keys:
+        use_case_id, org_id, string = key.split(":", 2)
+        mapping[UseCaseID(use_case_id)][int(org_id)].add(string)
+    return UseCaseKeyCollection(mapping)
+
+
 class CachingIndexer(StringIndexer):
-    def __init__(self, cache: StringIndexerCache, indexer: StringIndexer) -> None:
+    def __init__(
+        self,
+        cache: StringIndexerCache,
+        indexer: StringIndexer,
+        local_cache: Optional[LocalStringIndexerCache] = None,
+    ) -> None:
         self.cache = cache
         self.indexer = indexer
+        self.local_cache = local_cache
+
+    def _get_local_results(
+        self, keys: Sequence[str]
+    ) -> Tuple[UseCaseKeyResults, UseCaseKeyResults, Sequence[str]]:
+        """
+        Returns the ids and the negative entries found in the local cache,
+        and the keys that are not cached locally.
+        """
+        local_results = UseCaseKeyResults()
+        negative_results = UseCaseKeyResults()
+        if self.local_cache is None:
+            return local_results, negative_results, keys
+
+        cached = self.local_cache.get_many(keys)
+
+        hits: MutableMapping[str, int] = defaultdict(int)
+        misses: MutableMapping[str, int] = defaultdict(int)
+        uncached_keys = []
+        for key in keys:
+            use_case_id = key.split(":", 1)[0]
+            metadata = cached.get(key)
+            # Strings that `resolve` didn't find still have to be recorded.
+            if metadata is None or (
+                metadata.id is None and metadata.fetch_type != FetchType.RATE_LIMITED
+            ):
+                misses[use_case_id] += 1
+                uncached_keys.append(key)
+                continue
+            hits[use_case_id] += 1
+            results = local_results if metadata.id is not None else negative_results
+            results.add_use_case_key_result(
+                UseCaseKeyResult.from_string(key, metadata.id),
+                metadata.fetch_type,
+                metadata.fetch_type_ext,
+            )
+
+        for cache_hit, counts in (("true", hits), ("false", misses)):
+            for use_case_id, amount in counts.items():
+                metrics.incr(
+                    _INDEXER_LOCAL_CACHE_METRIC,
+                    tags={"cache_hit": cache_hit, "use_case_id": use_case_id},
+                    amount=amount,
+                )
+
+        return local_results, negative_results, uncached_keys
+
+    def _set_local_results(self, results: UseCaseKeyResults) -> None:
+        if self.local_cache is None:
+            return
+
+        key_values = {}
+        for use_case_id, org_metadata in results.get_fetch_metadata().items():
+            for org_id, string_metadata in org_metadata.items():
+                for string, metadata in string_metadata.items():
+                    key = f"{use_case_id.value}:{org_id}:{string}"
+                    if metadata.id is not None:
+                        key_values[key] = Metadata(id=metadata.id, fetch_type=FetchType.CACHE_HIT)
+                    elif metadata.fetch_type == FetchType.RATE_LIMITED:
+                        # Other strings without ids are looked up again.
+                        key_values[key] = metadata
+        self.local_cache.set_many(key_values)
 
     def bulk_record(
         self, strings: Mapping[UseCaseID, Mapping[OrgId, Set[str]]]
     ) -> UseCaseKeyResults:
         cache_keys = UseCaseKeyCollection(strings)
         metrics.gauge("sentry_metrics.indexer.lookups_per_batch", value=cache_keys.size)
-        cache_key_strs = cache_keys.as_strings()
+        local_key_results, negative_key_results, cache_key_strs = self._get_local_results(
+            cache_keys.as_strings()
+        )
+        if not cache_key_strs:
+            return local_key_results.merge(negative_key_results)
+
         cache_results = self.cache.get_many(cache_key_strs)
 
         hits = [k for k, v in cache_results.items() if v is not None]
@@ -135,11 +274,15 @@ class CachingIndexer(StringIndexer):
             [UseCaseKeyResult.from_string(k, v) for k, v in cache_results.items() if v is not None],
             FetchType.CACHE_HIT,
         )
+        self._set_local_results(cache_key_results)
 
-        db_record_keys = cache_key_results.get_unmapped_use_case_keys(cache_keys)
+        db_record_keys = cache_key_results.get_unmapped_use_case_keys(
+            _get_key_collection(cache_key_strs)
+        )
+        cache_key_results = cache_key_results.merge(local_key_results)
 
         if db_record_keys.size == 0:
-            return cache_key_results
+            return cache_key_results.merge(negative_key_results)
 
         db_record_key_results = self.indexer.bulk_record(
             {
@@ -149,8 +292,9 @@ class CachingIndexer(StringIndexer):
         )
 
         self.cache.set_many(db_record_key_results.get_mapped_strings_to_ints())
+        self._set_local_results(db_record_key_results)
 
-        return cache_key_results.merge(db_record_key_results)
+        return cache_key_results.merge(negative_key_results).merge(db_record_key_results)
 
     def record(self, use_case_id: UseCaseID, org_id: int, string: str) -> Optional[int]:
         result = self.bulk_record(strings={use_case_id: {org_id: {string}}})
@@ -159,17 +303,35 @@ class CachingIndexer(StringIndexer):
     @metric_path_key_compatible_resolve
     def resolve(self, use_case_id: UseCaseID, org_id: int, string: str) -> Optional[int]:
         key = f"{use_case_id.value}:{org_id}:{string}"
+
+        if self.local_cache is not None:
+            local_result = self.local_cache.get_many([key]).get(key)
+            metrics.incr(
+                _INDEXER_LOCAL_CACHE_METRIC,
+                tags={
+                    "cache_hit": "true" if local_result is not None else "false",
+                    "use_case_id": use_case_id.value,
+                },
+            )
+            if local_result is not None:
+                return local_result.id
+
         result = self.cache.get(key)
 
         if result and isinstance(result, int):
             metrics.incr(_INDEXER_CACHE_METRIC, tags={"cache_hit": "true", "caller": "resolve"})
-            return result
-
-        metrics.incr(_INDEXER_CACHE_METRIC, tags={"cache_hit": "false", "caller": "resolve"})
-        id = self.indexer.resolve(use_case_id, org_id, string)
-
-        if id is not None:
-            self.cache.set(key, id)
+            id: Optional[int] = result
+        else:
+            metrics.incr(_INDEXER_CACHE_METRIC, tags={"cache_hit": "false", "caller": "resolve"})
+            id = self.indexer.resolve(use_case_id, org_id, string)
+
+            if id is not None:
+                self.cache.set(key, id)
+
+        if self.local_cache is not None:
+            # Strings that aren't indexed are cached as negative entries.
+            fetch_type = FetchType.CACHE_HIT if id is not None else FetchType.DB_READ
+            self.local_cache.set_many({key: Metadata(id=id, fetch_type=fetch_type)})
 
         return id
 
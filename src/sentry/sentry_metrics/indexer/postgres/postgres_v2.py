@@ -20,7 +20,11 @@ from sentry.sentry_metrics.indexer.base import (
     metric_path_key_compatible_resolve,
     metric_path_key_compatible_rev_resolve,
 )
-from sentry.sentry_metrics.indexer.cache import CachingIndexer, StringIndexerCache
+from sentry.sentry_metrics.indexer.cache import (
+    CachingIndexer,
+    LocalStringIndexerCache,
+    StringIndexerCache,
+)
 from sentry.sentry_metrics.indexer.limiters.writes import writes_limiter_factory
 from sentry.sentry_metrics.indexer.postgres.models import TABLE_MAPPING, BaseIndexer, IndexerTable
 from sentry.sentry_metrics.indexer.strings import StaticStringIndexer
@@ -309,4 +313,11 @@ class PGStringIndexerV2(StringIndexer):
 
 class PostgresIndexer(StaticStringIndexer):
     def __init__(self) -> None:
-        super().__init__(CachingIndexer(indexer_cache, PGStringIndexerV2()))
+        local_cache = None
+        if settings.SENTRY_METRICS_INDEXER_LOCAL_CACHE_SIZE:
+            local_cache = LocalStringIndexerCache(
+                max_size=settings.SENTRY_METRICS_INDEXER_LOCAL_CACHE_SIZE,
+                ttl=settings.SENTRY_METRICS_INDEXER_LOCAL_CACHE_TTL,
+                negative_ttl=settings.SENTRY_METRICS_INDEXER_LOCAL_CACHE_NEGATIVE_TTL,
+            )
+        super().__init__(CachingIndexer(indexer_cache, PGStringIndexerV2(), local_cache))
@@ -11,6 +11,9 @@ class DummyIndexBackend(AbstractIndexBackend):
     def record(self, scope, key, items, timestamp=None):
         return {}
 
+    def record_multi(self, scope, records, timestamp=None):
+        return {}
+
     def merge(self, scope, destination, items, timestamp=None):
         return False
 
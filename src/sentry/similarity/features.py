@@ -95,30 +95,22 @@ class FeatureSet:
         return results
 
     def record(self, events):
+        """
+        Records the features of events. Events of different groups are
+        recorded in one index call per project.
+        """
         if not events:
             return []
 
-        scope = None
-        key = None
-
-        items = []
+        # scope -> key -> items
+        records = {}
+        timestamps = {}
         for event in events:
             if not event.group_id:
                 continue
             for label, features in self.extract(event).items():
-                if scope is None:
-                    scope = self.__get_scope(event.project)
-                else:
-                    assert (
-                        self.__get_scope(event.project) == scope
-                    ), "all events must be associated with the same project"
-
-                if key is None:
-                    key = self.__get_key(event.group)
-                else:
-                    assert (
-                        self.__get_key(event.group) == key
-                    ), "all events must be associated with the same group"
+                scope = self.__get_scope(event.project)
+                key = self.__get_key(event.group)
 
                 try:
                     features = [self.encoder.dumps(feature) for feature in features]
@@ -136,9 +128,15 @@ class FeatureSet:
                     )
                 else:
                     if features:
-                        items.append((self.aliases[label], features))
+                        records.setdefault(scope, {}).setdefault(key, []).append(
+                            (self.aliases[label], features)
+                        )
+                        timestamps[scope] = int(to_timestamp(event.datetime))
 
-        return self.index.record(scope, key, items, timestamp=int(to_timestamp(event.datetime)))  # type: ignore
+        return [
+            self.index.record_multi(scope, list(items.items()), timestamp=timestamps[scope])
+            for scope, items in records.items()
+        ]
 
     def classify(self, events, limit=None, thresholds=None):
         if not events:
@@ -7,7 +7,12 @@ class MinHashSignatureBuilder:
         self.rows = rows
 
     def __call__(self, features):
+        # Repeated features (such as the frames of recursive calls) don't
+        # change the signature, so every distinct feature is hashed only once
+        # per column.
+        features = set(features)
+        hash, rows = mmh3.hash, self.rows
         return [
-            min(mmh3.hash(feature, column) % self.rows for feature in features)
+            min([hash(feature, column) % rows for feature in features])
             for column in range(self.columns)
         ]
@@ -1,5 +1,5 @@
 import logging
-from typing import Callable, Dict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 
 import pytz
 import sentry_sdk
@@ -19,8 +19,12 @@ from sentry.utils import metrics
 
 logger = logging.getLogger(__name__)
 TQuerySubscriptionCallable = Callable[[SubscriptionUpdate, QuerySubscription], None]
+TQuerySubscriptionBatchCallable = Callable[
+    [Sequence[Tuple[SubscriptionUpdate, QuerySubscription]]], None
+]
 
 subscriber_registry: Dict[str, TQuerySubscriptionCallable] = {}
+batch_subscriber_registry: Dict[str, TQuerySubscriptionBatchCallable] = {}
 
 
 def register_subscriber(
@@ -35,6 +39,24 @@ def register_subscriber(
     return inner
 
 
+def register_batch_subscriber(
+    subscriber_key: str,
+) -> Callable[[TQuerySubscriptionBatchCallable], TQuerySubscriptionBatchCallable]:
+    """
+    Registers a callback that handles many updates of a subscription type at once,
+    used by `handle_messages`. The type still needs a subscriber registered with
+    `register_subscriber` for `handle_message`.
+    """
+
+    def inner(func: TQuerySubscriptionBatchCallable) -> TQuerySubscriptionBatchCallable:
+        if subscriber_key in batch_subscriber_registry:
+            raise Exception("Batch handler already registered for %s" % subscriber_key)
+        batch_subscriber_registry[subscriber_key] = func
+        return func
+
+    return inner
+
+
 def parse_message_value(value: bytes, jsoncodec: Codec[SubscriptionResult]) -> SubscriptionUpdate:
     """
     Parses the value received via the Kafka consumer and verifies that it
@@ -97,60 +119,21 @@ def handle_message(
             return
         scope.set_tag("query_subscription_id", contents["subscription_id"])
 
+        subscription: Optional[QuerySubscription]
         try:
             with metrics.timer(
                 "snuba_query_subscriber.fetch_subscription", tags={"dataset": dataset}
             ):
-                subscription: QuerySubscription = QuerySubscription.objects.get_from_cache(
+                subscription = QuerySubscription.objects.get_from_cache(
                     subscription_id=contents["subscription_id"]
                 )
-                if subscription.status != QuerySubscription.Status.ACTIVE.value:
-                    metrics.incr("snuba_query_subscriber.subscription_inactive")
-                    return
         except QuerySubscription.DoesNotExist:
-            metrics.incr(
-                "snuba_query_subscriber.subscription_doesnt_exist", tags={"dataset": dataset}
-            )
-            logger.warning(
-                "Received subscription update, but subscription does not exist",
-                extra={
-                    "offset": message_offset,
-                    "partition": message_partition,
-                    "value": message_value,
-                },
-            )
-            try:
-                if topic in topic_to_dataset:
-                    _delete_from_snuba(
-                        topic_to_dataset[topic],
-                        contents["subscription_id"],
-                        EntityKey(contents["entity"]),
-                    )
-                else:
-                    logger.error(
-                        "Topic not registered with QuerySubscriptionConsumer, can't remove "
-                        "non-existent subscription from Snuba",
-                        extra={"topic": topic, "subscription_id": contents["subscription_id"]},
-                    )
-            except InvalidMessageError as e:
-                logger.exception(e)
-            except Exception:
-                logger.exception("Failed to delete unused subscription from snuba.")
-            return
+            subscription = None
 
-        if subscription.type not in subscriber_registry:
-            metrics.incr(
-                "snuba_query_subscriber.subscription_type_not_registered", tags={"dataset": dataset}
-            )
-            logger.error(
-                "Received subscription update, but no subscription handler registered",
-                extra={
-                    "offset": message_offset,
-                    "partition": message_partition,
-                    "value": message_value,
-                },
-            )
+        extra = {"offset": message_offset, "partition": message_partition, "value": message_value}
+        if not _check_subscription(subscription, contents, topic, dataset, extra):
             return
+        assert subscription is not None
 
         sentry_sdk.set_tag("project_id", subscription.project_id)
         sentry_sdk.set_tag("query_subscription_id", contents["subscription_id"])
@@ -174,6 +157,125 @@ def handle_message(
             callback(contents, subscription)
 
 
+def _check_subscription(
+    subscription: Optional[QuerySubscription],
+    contents: SubscriptionUpdate,
+    topic: str,
+    dataset: str,
+    extra: Mapping[str, Any],
+) -> bool:
+    """
+    Returns whether an update of the subscription should be passed to its subscriber.
+    Subscriptions that were removed are also removed from Snuba.
+    """
+    if subscription is None:
+        metrics.incr("snuba_query_subscriber.subscription_doesnt_exist", tags={"dataset": dataset})
+        logger.warning(
+            "Received subscription update, but subscription does not exist",
+            extra=extra,
+        )
+        try:
+            if topic in topic_to_dataset:
+                _delete_from_snuba(
+                    topic_to_dataset[topic],
+                    contents["subscription_id"],
+                    EntityKey(contents["entity"]),
+                )
+            else:
+                logger.error(
+                    "Topic not registered with QuerySubscriptionConsumer, can't remove "
+                    "non-existent subscription from Snuba",
+                    extra={"topic": topic, "subscription_id": contents["subscription_id"]},
+                )
+        except InvalidMessageError as e:
+            logger.exception(e)
+        except Exception:
+            logger.exception("Failed to delete unused subscription from snuba.")
+        return False
+
+    if subscription.status != QuerySubscription.Status.ACTIVE.value:
+        metrics.incr("snuba_query_subscriber.subscription_inactive")
+        return False
+
+    if subscription.type not in subscriber_registry:
+        metrics.incr(
+            "snuba_query_subscriber.subscription_type_not_registered", tags={"dataset": dataset}
+        )
+        logger.error(
+            "Received subscription update, but no subscription handler registered",
+            extra=extra,
+        )
+        return False
+
+    return True
+
+
+def handle_messages(
+    messages: Sequence[Tuple[bytes, int, int]],
+    topic: str,
+    dataset: str,
+    jsoncodec: Codec[SubscriptionResult],
+) -> None:
+    """
+    Handles a batch of `(value, offset, partition)` messages like `handle_message`, with
+    one cache lookup for all of their subscriptions. Updates of subscription types with a
+    batch subscriber are passed to it at once and in order, other updates are passed to
+    their subscriber one by one.
+    """
+    parsed = []
+    for message_value, message_offset, message_partition in messages:
+        extra = {"offset": message_offset, "partition": message_partition, "value": message_value}
+        try:
+            with metrics.timer(
+                "snuba_query_subscriber.parse_message_value", tags={"dataset": dataset}
+            ):
+                contents = parse_message_value(message_value, jsoncodec)
+        except InvalidMessageError:
+            # If the message is in an invalid format, just log the error
+            # and continue
+            logger.exception("Subscription update could not be parsed", extra=extra)
+            continue
+        parsed.append((contents, extra))
+
+    with metrics.timer("snuba_query_subscriber.fetch_subscriptions", tags={"dataset": dataset}):
+        subscriptions = {
+            subscription.subscription_id: subscription
+            for subscription in QuerySubscription.objects.get_many_from_cache(
+                list({contents["subscription_id"] for contents, _ in parsed}),
+                key="subscription_id",
+            )
+        }
+
+    batches: Dict[str, List[Tuple[SubscriptionUpdate, QuerySubscription]]] = {}
+    for contents, extra in parsed:
+        subscription = subscriptions.get(contents["subscription_id"])
+        if not _check_subscription(subscription, contents, topic, dataset, extra):
+            continue
+        assert subscription is not None
+
+        if subscription.type in batch_subscriber_registry:
+            batches.setdefault(subscription.type, []).append((contents, subscription))
+            continue
+
+        try:
+            with metrics.timer(
+                "snuba_query_subscriber.callback.duration",
+                instance=subscription.type,
+                tags={"dataset": dataset},
+            ):
+                subscriber_registry[subscription.type](contents, subscription)
+        except Exception:
+            logger.exception("Failed to handle subscription update", extra=extra)
+
+    for subscription_type, updates in batches.items():
+        with metrics.timer(
+            "snuba_query_subscriber.batch_callback.duration",
+            instance=subscription_type,
+            tags={"dataset": dataset},
+        ):
+            batch_subscriber_registry[subscription_type](updates)
+
+
 class InvalidMessageError(Exception):
     pass
 
@@ -1,7 +1,7 @@
 import logging
 from functools import partial
 from random import random
-from typing import Mapping
+from typing import Callable, List, Mapping, Tuple
 
 import sentry_sdk
 from arroyo import Topic, configure_metrics
@@ -16,7 +16,8 @@ from arroyo.processing.strategies import (
     RunTask,
     RunTaskWithMultiprocessing,
 )
-from arroyo.types import BrokerValue, Commit, Message, Partition
+from arroyo.processing.strategies.reduce import Reduce
+from arroyo.types import BaseValue, BrokerValue, Commit, Message, Partition
 from sentry_kafka_schemas import get_codec
 
 from sentry.snuba.dataset import Dataset
@@ -36,6 +37,7 @@ class QuerySubscriptionStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         input_block_size: int,
         output_block_size: int,
         multi_proc: bool = True,
+        batched: bool = False,
     ):
         self.topic = topic
         self.dataset = topic_to_dataset[self.topic]
@@ -46,12 +48,16 @@ class QuerySubscriptionStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         self.input_block_size = input_block_size
         self.output_block_size = output_block_size
         self.multi_proc = multi_proc
+        self.batched = batched
 
     def create_with_partitions(
         self,
         commit: Commit,
         partitions: Mapping[Partition, int],
     ) -> ProcessingStrategy[KafkaPayload]:
+        if self.batched:
+            return self._create_batched(commit)
+
         callable = partial(process_message, self.dataset, self.topic, self.logical_topic)
         if self.multi_proc:
             return RunTaskWithMultiprocessing(
@@ -67,6 +73,28 @@ class QuerySubscriptionStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         else:
             return RunTask(callable, CommitOffsets(commit))
 
+    def _create_batched(self, commit: Commit) -> ProcessingStrategy[KafkaPayload]:
+        def accumulator(
+            result: List[Tuple[bytes, int, int]], value: BaseValue[KafkaPayload]
+        ) -> List[Tuple[bytes, int, int]]:
+            assert isinstance(value, BrokerValue)
+            result.append((value.payload.value, value.offset, value.partition.index))
+            return result
+
+        initial_value: Callable[[], List[Tuple[bytes, int, int]]] = lambda: []
+
+        collect_step: Reduce[KafkaPayload, List[Tuple[bytes, int, int]]] = Reduce(
+            self.max_batch_size,
+            self.max_batch_time,
+            accumulator,
+            initial_value,
+            RunTask(
+                partial(process_messages, self.dataset, self.topic, self.logical_topic),
+                CommitOffsets(commit),
+            ),
+        )
+        return collect_step
+
 
 def process_message(
     dataset: Dataset, topic: str, logical_topic: str, message: Message[KafkaPayload]
@@ -108,6 +136,36 @@ def process_message(
             )
 
 
+def process_messages(
+    dataset: Dataset,
+    topic: str,
+    logical_topic: str,
+    message: Message[List[Tuple[bytes, int, int]]],
+) -> None:
+    from sentry import options
+    from sentry.snuba.query_subscriptions.consumer import handle_messages
+    from sentry.utils import metrics
+
+    messages = message.payload
+    with sentry_sdk.start_transaction(
+        op="handle_messages",
+        name="query_subscription_consumer_process_messages",
+        sampled=random() <= options.get("subscriptions-query.sample-rate"),
+    ), metrics.timer("snuba_query_subscriber.handle_messages", tags={"dataset": dataset.value}):
+        metrics.timing(
+            "snuba_query_subscriber.batch_size", len(messages), tags={"dataset": dataset.value}
+        )
+        try:
+            handle_messages(messages, topic, dataset.value, get_codec(logical_topic))
+        except Exception:
+            # This is a failsafe to make sure that no batch will block this consumer, see
+            # `process_message`.
+            logger.exception(
+                "Unexpected error while handling messages in QuerySubscriptionStrategy. Skipping batch.",
+                extra={"batch_size": len(messages)},
+            )
+
+
 def get_query_subscription_consumer(
     topic: str,
     group_id: str,
@@ -119,6 +177,7 @@ def get_query_subscription_consumer(
     input_block_size: int,
     output_block_size: int,
     multi_proc: bool = False,
+    batched: bool = False,
 ) -> StreamProcessor[KafkaPayload]:
     from django.conf import settings
 
@@ -148,6 +207,7 @@ def get_query_subscription_consumer(
             input_block_size,
             output_block_size,
             multi_proc=multi_proc,
+            batched=batched,
         ),
         commit_policy=ONCE_PER_SECOND,
     )
@@ -8,7 +8,7 @@ import sentry_sdk
 from django.conf import settings
 from django.utils import timezone
 
-from sentry import features
+from sentry import features, options
 from sentry.exceptions import PluginError
 from sentry.issues.grouptype import GroupCategory
 from sentry.issues.issue_occurrence import IssueOccurrence
@@ -542,6 +542,28 @@ def post_process_group(
             run_post_process_job(job)
 
 
+def should_coalesce_group_steps(job: PostProcessJob) -> bool:
+    """
+    Returns whether the steps in `GROUP_COALESCED_STEPS` can be skipped for this event since they
+    already ran for another event of the group within `post-process.group-coalescing-window`
+    seconds. The first event of a group in every window claims the window and runs all steps.
+    """
+    window = options.get("post-process.group-coalescing-window")
+    if not window or job["is_reprocessed"]:
+        return False
+
+    # Events that change the state of the group always run the full pipeline.
+    group_state = job["group_state"]
+    if (
+        group_state["is_new"]
+        or group_state["is_regression"]
+        or group_state["is_new_group_environment"]
+    ):
+        return False
+
+    return not cache.add(f"ppg-coalesce:{job['event'].group_id}", True, window)
+
+
 def run_post_process_job(job: PostProcessJob):
     group_event = job["event"]
     issue_category = group_event.group.issue_category
@@ -549,6 +571,11 @@ def run_post_process_job(job: PostProcessJob):
     if not group_event.group.issue_type.allow_post_process_group(group_event.group.organization):
         return
 
+    coalesce = should_coalesce_group_steps(job)
+    if coalesce:
+        # The event that claimed the window already checked whether the group reappeared.
+        job["has_reappeared"] = False
+
     if issue_category not in GROUP_CATEGORY_POST_PROCESS_PIPELINE:
         # pipeline for generic issues
         pipeline = GENERIC_POST_PROCESS_PIPELINE
@@ -557,6 +584,13 @@ def run_post_process_job(job: PostProcessJob):
         pipeline = GROUP_CATEGORY_POST_PROCESS_PIPELINE[issue_category]
 
     for pipeline_step in pipeline:
+        if coalesce and pipeline_step in GROUP_COALESCED_STEPS:
+            metrics.incr(
+                "sentry.tasks.post_process.coalesced_step",
+                tags={"step": pipeline_step.__name__},
+                sample_rate=0.1,
+            )
+            continue
         try:
             with sentry_sdk.start_span(op=f"tasks.post_process_group.{pipeline_step.__name__}"):
                 pipeline_step(job)
@@ -764,6 +798,7 @@ def process_rules(job: PostProcessJob) -> None:
     if job["is_reprocessed"]:
         return
 
+    from sentry.mail.adapter import batch_digest_adds
     from sentry.rules.processor import RuleProcessor
 
     group_event = job["event"]
@@ -781,9 +816,10 @@ def process_rules(job: PostProcessJob) -> None:
         with sentry_sdk.start_span(op="tasks.post_process_group.rule_processor_callbacks"):
             # TODO(dcramer): ideally this would fanout, but serializing giant
             # objects back and forth isn't super efficient
-            for callback, futures in rp.apply():
-                has_alert = True
-                safe_execute(callback, group_event, futures, _with_transaction=False)
+            with batch_digest_adds():
+                for callback, futures in rp.apply():
+                    has_alert = True
+                    safe_execute(callback, group_event, futures, _with_transaction=False)
 
         job["has_alert"] = has_alert
         return
@@ -988,12 +1024,16 @@ def process_similarity(job: PostProcessJob) -> None:
         return
 
     from sentry import similarity
+    from sentry.tasks.similarity import buffer_similarity_event
 
     event = job["event"]
 
     with metrics.timer("post_process.process_similarity.duration"):
         with sentry_sdk.start_span(op="tasks.post_process_group.similarity"):
-            safe_execute(similarity.record, event.project, [event], _with_transaction=False)
+            if options.get("similarity.record.buffered"):
+                safe_execute(buffer_similarity_event, event, _with_transaction=False)
+            else:
+                safe_execute(similarity.record, event.project, [event], _with_transaction=False)
 
 
 def fire_error_processed(job: PostProcessJob):
@@ -1059,3 +1099,16 @@ GENERIC_POST_PROCESS_PIPELINE = [
     process_inbox_adds,
     process_rules,
 ]
+
+# Steps that only depend on the state of the group rather than on the individual event. With
+# coalescing enabled they run once per group and window, see `should_coalesce_group_steps`.
+GROUP_COALESCED_STEPS = frozenset(
+    [
+        process_snoozes,
+        process_inbox_adds,
+        process_commits,
+        handle_owner_assignment,
+        handle_auto_assignment,
+        process_code_mappings,
+    ]
+)
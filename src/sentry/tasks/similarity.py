@@ -0,0 +1,107 @@
+import logging
+import time
+
+from sentry import features, options
+from sentry.tasks.base import instrumented_task
+from sentry.utils import json, metrics, redis
+from sentry.utils.cache import cache
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "similarity:buffer"
+
+# The maximum number of seconds `record_similarity` keeps draining the buffer,
+# which leaves some room before the next scheduled run.
+MAX_DRAIN_DURATION = 50
+
+
+def _get_buffer_client():
+    return redis.clusters.get("default").get_local_client_for_key(BUFFER_KEY)
+
+
+def buffer_similarity_event(event):
+    """
+    Queues the event to be recorded in the similarity index by the next run
+    of `record_similarity`. Events of groups that had an event queued within
+    the last ``similarity.record.group-sample-window`` seconds are skipped.
+    Returns whether the event was queued.
+    """
+    project = event.project
+    if not (
+        features.has("projects:similarity-indexing", project)
+        or features.has("projects:similarity-indexing-v2", project)
+    ):
+        return False
+
+    window = options.get("similarity.record.group-sample-window")
+    if window and not cache.add(f"similarity-record:{event.group_id}", True, window):
+        metrics.incr("similarity.record.sampled", sample_rate=0.1)
+        return False
+
+    _get_buffer_client().rpush(
+        BUFFER_KEY, json.dumps([event.project_id, event.group_id, event.event_id])
+    )
+    return True
+
+
+def record_similarity_events(references):
+    """
+    Records events given as ``(project_id, group_id, event_id)`` references in
+    the similarity index, with one index call per project.
+    """
+    from sentry import eventstore, similarity
+    from sentry.eventstore.models import Event
+    from sentry.models import Group, Project
+
+    events = [
+        Event(project_id, event_id, group_id=group_id)
+        for project_id, group_id, event_id in references
+    ]
+    eventstore.bind_nodes(events, "data")
+
+    groups = Group.objects.in_bulk({event.group_id for event in events})
+    projects = Project.objects.in_bulk({event.project_id for event in events})
+
+    events_by_project = {}
+    for event in events:
+        group = groups.get(event.group_id)
+        project = projects.get(event.project_id)
+        # Events and groups may have been deleted since they were queued.
+        if group is None or project is None or not event.data:
+            metrics.incr("similarity.record.missing")
+            continue
+        event.group = group
+        event.project = project
+        events_by_project.setdefault(project.id, []).append(event)
+
+    for project_events in events_by_project.values():
+        try:
+            similarity.record(project_events[0].project, project_events)
+        except Exception:
+            logger.exception("similarity.record.failed")
+
+
+@instrumented_task(name="sentry.tasks.similarity.record_similarity", queue="similarity.index")
+def record_similarity(**kwargs):
+    """
+    Records the events queued by `buffer_similarity_event` in batches.
+    """
+    batch_size = options.get("similarity.record.batch-size")
+    client = _get_buffer_client()
+    deadline = time.time() + MAX_DRAIN_DURATION
+
+    while time.time() < deadline:
+        with client.pipeline() as pipeline:
+            pipeline.lrange(BUFFER_KEY, 0, batch_size - 1)
+            pipeline.ltrim(BUFFER_KEY, batch_size, -1)
+            values, _ = pipeline.execute()
+
+        if not values:
+            break
+
+        metrics.timing("similarity.record.batch_size", len(values))
+        with metrics.timer("similarity.record.batch.duration"):
+            record_similarity_events([json.loads(value) for value in values])
+
+        if len(values) < batch_size:
+            break
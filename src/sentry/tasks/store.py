@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 from time import time
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
 
 import sentry_sdk
 from django.conf import settings
@@ -749,6 +749,134 @@ def _do_save_event(
             time_synthetic_monitoring_event(data, project_id, start_time)
 
 
+def _do_save_event_batch(events: Sequence[Mapping[str, Any]]) -> None:
+    """
+    Saves a batch of events to the database.
+
+    Error events are saved together through `save_error_events`, which shares
+    grouphash lookups, TSDB writes and nodestore writes between events. All
+    other event types are saved one by one.
+
+    :param events: A list of `save_event` task kwargs (``cache_key``,
+        ``start_time``, ``event_id`` and ``project_id``).
+    """
+
+    from sentry.event_manager import HashDiscarded, save_error_events
+
+    jobs = []
+    for task_kwargs in events:
+        cache_key = task_kwargs.get("cache_key")
+        data = task_kwargs.get("data")
+        if cache_key and data is None:
+            with metrics.timer("tasks.store.do_save_event_batch.get_cache"):
+                data = processing.event_processing_store.get(cache_key)
+
+        if not data or data.get("type") in ("transaction", "generic"):
+            _do_save_event(**{**task_kwargs, "data": data})
+            continue
+
+        data = CanonicalKeyDict(data)
+        event_id = task_kwargs.get("event_id") or data["event_id"]
+        project_id = task_kwargs.get("project_id")
+        if project_id is None:
+            project_id = data.pop("project")
+
+        if reprocessing.event_supports_reprocessing(data):
+            delete_raw_event(project_id, event_id, allow_hint_clear=True)
+
+        if killswitch_matches_context(
+            "store.load-shed-save-event-projects",
+            {
+                "project_id": project_id,
+                "event_type": data.get("type") or "none",
+                "platform": data.get("platform") or "none",
+            },
+        ):
+            if cache_key:
+                processing.event_processing_store.delete_by_key(cache_key)
+                attachment_cache.delete(cache_key)
+            reprocessing2.mark_event_reprocessed(data)
+            continue
+
+        jobs.append(
+            {
+                "data": data,
+                "project_id": project_id,
+                "raw": False,
+                "start_time": task_kwargs.get("start_time"),
+                "cache_key": cache_key,
+            }
+        )
+
+    if not jobs:
+        return
+
+    projects = {
+        p.id: p for p in Project.objects.get_many_from_cache({job["project_id"] for job in jobs})
+    }
+    # Drop events of projects that have been deleted in the meantime.
+    for job in jobs:
+        if job["project_id"] not in projects:
+            metrics.incr("events.failed", tags={"reason": "project", "stage": "post"})
+            _finish_save_event_job(job)
+    jobs = [job for job in jobs if job["project_id"] in projects]
+
+    metrics.timing("tasks.store.do_save_event_batch.size", len(jobs))
+
+    try:
+        with metrics.timer("tasks.store.do_save_event_batch.save_error_events"):
+            save_error_events(jobs, projects, auto_upgrade_grouping=True)
+    except Exception:
+        metrics.incr("events.save_event.exception", tags={"event_type": "batch"})
+        for job in jobs:
+            _finish_save_event_job(job)
+        raise
+
+    for job in jobs:
+        cache_key = job["cache_key"]
+        try:
+            if isinstance(job.get("discarded"), HashDiscarded):
+                # Delete the event payload from cache since it won't show up in post-processing.
+                if cache_key:
+                    processing.event_processing_store.delete_by_key(cache_key)
+            else:
+                # Put the updated event back into the cache so that post_process
+                # has the most recent data.
+                data = job["event"].data.data
+                if isinstance(data, CANONICAL_TYPES):
+                    data = dict(data.items())
+                job["data"] = data
+                processing.event_processing_store.store(data)
+        finally:
+            _finish_save_event_job(job)
+
+
+def _finish_save_event_job(job: Mapping[str, Any]) -> None:
+    """
+    Cleans up after a job of `_do_save_event_batch`, like the ``finally``
+    block of `_do_save_event` does for single events.
+    """
+    cache_key = job["cache_key"]
+    data = job["data"]
+
+    reprocessing2.mark_event_reprocessed(data)
+    if cache_key:
+        attachment_cache.delete(cache_key)
+
+    start_time = job["start_time"]
+    if start_time:
+        metrics.timing(
+            "events.time-to-process",
+            time() - start_time,
+            instance=data["platform"],
+            tags={
+                "is_reprocessing2": "true" if reprocessing2.is_reprocessed_event(data) else "false",
+            },
+        )
+
+    time_synthetic_monitoring_event(data, job["project_id"], start_time)
+
+
 def time_synthetic_monitoring_event(
     data: Event, project_id: int, start_time: Optional[int]
 ) -> bool:
@@ -816,6 +944,23 @@ def save_event(
     _do_save_event(cache_key, data, start_time, event_id, project_id, **kwargs)
 
 
+@instrumented_task(  # type: ignore
+    name="sentry.tasks.store.save_event_batch",
+    queue="events.save_event",
+    time_limit=65,
+    soft_time_limit=60,
+)
+def save_event_batch(events: Sequence[Mapping[str, Any]], **kwargs: Any) -> None:
+    """
+    Save multiple error events in a single task. Each item of ``events`` takes
+    the same arguments as `save_event`.
+
+    Nothing dispatches this task yet, events are still saved one by one
+    through `save_event`.
+    """
+    _do_save_event_batch(events)
+
+
 @instrumented_task(  # type: ignore
     name="sentry.tasks.store.save_event_transaction",
     queue="events.save_event_transaction",
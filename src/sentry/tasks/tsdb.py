@@ -0,0 +1,36 @@
+import logging
+
+from sentry.tasks.base import instrumented_task
+from sentry.utils.locking import UnableToAcquireLock
+
+logger = logging.getLogger(__name__)
+
+# Runs are killed before the lock expires, so that two runs never overlap.
+COMPACT_ROLLUPS_LOCK_DURATION = 10 * 60
+
+
+@instrumented_task(
+    name="sentry.tasks.tsdb.compact_rollups",
+    queue="stats",
+    soft_time_limit=COMPACT_ROLLUPS_LOCK_DURATION - 60,
+    time_limit=COMPACT_ROLLUPS_LOCK_DURATION - 30,
+)
+def compact_rollups(**kwargs):
+    """
+    Fold recent TSDB counters into the coarser rollups.
+    """
+    from sentry import tsdb
+    from sentry.locks import locks
+
+    # Compaction is safe to repeat, but concurrent runs would do the same work.
+    lock = locks.get(
+        "tsdb:compact_rollups",
+        duration=COMPACT_ROLLUPS_LOCK_DURATION,
+        name="tsdb_compact_rollups",
+    )
+
+    try:
+        with lock.acquire():
+            tsdb.compact_rollups()
+    except UnableToAcquireLock as error:
+        logger.warning("compact_rollups.fail", extra={"error": error})
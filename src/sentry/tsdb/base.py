@@ -134,6 +134,7 @@ class BaseTSDB(Service):
     __all__ = (
         frozenset(
             [
+                "compact_rollups",
                 "get_earliest_timestamp",
                 "get_optimal_rollup",
                 "get_optimal_rollup_series",
@@ -614,3 +615,9 @@ class BaseTSDB(Service):
         Delete all data.
         """
         raise NotImplementedError
+
+    def compact_rollups(self, timestamp=None):
+        """
+        Fold recent counters into the coarser rollups, for backends that only
+        write the finest rollup on increment.
+        """
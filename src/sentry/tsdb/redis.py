@@ -12,6 +12,7 @@ from django.utils.encoding import force_bytes
 from pkg_resources import resource_string
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils import metrics
 from sentry.utils.compat import crc32
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import SentryScript, check_cluster_versions, get_cluster_from_options
@@ -24,6 +25,16 @@ T = TypeVar("T")
 SketchParameters = namedtuple("SketchParameters", "depth width capacity")
 
 CountMinScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/cmsketch.lua"))
+CompactScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/compact.lua"))
+
+# The field of a coarser rollup counter hash that stores the epoch of the last
+# compacted bucket added to it. It can't collide with counter fields, which
+# are model keys (see `get_model_key`).
+COMPACTED_MARKER_FIELD = "~compacted"
+
+# Suffix of the fields of a finest rollup counter hash that store increments
+# which were written to the coarser rollups directly, and aren't compacted.
+LATE_FIELD_SUFFIX = "~late"
 
 
 class SuppressionWrapper:
@@ -105,6 +116,23 @@ class RedisTSDB(BaseTSDB):
     frequency table can be displayed as percentages of the whole data set.
     (Additional documentation and the bulk of the logic for implementing the
     frequency table API can be found in the ``cmsketch.lua`` script.)
+
+    With ``compact_rollups`` enabled, recent counter increments are only
+    written to the finest rollup, and ``compact_rollups`` (scheduled as a
+    periodic task) folds completed buckets of the finest rollup into the
+    coarser rollups. The finest rollup buckets that were touched are tracked
+    in sets per bucket and vnode, and the end of the last compacted bucket is
+    stored as the compaction watermark. Reads of coarser rollups add the
+    finest rollup buckets after the watermark.
+
+    Only increments of buckets after the watermark that end less than
+    ``compaction_delay`` seconds ago are left to compaction, which waits
+    another ``compaction_margin`` seconds for them to be written. Other
+    increments are written to the coarser rollups directly, and to a separate
+    field of the finest rollup that is read with the counter but isn't
+    compacted. The watermark is initialized to the end of the current bucket
+    by the first increment, so buckets written before compaction was enabled
+    are never compacted.
     """
 
     DEFAULT_SKETCH_PARAMETERS = SketchParameters(3, 128, 50)
@@ -114,7 +142,13 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop("enable_frequency_sketches", False)
+        self.compact = options.pop("compact_rollups", False)
+        self.compaction_delay = options.pop("compaction_delay", 60)
+        self.compaction_margin = options.pop("compaction_margin", 10)
         super().__init__(**options)
+        self.compaction_rollup = min(self.rollups)
+        # (watermark, timestamp until which it's used) of `get_routing_watermark`
+        self._routing_watermark = None
 
     def validate(self):
         logger.debug("Validating Redis version...")
@@ -168,21 +202,26 @@ class RedisTSDB(BaseTSDB):
         """
         model_key = self.get_model_key(key)
 
-        if isinstance(model_key, int):
-            vnode = model_key % self.vnodes
-        else:
-            vnode = crc32(force_bytes(model_key)) % self.vnodes
-
         return (
-            "{prefix}{model}:{epoch}:{vnode}".format(
-                prefix=self.prefix,
-                model=model.value,
-                epoch=self.normalize_to_rollup(timestamp, rollup),
-                vnode=vnode,
+            self.make_counter_hash_key(
+                model,
+                self.normalize_to_rollup(timestamp, rollup),
+                self.get_counter_vnode(model_key),
             ),
             self.add_environment_parameter(model_key, environment_id),
         )
 
+    def make_counter_hash_key(self, model, epoch, vnode):
+        return "{prefix}{model}:{epoch}:{vnode}".format(
+            prefix=self.prefix, model=model.value, epoch=epoch, vnode=vnode
+        )
+
+    def get_counter_vnode(self, model_key):
+        if isinstance(model_key, int):
+            return model_key % self.vnodes
+        else:
+            return crc32(force_bytes(model_key)) % self.vnodes
+
     def get_model_key(self, key):
         # We specialize integers so that a pure int-map can be optimized by
         # Redis, whereas long strings (say tag values) will store in a more
@@ -223,6 +262,12 @@ class RedisTSDB(BaseTSDB):
         if default_timestamp is None:
             default_timestamp = timezone.now()
 
+        if self.compact:
+            # Buckets of the compaction rollup after the watermark that end after the
+            # cutoff are compacted later, see `compaction_margin`.
+            compaction_watermark = self.get_routing_watermark()
+            compaction_cutoff = to_timestamp(timezone.now()) - self.compaction_delay
+
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
             manager = cluster.map()
             if not durable:
@@ -233,24 +278,53 @@ class RedisTSDB(BaseTSDB):
                 key_operations = defaultdict(lambda: 0)
                 # (hash_key) -> "max expiration encountered"
                 key_expiries = defaultdict(lambda: 0.0)
-
-                for rollup, max_values in self.rollups.items():
-                    for item in items:
-                        if len(item) == 2:
-                            model, key = item
-                            options = {}
+                # compaction set key -> ({model value, ...}, expiration)
+                compaction_sets = {}
+
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
+
+                    count = options.get("count", default_count)
+                    timestamp = options.get("timestamp", default_timestamp)
+
+                    rollups = self.rollups.items()
+                    late = False
+                    if self.compact:
+                        rollup = self.compaction_rollup
+                        bucket_start = self.normalize_to_epoch(timestamp, rollup)
+                        if (
+                            bucket_start >= compaction_watermark
+                            and bucket_start + rollup > compaction_cutoff
+                        ):
+                            rollups = [(rollup, self.rollups[rollup])]
+                            compaction_set_key = self.make_compaction_set_key(
+                                self.normalize_to_rollup(timestamp, rollup),
+                                self.get_counter_vnode(self.get_model_key(key)),
+                            )
+                            models, _ = compaction_sets.setdefault(
+                                compaction_set_key,
+                                (set(), self.calculate_expiry(rollup, rollups[0][1], timestamp)),
+                            )
+                            models.add(model.value)
                         else:
-                            model, key, options = item
-
-                        count = options.get("count", default_count)
-                        timestamp = options.get("timestamp", default_timestamp)
+                            # The bucket may already be compacted, so the increment is
+                            # written to the coarser rollups directly. In the finest
+                            # rollup it's kept out of compaction by a separate field.
+                            late = True
 
+                    for rollup, max_values in rollups:
                         expiry = self.calculate_expiry(rollup, max_values, timestamp)
 
                         for environment_id in environment_ids:
                             hash_key, hash_field = self.make_counter_key(
                                 model, rollup, timestamp, key, environment_id
                             )
+                            if late and rollup == self.compaction_rollup:
+                                hash_field = self.make_late_counter_field(hash_field)
 
                             if key_expiries[hash_key] < expiry:
                                 key_expiries[hash_key] = expiry
@@ -262,6 +336,10 @@ class RedisTSDB(BaseTSDB):
                     if key_expiries.get(hash_key):
                         client.expireat(hash_key, key_expiries.pop(hash_key))
 
+                for compaction_set_key, (models, expiry) in compaction_sets.items():
+                    client.sadd(compaction_set_key, *models)
+                    client.expireat(compaction_set_key, expiry)
+
     def get_range(
         self,
         model,
@@ -290,28 +368,252 @@ class RedisTSDB(BaseTSDB):
 
         self.validate_arguments([model], [environment_id])
 
+        keys = list(keys)
+        series, matrix = self.get_range_matrix(model, keys, start, end, rollup, environment_id)
+
+        return {key: list(zip(series, row)) for key, row in zip(keys, matrix)}
+
+    def get_sums(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_id=None,
+        use_cache=False,
+        jitter_value=None,
+        tenant_ids=None,
+        referrer_suffix=None,
+    ):
+        self.validate_arguments([model], [environment_id])
+
+        keys = list(keys)
+        _, matrix = self.get_range_matrix(model, keys, start, end, rollup, environment_id)
+        return {key: sum(row) for key, row in zip(keys, matrix)}
+
+    def get_range_matrix(self, model, keys, start, end, rollup=None, environment_id=None):
+        """
+        Returns the counters of ``keys`` as a 2-tuple ``(series, matrix)``,
+        where ``series`` is the list of bucket timestamps and ``matrix[i][j]``
+        is the count of ``keys[i]`` in the bucket ``series[j]``.
+
+        The counters of all keys that are stored in the same hash (keys of the
+        same vnode in the same bucket) are read with a single ``HMGET``, and
+        the commands of each host are pipelined.
+        """
+        keys = list(keys)
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
-        series = [to_datetime(item) for item in series]
+        matrix = [[0] * len(series) for _ in keys]
+        if not keys or not series:
+            return series, matrix
 
-        results = []
         cluster, _ = self.get_cluster(environment_id)
+
+        # The hash epochs every column is read from.
+        column_epochs = [[self.normalize_ts_to_rollup(timestamp, rollup)] for timestamp in series]
+        if self.compact and rollup != self.compaction_rollup:
+            for column, epochs in enumerate(self.get_uncompacted_epochs(cluster, series, rollup)):
+                column_epochs[column].extend(epochs)
+
+        # hash key -> ([hash field, ...], [(row, column), ...])
+        requests = defaultdict(lambda: ([], []))
+        for row, key in enumerate(keys):
+            model_key = self.get_model_key(key)
+            vnode = self.get_counter_vnode(model_key)
+            hash_field = self.add_environment_parameter(model_key, environment_id)
+            for column, epochs in enumerate(column_epochs):
+                for epoch in epochs:
+                    fields, positions = requests[self.make_counter_hash_key(model, epoch, vnode)]
+                    fields.append(hash_field)
+                    positions.append((row, column))
+                    if self.compact and rollup == self.compaction_rollup:
+                        fields.append(self.make_late_counter_field(hash_field))
+                        positions.append((row, column))
+
         with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
-                    )
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(hash_key, hash_field))
-                    )
+            results = [
+                (client.hmget(hash_key, fields), positions)
+                for hash_key, (fields, positions) in requests.items()
+            ]
+
+        for result, positions in results:
+            for (row, column), count in zip(positions, result.value):
+                if count is not None:
+                    matrix[row][column] += int(count)
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+        return series, matrix
 
-        for key, points in results_by_key.items():
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+    def make_compaction_set_key(self, epoch, vnode):
+        """
+        Make the key of the set of models with counters in the compaction
+        rollup bucket ``epoch`` and ``vnode`` that still need to be compacted.
+        """
+        return f"{self.prefix}compact:{epoch}:{vnode}"
+
+    def make_late_counter_field(self, hash_field):
+        """
+        Make the field of a compaction rollup counter hash that stores the
+        increments of ``hash_field`` that were written to the coarser rollups
+        directly.
+        """
+        return f"{hash_field}{LATE_FIELD_SUFFIX}"
+
+    def make_compaction_watermark_key(self):
+        return f"{self.prefix}compact:watermark"
+
+    def get_compaction_watermark(self, cluster):
+        """
+        Returns the timestamp all buckets of the compaction rollup before
+        which have been compacted, or ``None`` if nothing was left to
+        compaction yet.
+        """
+        with cluster.map() as client:
+            result = client.get(self.make_compaction_watermark_key())
+        return int(result.value) if result.value is not None else None
+
+    def get_routing_watermark(self):
+        """
+        Returns the compaction watermark that increments are routed on, and
+        initializes it to the end of the current bucket of the compaction
+        rollup if it doesn't exist yet.
+
+        The watermark is cached for the length of a bucket. A stale watermark
+        is lower than the stored one, which only matters for buckets that
+        ended before the compaction cutoff of `incr_multi`, and those are
+        never left to compaction.
+        """
+        now = to_timestamp(timezone.now())
+        if self._routing_watermark is not None and self._routing_watermark[1] > now:
+            return self._routing_watermark[0]
+
+        rollup = self.compaction_rollup
+        key = self.make_compaction_watermark_key()
+        with self.cluster.map() as client:
+            client.set(key, self.normalize_ts_to_epoch(int(now), rollup) + rollup, nx=True)
+            result = client.get(key)
+
+        watermark = int(result.value)
+        self._routing_watermark = (watermark, now + rollup)
+        return watermark
+
+    def get_uncompacted_epochs(self, cluster, series, rollup):
+        """
+        Returns the epochs of the compaction rollup buckets that belong to
+        each bucket of ``series`` (in ``rollup``) but were not compacted yet.
+        """
+        watermark = self.get_compaction_watermark(cluster)
+        if watermark is None:
+            return [[] for _ in series]
+
+        compaction_rollup = self.compaction_rollup
+        now = timezone.now()
+        start = max(watermark, self.get_earliest_timestamp(compaction_rollup, timestamp=now))
+        end = self.normalize_to_epoch(now, compaction_rollup) + compaction_rollup
+        return [
+            [
+                self.normalize_ts_to_rollup(epoch, compaction_rollup)
+                for epoch in range(
+                    max(timestamp, start), min(timestamp + rollup, end), compaction_rollup
+                )
+            ]
+            for timestamp in series
+        ]
+
+    def compact_rollups(self, timestamp=None):
+        """
+        Folds the buckets of the compaction rollup that were completed since
+        the last compaction into the coarser rollups, and returns the new
+        watermark, or ``None`` if no increments were left to compaction yet.
+
+        Buckets are compacted one at a time and the watermark is advanced
+        after each of them. A coarser counter hash stores the epoch of the
+        last bucket added to it, so compacting a bucket again after a failure
+        or by concurrent calls doesn't count it twice.
+        """
+        if not self.compact:
+            return None
+
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        watermark = self.get_compaction_watermark(self.cluster)
+        if watermark is None:
+            return None
+
+        rollup = self.compaction_rollup
+        # Buckets that end after this may still receive increments, which
+        # are given `compaction_margin` seconds to be written.
+        end = self.normalize_ts_to_epoch(
+            int(to_timestamp(timestamp)) - self.compaction_delay - self.compaction_margin, rollup
+        )
+        start = max(watermark, self.get_earliest_timestamp(rollup, timestamp=timestamp))
+        if start >= end:
+            return start
+
+        counter_count = 0
+        for bucket_start in range(start, end, rollup):
+            counter_count += self._compact_bucket(self.normalize_ts_to_rollup(bucket_start, rollup))
+
+            with self.cluster.map() as client:
+                client.set(self.make_compaction_watermark_key(), bucket_start + rollup)
+
+            metrics.incr("tsdb.compact_rollups.buckets")
+
+        metrics.incr("tsdb.compact_rollups.counters", amount=counter_count)
+        return end
+
+    def _compact_bucket(self, epoch):
+        """
+        Folds the counters of the compaction rollup bucket ``epoch`` into the
+        coarser rollups and returns the number of compacted counter hashes.
+        """
+        rollup = self.compaction_rollup
+        epoch_timestamp = to_datetime(epoch * rollup)
+
+        with self.cluster.map() as client:
+            compaction_sets = [
+                (vnode, client.smembers(self.make_compaction_set_key(epoch, vnode)))
+                for vnode in range(self.vnodes)
+            ]
+
+        with self.cluster.map() as client:
+            counters = [
+                (vnode, model, client.hgetall(self.make_counter_hash_key(model, epoch, vnode)))
+                for vnode, models in compaction_sets
+                for model in (self.models(int(value)) for value in models.value)
+            ]
+
+        commands = {}
+        for vnode, model, result in counters:
+            if not result.value:
+                continue
+            for target_rollup, samples in self.rollups.items():
+                if target_rollup == rollup:
+                    continue
+                hash_key = self.make_counter_hash_key(
+                    model, self.normalize_to_rollup(epoch_timestamp, target_rollup), vnode
+                )
+                arguments = [
+                    COMPACTED_MARKER_FIELD,
+                    epoch,
+                    self.calculate_expiry(target_rollup, samples, epoch_timestamp),
+                ]
+                for hash_field, count in result.value.items():
+                    # Late increments were written to the coarser rollups already.
+                    if not hash_field.endswith(LATE_FIELD_SUFFIX):
+                        arguments.extend((hash_field, int(count)))
+                commands[hash_key] = [(CompactScript, [hash_key], arguments)]
+
+        if commands:
+            self.cluster.execute_commands(commands)
+
+        # The sets are only deleted once their counters were compacted.
+        with self.cluster.map() as client:
+            for vnode, _ in compaction_sets:
+                client.delete(self.make_compaction_set_key(epoch, vnode))
+
+        return len(counters)
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
@@ -330,6 +632,13 @@ class RedisTSDB(BaseTSDB):
             with manager as client:
                 data = {}
                 for rollup, series in rollups.items():
+                    # Late increments of the compaction rollup are merged into the late
+                    # field of the destination, so they aren't compacted.
+                    late_fields = (
+                        (False, True)
+                        if self.compact and rollup == self.compaction_rollup
+                        else (False,)
+                    )
                     data[rollup] = {}
                     for timestamp in series:
                         results = data[rollup][timestamp] = defaultdict(list)
@@ -338,15 +647,19 @@ class RedisTSDB(BaseTSDB):
                                 source_hash_key, source_hash_field = self.make_counter_key(
                                     model, rollup, timestamp, source, environment_id
                                 )
-                                results[environment_id].append(
-                                    client.hget(source_hash_key, source_hash_field)
-                                )
-                                client.hdel(source_hash_key, source_hash_field)
+                                for late in late_fields:
+                                    field = source_hash_field
+                                    if late:
+                                        field = self.make_late_counter_field(field)
+                                    results[environment_id, late].append(
+                                        client.hget(source_hash_key, field)
+                                    )
+                                    client.hdel(source_hash_key, field)
 
             with cluster.map() as client:
                 for rollup, series in data.items():
                     for timestamp, results in series.items():
-                        for environment_id, promises in results.items():
+                        for (environment_id, late), promises in results.items():
                             total = sum(int(p.value) for p in promises if p.value)
                             if total:
                                 (
@@ -355,11 +668,23 @@ class RedisTSDB(BaseTSDB):
                                 ) = self.make_counter_key(
                                     model, rollup, timestamp, destination, environment_id
                                 )
+                                if late:
+                                    destination_hash_field = self.make_late_counter_field(
+                                        destination_hash_field
+                                    )
                                 client.hincrby(destination_hash_key, destination_hash_field, total)
-                                client.expireat(
-                                    destination_hash_key,
-                                    self.calculate_expiry(rollup, self.rollups[rollup], timestamp),
+                                expiry = self.calculate_expiry(
+                                    rollup, self.rollups[rollup], timestamp
                                 )
+                                client.expireat(destination_hash_key, expiry)
+                                if self.compact and rollup == self.compaction_rollup and not late:
+                                    # The sources may not have been compacted yet.
+                                    compaction_set_key = self.make_compaction_set_key(
+                                        self.normalize_to_rollup(timestamp, rollup),
+                                        self.get_counter_vnode(self.get_model_key(destination)),
+                                    )
+                                    client.sadd(compaction_set_key, model.value)
+                                    client.expireat(compaction_set_key, expiry)
 
     def delete(self, models, keys, start=None, end=None, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
@@ -386,6 +711,10 @@ class RedisTSDB(BaseTSDB):
                                     )
 
                                     client.hdel(hash_key, hash_field)
+                                    if self.compact and rollup == self.compaction_rollup:
+                                        client.hdel(
+                                            hash_key, self.make_late_counter_field(hash_field)
+                                        )
 
     def record(self, model, key, values, timestamp=None, environment_id=None):
         self.validate_arguments([model], [environment_id])
@@ -121,3 +121,6 @@ class RedisSnubaTSDB(BaseTSDB, metaclass=RedisSnubaTSDBMeta):
             "snuba": SnubaTSDB(**options.pop("snuba", {})),
         }
         super().__init__(**options)
+
+    def compact_rollups(self, timestamp=None):
+        return self.backends["redis"].compact_rollups(timestamp=timestamp)
@@ -308,6 +308,10 @@ def pytest_runtest_teardown(item):
     for model in (OrganizationOption, ProjectOption, UserOption):
         model.objects.clear_local_cache()
 
+    from sentry.lang.javascript.cache import parsed_sourcemap_cache
+
+    parsed_sourcemap_cache.clear()
+
     Hub.main.bind_client(None)
 
 
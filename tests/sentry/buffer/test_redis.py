@@ -1,4 +1,5 @@
 import pickle
+import threading
 from datetime import datetime
 from unittest import mock
 
@@ -6,8 +7,9 @@ from django.utils import timezone
 from django.utils.encoding import force_text
 from freezegun import freeze_time
 
+from sentry.buffer.bulk import bulk_update
 from sentry.buffer.redis import RedisBuffer
-from sentry.models import Group, Project
+from sentry.models import Group, Project, ReleaseProject
 from sentry.testutils import TestCase
 
 
@@ -103,6 +105,49 @@ class RedisBufferTest(TestCase):
         group = Group.objects.get_from_cache(id=self.group.id)
         assert group.times_seen == orig_times_seen + times_seen_incr
 
+    @freeze_time()
+    @mock.patch("sentry.buffer.redis.buffer_incr_complete")
+    @mock.patch("sentry.buffer.redis.bulk_update", side_effect=bulk_update)
+    def test_process_bulk(self, bulk_update_mock, signal_mock):
+        buf = RedisBuffer(incr_bulk_flush=True)
+        other_group = self.create_group(project=self.project)
+        release = self.create_release(project=self.project)
+        orig_times_seen = Group.objects.get_from_cache(id=self.group.id).times_seen
+        now = timezone.now()
+
+        buf.incr(Group, {"times_seen": 5}, {"pk": self.group.id}, {"last_seen": now})
+        buf.incr(Group, {"times_seen": 2}, {"id": other_group.id}, {"message": "foo"})
+        buf.incr(Group, {"times_seen": 1}, {"id": 0}, {"last_seen": now})
+        buf.incr(
+            ReleaseProject,
+            {"new_groups": 3},
+            {"release_id": release.id, "project_id": self.project.id},
+        )
+
+        with mock.patch.object(buf, "_process", wraps=buf._process) as process_mock:
+            with self.tasks(), mock.patch("sentry.buffer", buf):
+                buf.process_pending()
+
+        # Both groups are updated with one statement per set of columns.
+        assert bulk_update_mock.call_count == 2
+        # The missing group and the release project take the regular path.
+        assert sorted(call.args[0].__name__ for call in process_mock.call_args_list) == [
+            "Group",
+            "ReleaseProject",
+        ]
+        assert signal_mock.send_robust.call_count == 2
+
+        group = Group.objects.get_from_cache(id=self.group.id)
+        assert group.times_seen == orig_times_seen + 5
+        assert group.last_seen == now
+        other_group = Group.objects.get(id=other_group.id)
+        assert other_group.times_seen == 3
+        assert other_group.message == "foo"
+        assert (
+            ReleaseProject.objects.get(release_id=release.id, project_id=self.project.id).new_groups
+            == 3
+        )
+
     def test_get(self):
         model = mock.Mock()
         model.__name__ = "Mock"
@@ -115,6 +160,84 @@ class RedisBufferTest(TestCase):
         self.buf.incr(model, {"times_seen": 5}, filters)
         assert self.buf.get(model, columns, filters=filters) == {"times_seen": 6}
 
+    def test_incr_coalesced(self):
+        buf = RedisBuffer(incr_coalesce_window=60)
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        key = buf._make_key(model, filters=filters)
+
+        buf.incr(model, {"times_seen": 1}, filters, extra={"foo": "bar"})
+        buf.incr(model, {"times_seen": 2}, filters, extra={"foo": "baz", "datetime": now})
+        buf.incr(model, {"times_seen": 3}, {"pk": 2})
+
+        # Nothing is written until the increments are flushed, but they are
+        # already visible to `get`.
+        assert client.hgetall(key) == {}
+        assert buf.get(model, ["times_seen"], filters) == {"times_seen": 3}
+
+        buf.flush_incrs()
+        result = {force_text(k): v for k, v in client.hgetall(key).items()}
+        assert pickle.loads(result.pop("f")) == filters
+        assert pickle.loads(result.pop("e+datetime")) == now
+        assert pickle.loads(result.pop("e+foo")) == "baz"
+        assert result == {"i+times_seen": b"3", "m": b"unittest.mock.Mock"}
+
+        pending = client.zrange("b:p", 0, -1)
+        assert sorted(pending) == sorted(
+            [key.encode("utf-8"), buf._make_key(model, {"pk": 2}).encode("utf-8")]
+        )
+        assert buf.get(model, ["times_seen"], filters) == {"times_seen": 3}
+
+    def test_incr_coalesced_flushes_when_full(self):
+        buf = RedisBuffer(incr_coalesce_window=60, incr_coalesce_size=2)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        assert client.zrange("b:p", 0, -1) == []
+
+        buf.incr(model, {"times_seen": 1}, {"pk": 2})
+        assert len(client.zrange("b:p", 0, -1)) == 2
+        assert client.hget(buf._make_key(model, {"pk": 1}), "i+times_seen") == b"2"
+
+    def test_incr_coalesced_concurrent(self):
+        buf = RedisBuffer(incr_coalesce_window=60, incr_coalesce_size=3)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+
+        def incr_keys(offset):
+            for pk in range(offset, offset + 50):
+                buf.incr(model, {"times_seen": 1}, {"pk": pk})
+
+        threads = [threading.Thread(target=incr_keys, args=(i * 50,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        buf.flush_incrs()
+
+        assert len(client.zrange("b:p", 0, -1)) == 200
+
+    @mock.patch("sentry.buffer.redis.metrics.incr")
+    def test_incr_coalesced_timer_flush_failed(self, metrics_incr):
+        buf = RedisBuffer(incr_coalesce_window=60)
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+
+        with mock.patch.object(buf, "_write_incrs", side_effect=Exception):
+            buf._flush_incrs_from_timer()
+
+        assert mock.call("buffer.incr.flush-failed", skip_internal=False) in (
+            metrics_incr.call_args_list
+        )
+
     def test_incr_saves_to_redis(self):
         now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
         client = self.buf.cluster.get_routing_client()
@@ -151,3 +151,21 @@ class RedisBackendTestCase(TestCase):
 
         with backend.digest("timeline", 0) as records:
             assert len(set(records)) == n
+
+    def test_add_multi(self):
+        backend = RedisBackend()
+
+        t = time.time()
+        assert backend.add_multi(
+            [
+                ("timeline:1", Record("record:1", "value", t)),
+                ("timeline:2", Record("record:2", "value", t)),
+                ("timeline:1", Record("record:3", "value", t)),
+            ]
+        ) == [True, True, False]
+
+        with backend.digest("timeline:1", 0) as records:
+            assert {record.key for record in records} == {"record:1", "record:3"}
+
+        with backend.digest("timeline:2", 0) as records:
+            assert {record.key for record in records} == {"record:2"}
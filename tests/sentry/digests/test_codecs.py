@@ -0,0 +1,45 @@
+from sentry import nodestore
+from sentry.digests.codecs import CompressedPickleCodec, EventReferenceCodec
+from sentry.digests.notifications import Notification
+from sentry.testutils import TestCase
+from sentry.testutils.helpers.datetime import before_now, iso_format
+from sentry.testutils.silo import region_silo_test
+
+
+@region_silo_test(stable=True)
+class EventReferenceCodecTest(TestCase):
+    def setUp(self):
+        self.codec = EventReferenceCodec()
+
+    def store_event(self, fingerprint):
+        return super().store_event(
+            data={"timestamp": iso_format(before_now(minutes=1)), "fingerprint": [fingerprint]},
+            project_id=self.project.id,
+        )
+
+    def test_encodes_references(self):
+        event = self.store_event("group-1")
+        value = self.codec.encode(Notification(event, [1, 2]))
+        assert value.startswith(EventReferenceCodec.reference_prefix)
+
+        notification = self.codec.decode(value)
+        assert notification.rules == [1, 2]
+        assert notification.event.event_id == event.event_id
+        assert notification.event.group_id == event.group_id
+        assert notification.event.data["fingerprint"] == ["group-1"]
+
+    def test_decode_multi(self):
+        events = [self.store_event("group-1"), self.store_event("group-2")]
+        values = [self.codec.encode(Notification(event, [1])) for event in events]
+        # Records written by the pickle codec are still readable.
+        values.append(CompressedPickleCodec().encode("value"))
+
+        notifications = self.codec.decode_multi(values)
+        assert [n.event.event_id for n in notifications[:2]] == [e.event_id for e in events]
+        assert notifications[2] == "value"
+
+    def test_deleted_event(self):
+        event = self.store_event("group-1")
+        value = self.codec.encode(Notification(event, [1]))
+        nodestore.delete(event.data.id)
+        assert self.codec.decode_multi([value]) == [None]
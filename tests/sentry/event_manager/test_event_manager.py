@@ -36,6 +36,7 @@ from sentry.event_manager import (
     _get_event_instance,
     _save_grouphash_and_group,
     has_pending_commit_resolution,
+    save_error_events,
 )
 from sentry.eventstore.models import Event
 from sentry.grouping.utils import hash_from_values
@@ -3695,3 +3696,72 @@ class TestSaveGroupHashAndGroup(TransactionTestCase):
         assert created
         assert group_2.id != group_3.id
         assert Group.objects.filter(grouphash__hash=group_hash).count() == 1
+
+
+@region_silo_test
+class SaveErrorEventsTest(TestCase):
+    def make_job(self, **kwargs):
+        manager = EventManager(make_event(**kwargs))
+        manager.normalize()
+        return {
+            "data": manager.get_data(),
+            "project_id": self.project.id,
+            "raw": False,
+            "start_time": None,
+        }
+
+    def test_batch(self):
+        jobs = [
+            self.make_job(message="foo", fingerprint=["a"]),
+            self.make_job(message="foo", fingerprint=["a"]),
+            self.make_job(message="bar", fingerprint=["b"]),
+        ]
+
+        with mock.patch(
+            "sentry.event_manager.nodestore.set_subkeys_multi"
+        ) as set_subkeys_multi, mock.patch("sentry.event_manager.nodestore.flush") as flush:
+            save_error_events(jobs, {self.project.id: self.project})
+
+        assert set_subkeys_multi.call_count == 1
+        # Coalesced writes of the events are flushed before they are handed to
+        # post processing.
+        assert flush.call_count == 1
+        assert set(flush.call_args[0][0]) == {job["event"].data.id for job in jobs}
+        assert set(set_subkeys_multi.call_args[0][0]) == {job["event"].data.id for job in jobs}
+
+        group_a = jobs[0]["event"].group
+        assert jobs[0]["groups"][0].is_new
+        assert jobs[1]["event"].group_id == group_a.id
+        assert not jobs[1]["groups"][0].is_new
+        assert jobs[2]["event"].group_id != group_a.id
+
+        group_a.refresh_from_db()
+        assert group_a.times_seen == 2
+
+    def test_discarded_event_does_not_abort_batch(self):
+        event = self.store_event(
+            data=make_event(message="foo", fingerprint=["discarded"]), project_id=self.project.id
+        )
+        group = event.group
+        tombstone = GroupTombstone.objects.create(
+            project_id=group.project_id,
+            level=group.level,
+            message=group.message,
+            culprit=group.culprit,
+            data=group.data,
+            previous_group_id=group.id,
+        )
+        GroupHash.objects.filter(group=group).update(group=None, group_tombstone_id=tombstone.id)
+
+        jobs = [
+            self.make_job(message="foo", fingerprint=["discarded"]),
+            self.make_job(message="foo", fingerprint=["kept"]),
+        ]
+
+        save_error_events(jobs, {self.project.id: self.project})
+
+        assert isinstance(jobs[0]["discarded"], HashDiscarded)
+        assert "discarded" not in jobs[1]
+        assert jobs[1]["event"].group_id is not None
+        assert nodestore.get(jobs[1]["event"].data.id)
+        assert not nodestore.get(jobs[0]["event"].data.id)
@@ -1,6 +1,11 @@
 import pytest
 
-from sentry.grouping.api import get_default_grouping_config_dict
+from sentry.grouping.api import (
+    get_default_grouping_config_dict,
+    get_grouping_variants_for_event,
+    load_grouping_config,
+)
+from sentry.grouping.enhancer import Enhancements
 from sentry.grouping.strategies.configurations import CONFIGURATIONS
 from tests.sentry.grouping import grouping_input as grouping_inputs
 
@@ -37,3 +42,38 @@ def run_configuration(grouping_input, config):
     event.project = None
 
     event.get_hashes()
+
+
+def _large_enhancements_config(bases):
+    """A project config with many custom rules, similar to big Java/Cocoa setups."""
+    rules = []
+    for i in range(250):
+        rules.append(f"module:com.example.service{i}.*                  +app")
+        rules.append(f"function:*Service{i}Impl*                        -group")
+        rules.append(f"family:native path:**/vendor{i}/**               -app")
+        rules.append(f"[ function:dispatch{i} ] | function:handle*      ^-group")
+    return Enhancements.from_config_string("\n".join(rules), bases=bases).dumps()
+
+
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize(
+    "config_name", sorted(CONFIGURATIONS.keys()), ids=lambda x: x.replace("-", "_")
+)
+def test_benchmark_grouping_large_enhancements(config_name, benchmark):
+    """
+    Replays the stored grouping inputs through `get_grouping_variants_for_event`
+    with a large custom enhancements config.
+    """
+    config = dict(CONFIGS[config_name])
+    config["enhancements"] = _large_enhancements_config(
+        Enhancements.loads(config["enhancements"]).bases
+    )
+    events = [grouping_input.create_event(dict(config)) for grouping_input in grouping_inputs]
+    for event in events:
+        event.project = None
+    input_iter = iter(events)
+
+    def setup():
+        return (next(input_iter), load_grouping_config(config)), {}
+
+    benchmark.pedantic(get_grouping_variants_for_event, setup=setup, rounds=len(events))
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from sentry.grouping.api import get_default_enhancements, get_fingerprinting_config_for_project
+from sentry.grouping.config_cache import ParsedConfigCache, enhancements_cache
+from sentry.grouping.enhancer import Enhancements
+from sentry.testutils import TestCase
+
+
+def test_parsed_config_cache_lru():
+    cache = ParsedConfigCache("test", maxsize=2)
+    parse = mock.Mock(side_effect=lambda: object())
+
+    a = cache.get_or_parse("a", parse)
+    assert cache.get_or_parse("a", parse) is a
+    assert parse.call_count == 1
+
+    cache.get_or_parse("b", parse)
+    # touch "a" so that "b" is the least recently used entry
+    cache.get_or_parse("a", parse)
+    cache.get_or_parse("c", parse)
+    assert len(cache) == 2
+    assert parse.call_count == 3
+
+    assert cache.get_or_parse("a", parse) is a
+    cache.get_or_parse("b", parse)
+    assert parse.call_count == 4
+
+
+def test_parsed_config_cache_does_not_cache_errors():
+    cache = ParsedConfigCache("test", maxsize=2)
+    parse = mock.Mock(side_effect=[ValueError, "ok"])
+
+    try:
+        cache.get_or_parse("a", parse)
+    except ValueError:
+        pass
+
+    assert cache.get_or_parse("a", parse) == "ok"
+
+
+def test_enhancements_loads_is_cached():
+    enhancements_cache.clear()
+    data = get_default_enhancements()
+
+    with mock.patch.object(Enhancements, "_loads", wraps=Enhancements._loads) as _loads:
+        assert Enhancements.loads(data) is Enhancements.loads(data)
+        assert _loads.call_count == 1
+
+
+def test_enhancements_from_config_string_is_cached():
+    a = Enhancements.from_config_string("function:foo -group", bases=["common:2019-03-23"])
+    assert a is Enhancements.from_config_string("function:foo -group", bases=["common:2019-03-23"])
+    assert a is not Enhancements.from_config_string("function:foo -group")
+
+
+class FingerprintingConfigCacheTest(TestCase):
+    def test_cached(self):
+        self.project.update_option("sentry:fingerprinting_rules", "message:foo -> bar")
+
+        a = get_fingerprinting_config_for_project(self.project)
+        assert a is get_fingerprinting_config_for_project(self.project)
+        assert [rule.fingerprint for rule in a.rules] == [["bar"]]
@@ -442,3 +442,80 @@ def test_app_no_matches(frame):
     enhancements = Enhancements.from_config_string("app:no +app")
     enhancements.apply_modifications_to_frame([frame], "native", None)
     assert frame.get("in_app")
+
+
+def _get_naive_matches(rules, frames, platform, exception_data=None):
+    match_frames = [create_match_frame(frame, platform) for frame in frames]
+    return [
+        (rule, rule.get_matching_frame_actions(match_frames, platform, exception_data, {}))
+        for rule in rules
+    ]
+
+
+@pytest.mark.parametrize(
+    "frames",
+    [
+        [
+            {"function": "java.lang.Thread.run", "module": "java.lang"},
+            {"function": "com.example.App.main", "module": "com.example", "in_app": True},
+            {"function": "panic_handler", "abs_path": "C:\\code\\game\\panic.c"},
+            {"function": "abort", "abs_path": "/usr/lib/libc.so", "platform": "native"},
+            {"function": "<anonymous>", "abs_path": "webpack:///./node_modules/react/index.js"},
+        ]
+    ],
+)
+@pytest.mark.parametrize("platform", ["java", "native", "javascript"])
+def test_matcher_index_matches_naive_evaluation(frames, platform):
+    enhancements = Enhancements.from_config_string(
+        """
+        module:java.*                                   -app
+        function:com.example.*                          +app
+        family:native function:abort                    ^-group
+        family:javascript path:**/node_modules/**       -app
+        path:c:/code/game/*                             +app
+        path:/usr/lib/*                                 -group
+        !function:panic_*                               +prefix
+        [ function:java.lang.* ] | function:com.*       +sentinel
+        function:abort | [ function:foo ]               -group
+        error.type:Foo function:*                       -group
+        app:yes                                         max-frames=3
+        """
+    )
+    modifier_index, updater_index = enhancements._get_matcher_indexes()
+
+    for index in (modifier_index, updater_index):
+        match_frames = [create_match_frame(frame, platform) for frame in frames]
+        indexed = [
+            (rule, actions)
+            for rule, actions in index.iter_matching_frame_actions(match_frames, platform, None, {})
+        ]
+        naive = [
+            (rule, actions)
+            for rule, actions in _get_naive_matches(index.rules, frames, platform)
+            if actions
+        ]
+        assert indexed == naive
+
+
+def test_matcher_index_prunes_candidates():
+    enhancements = Enhancements.from_config_string(
+        """
+        function:foo.*      -group
+        module:bar.baz      -group
+        family:native       -group
+        """
+    )
+    _, updater_index = enhancements._get_matcher_indexes()
+    match_frames = [
+        create_match_frame(frame, "python")
+        for frame in [{"function": "foo.a"}, {"function": "x", "module": "bar.baz"}]
+    ]
+
+    assert updater_index.get_candidate_frames(match_frames) == {0: [0], 1: [1]}
+
+
+def test_matcher_index_shared_between_instances():
+    config = "function:foo -group"
+    a = Enhancements.from_config_string(config)
+    b = Enhancements.loads(a.dumps())
+    assert a._get_matcher_indexes() is b._get_matcher_indexes()
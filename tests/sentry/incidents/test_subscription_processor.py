@@ -35,8 +35,10 @@ from sentry.incidents.subscription_processor import (
     build_alert_rule_trigger_stat_key,
     build_trigger_stat_keys,
     get_alert_rule_stats,
+    get_alert_rule_stats_multi,
     get_redis_client,
     partition,
+    process_subscription_updates,
     update_alert_rule_stats,
 )
 from sentry.models import Integration
@@ -715,6 +717,64 @@ class ProcessUpdateTest(ProcessUpdateBaseClass):
             incident, [self.action], [(rule.resolve_threshold + 1, IncidentStatus.CLOSED)]
         )
 
+    def test_process_subscription_updates(self):
+        rule = self.rule
+        rule.update(threshold_period=2)
+        trigger = self.trigger
+        value = trigger.alert_threshold + 1
+
+        updates = [
+            (self.build_subscription_update(self.sub, timedelta(minutes=-10), value), self.sub),
+            (
+                self.build_subscription_update(self.other_sub, timedelta(minutes=-10), value),
+                self.other_sub,
+            ),
+            # Updates of a subscription are processed in order, so this one is skipped
+            (self.build_subscription_update(self.sub, timedelta(minutes=-11), value), self.sub),
+            (self.build_subscription_update(self.sub, timedelta(minutes=-9), value), self.sub),
+            # Resets the alert count of the other subscription
+            (
+                self.build_subscription_update(
+                    self.other_sub, timedelta(minutes=-9), trigger.alert_threshold - 1
+                ),
+                self.other_sub,
+            ),
+        ]
+        with self.feature(
+            ["organizations:incidents", "organizations:performance-view"]
+        ), self.capture_on_commit_callbacks(execute=True):
+            process_subscription_updates(updates)
+
+        self.metrics.incr.assert_any_call("incidents.alert_rules.skipping_already_processed_update")
+        incident = self.assert_active_incident(rule, self.sub)
+        self.assert_trigger_exists_with_status(incident, self.trigger, TriggerStatus.ACTIVE)
+        self.assert_actions_fired_for_incident(
+            incident, [self.action], [(trigger.alert_threshold + 1, IncidentStatus.CRITICAL)]
+        )
+        self.assert_no_active_incident(rule, self.other_sub)
+        alert_stats = get_alert_rule_stats(rule, self.other_sub, [trigger])[1]
+        assert alert_stats[trigger.id] == 0
+
+        # The reset count was stored, so a single update above the threshold
+        # doesn't trigger an incident
+        with self.feature(
+            ["organizations:incidents", "organizations:performance-view"]
+        ), self.capture_on_commit_callbacks(execute=True):
+            process_subscription_updates(
+                [
+                    (
+                        self.build_subscription_update(
+                            self.other_sub, timedelta(minutes=-8), value
+                        ),
+                        self.other_sub,
+                    )
+                ]
+            )
+
+        self.assert_no_active_incident(rule, self.other_sub)
+        alert_stats = get_alert_rule_stats(rule, self.other_sub, [trigger])[1]
+        assert alert_stats[trigger.id] == 1
+
     def test_multiple_subscriptions_do_not_conflict(self):
         # Verify that multiple subscriptions associated with a rule don't conflict with
         # each other
@@ -2300,6 +2360,27 @@ class TestGetAlertRuleStats(TestCase):
         assert alert_counts == {3: 1, 4: 3}
         assert resolve_counts == {3: 2, 4: 4}
 
+    def test_multi(self):
+        alert_rule = AlertRule(id=1)
+        sub = QuerySubscription(project_id=2)
+        other_sub = QuerySubscription(project_id=3)
+        triggers = [AlertRuleTrigger(id=3), AlertRuleTrigger(id=4)]
+        client = get_redis_client()
+        timestamp = datetime.now().replace(tzinfo=pytz.utc, microsecond=0)
+        client.set("{alert_rule:1:project:2}:last_update", int(to_timestamp(timestamp)))
+        client.set("{alert_rule:1:project:2}:trigger:4:alert_triggered", 3)
+        client.set("{alert_rule:1:project:3}:trigger:3:resolve_triggered", 2)
+
+        assert get_alert_rule_stats_multi(
+            [(alert_rule, sub, triggers), (alert_rule, other_sub, triggers)]
+        ) == [
+            get_alert_rule_stats(alert_rule, sub, triggers),
+            get_alert_rule_stats(alert_rule, other_sub, triggers),
+        ]
+        assert get_alert_rule_stats_multi([(alert_rule, sub, triggers)]) == [
+            (timestamp, {3: 0, 4: 3}, {3: 0, 4: 0})
+        ]
+
 
 class TestUpdateAlertRuleStats(TestCase):
     def test(self):
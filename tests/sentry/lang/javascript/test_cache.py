@@ -1,6 +1,6 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from sentry.lang.javascript.cache import SourceCache
+from sentry.lang.javascript.cache import ParsedSourceMapCache, SourceCache
 
 
 class BasicCacheTest(TestCase):
@@ -34,3 +34,51 @@ class BasicCacheTest(TestCase):
         # fall back to utf-8
         cache.add(url, "foobar".encode("utf-32"), encoding="utf-32")
         assert cache.get(url)[0] == "foobar"
+
+
+SOURCE = b"function add(a,b){return a+b}"
+SOURCEMAP = (
+    b'{"version":3,"sources":["add.js"],"names":["add","a","b"],'
+    b'"mappings":"AAAA,SAASA,IAAIC,EAAGC"}'
+)
+
+
+class ParsedSourceMapCacheTest(TestCase):
+    def test_reuses_parsed_sourcemaps(self):
+        cache = ParsedSourceMapCache(max_bytes=1024)
+        smcache = cache.get_or_build(SOURCE, SOURCEMAP)
+
+        assert cache.get_or_build(SOURCE, SOURCEMAP) is smcache
+        assert cache.get_or_build(SOURCE + b"\n", SOURCEMAP) is not smcache
+        assert len(cache) == 2
+
+    def test_evicts_by_size(self):
+        size = len(SOURCE) + len(SOURCEMAP)
+        cache = ParsedSourceMapCache(max_bytes=size * 2)
+
+        first = cache.get_or_build(SOURCE, SOURCEMAP)
+        cache.get_or_build(SOURCE + b"\n", SOURCEMAP)
+        assert len(cache) == 2
+
+        cache.get_or_build(SOURCE + b"\n\n", SOURCEMAP)
+        assert len(cache) == 2
+        assert cache.total_bytes <= size * 2
+        assert cache.get_or_build(SOURCE, SOURCEMAP) is not first
+
+    def test_oversized_entries_are_not_cached(self):
+        cache = ParsedSourceMapCache(max_bytes=10)
+        assert cache.get_or_build(SOURCE, SOURCEMAP) is not None
+        assert len(cache) == 0
+        assert cache.total_bytes == 0
+
+    def test_errors_are_not_cached(self):
+        cache = ParsedSourceMapCache(max_bytes=1024)
+        with mock.patch(
+            "sentry.lang.javascript.cache.SmCache.from_bytes", side_effect=ValueError
+        ) as from_bytes:
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    cache.get_or_build(SOURCE, SOURCEMAP)
+
+        assert from_bytes.call_count == 2
+        assert len(cache) == 0
@@ -2,6 +2,7 @@ import errno
 import re
 import unittest
 import zipfile
+from concurrent.futures import Future
 from copy import deepcopy
 from io import BytesIO
 from time import time
@@ -30,6 +31,7 @@ from sentry.lang.javascript.processor import (
     fetch_release_file,
     fold_function_name,
     generate_module,
+    get_artifact_bundle_cache_key,
     get_function_for_token,
     get_max_age,
     get_release_file_cache_key,
@@ -1982,6 +1984,93 @@ class FetchByDebugIdTest(FetchTest):
 
         fetcher.close()
 
+    def _create_debug_id_artifact_bundles(self, debug_ids):
+        artifact_bundle_ids = []
+        for idx, debug_id in enumerate(debug_ids):
+            file = self.get_compressed_zip_file(
+                f"bundle{idx}.zip",
+                {
+                    f"index{idx}.js": {
+                        "url": f"~/index{idx}.js",
+                        "type": "minified_source",
+                        "content": b"bar%d" % idx,
+                        "headers": {"content-type": "application/json", "debug-id": debug_id},
+                    },
+                },
+            )
+            artifact_bundle = ArtifactBundle.objects.create(
+                organization_id=self.organization.id, bundle_id=uuid4(), file=file, artifact_count=1
+            )
+            DebugIdArtifactBundle.objects.create(
+                organization_id=self.organization.id,
+                debug_id=debug_id,
+                artifact_bundle=artifact_bundle,
+                source_file_type=SourceFileType.MINIFIED_SOURCE.value,
+            )
+            ProjectArtifactBundle.objects.create(
+                organization_id=self.organization.id,
+                project_id=self.project.id,
+                artifact_bundle=artifact_bundle,
+            )
+            artifact_bundle_ids.append(artifact_bundle.id)
+        return artifact_bundle_ids
+
+    def test_prefetch_artifact_bundles(self):
+        debug_ids = ["c941d872-af1f-4f0c-a7ff-ad3d295fe153", "d941d872-af1f-4f0c-a7ff-ad3d295fe154"]
+        artifact_bundle_ids = self._create_debug_id_artifact_bundles(debug_ids)
+
+        fetcher = Fetcher(self.organization, self.project)
+        fetcher.prefetch_artifact_bundles(debug_ids, set(), timeout=10)
+        assert sorted(fetcher.open_archives) == sorted(artifact_bundle_ids)
+
+        # The bundles were cached while being downloaded.
+        for artifact_bundle_id in artifact_bundle_ids:
+            assert cache.get(get_artifact_bundle_cache_key(artifact_bundle_id)) is not None
+
+        with patch(
+            "sentry.lang.javascript.processor.Fetcher._fetch_artifact_bundle_file"
+        ) as fetch_artifact_bundle_file:
+            for idx, debug_id in enumerate(debug_ids):
+                result = fetcher.fetch_by_debug_id(debug_id, SourceFileType.MINIFIED_SOURCE)
+                assert result.body == b"bar%d" % idx
+
+        # All the files were served by the prefetched archives.
+        fetch_artifact_bundle_file.assert_not_called()
+
+        fetcher.close()
+
+    def test_prefetch_artifact_bundles_max_bundles(self):
+        debug_ids = ["c941d872-af1f-4f0c-a7ff-ad3d295fe153", "d941d872-af1f-4f0c-a7ff-ad3d295fe154"]
+        self._create_debug_id_artifact_bundles(debug_ids)
+
+        fetcher = Fetcher(self.organization, self.project)
+        fetcher.prefetch_artifact_bundles(debug_ids, set(), timeout=10, max_bundles=1)
+        assert len(fetcher.open_archives) == 1
+
+        fetcher.close()
+
+    def test_prefetch_artifact_bundles_pending_download(self):
+        debug_id = "c941d872-af1f-4f0c-a7ff-ad3d295fe153"
+        (artifact_bundle_id,) = self._create_debug_id_artifact_bundles([debug_id])
+        contents = ArtifactBundle.objects.get(id=artifact_bundle_id).file.getfile().read()
+
+        # A download that didn't finish within the prefetch timeout is reused by the regular fetching.
+        download = Future()
+        download.set_result(contents)
+        fetcher = Fetcher(self.organization, self.project)
+        fetcher.pending_downloads[artifact_bundle_id] = download
+
+        with patch(
+            "sentry.lang.javascript.processor.Fetcher._fetch_artifact_bundle_file"
+        ) as fetch_artifact_bundle_file:
+            result = fetcher.fetch_by_debug_id(debug_id, SourceFileType.MINIFIED_SOURCE)
+            assert result.body == b"bar0"
+
+        fetch_artifact_bundle_file.assert_not_called()
+        assert fetcher.pending_downloads == {}
+
+        fetcher.close()
+
 
 class BuildAbsPathDebugIdCacheTest(TestCase):
     def test_build_with(self):
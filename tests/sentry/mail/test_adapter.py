@@ -18,6 +18,7 @@ from sentry.event_manager import EventManager, get_event_type
 from sentry.issues.grouptype import ProfileFileIOGroupType
 from sentry.issues.issue_occurrence import IssueEvidence, IssueOccurrence
 from sentry.mail import build_subject_prefix, mail_adapter
+from sentry.mail.adapter import batch_digest_adds
 from sentry.models import (
     Activity,
     GroupRelease,
@@ -1420,6 +1421,29 @@ class MailAdapterRuleNotifyTest(BaseMailAdapterTest):
         self.adapter.rule_notify(event, futures, ActionTargetType.ISSUE_OWNERS)
         assert digests.add.call_count == 1
 
+    @mock.patch("sentry.mail.adapter.deliver_digest")
+    @mock.patch("sentry.mail.adapter.digests")
+    def test_digest_batch(self, digests, deliver_digest):
+        digests.enabled.return_value = True
+        digests.add_multi.return_value = [True, False]
+
+        event = self.store_event(data={}, project_id=self.project.id)
+        rule = self.create_project_rule(project=self.project)
+
+        futures = [RuleFuture(rule, {})]
+        with batch_digest_adds():
+            self.adapter.rule_notify(event, futures, ActionTargetType.ISSUE_OWNERS)
+            self.adapter.rule_notify(
+                event, futures, ActionTargetType.MEMBER, target_identifier=self.user.id
+            )
+            assert digests.add_multi.call_count == 0
+
+        assert digests.add.call_count == 0
+        assert digests.add_multi.call_count == 1
+        ((first_key, _), (second_key, _)) = digests.add_multi.call_args[0][0]
+        assert first_key != second_key
+        deliver_digest.delay.assert_called_once_with(first_key)
+
     @mock.patch("sentry.mail.adapter.digests")
     def test_digest_with_perf_issue(self, digests):
         digests.enabled.return_value = True
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import zipfile
+from io import BytesIO
+from unittest import mock
+from uuid import uuid4
+
+from sentry.models import ArtifactBundle, File, SourceFileType
+from sentry.models.artifactbundle import ArtifactBundleArchive, MappedArtifactBundleArchive
+from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
+from sentry.utils import json
+
+DEBUG_ID = "c941d872-af1f-4f0c-a7ff-ad3d295fe153"
+
+
+class ArtifactBundleFileCacheTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_path = tempfile.mkdtemp()
+
+    def create_artifact_bundle(self, minified_content=b"function foo() {}"):
+        manifest = {
+            "files": {
+                "files/_/_/index.js": {
+                    "url": "~/index.js",
+                    "type": "minified_source",
+                    "headers": {"Sourcemap": "index.js.map", "debug-id": DEBUG_ID},
+                },
+                "files/_/_/index.js.map": {
+                    "url": "~/index.js.map",
+                    "type": "source_map",
+                    "headers": {"debug-id": DEBUG_ID},
+                },
+            }
+        }
+
+        compressed = BytesIO()
+        with zipfile.ZipFile(compressed, mode="w") as zip_file:
+            zip_file.writestr(
+                "files/_/_/index.js", minified_content, compress_type=zipfile.ZIP_DEFLATED
+            )
+            zip_file.writestr("files/_/_/index.js.map", b'{"version": 3}')
+            zip_file.writestr("manifest.json", json.dumps(manifest))
+
+        return self.create_artifact_bundle_from_zip(compressed)
+
+    def create_artifact_bundle_from_zip(self, compressed):
+        compressed.seek(0)
+        file = File.objects.create(name="bundle.zip", type="artifact.bundle")
+        file.putfile(compressed)
+
+        return ArtifactBundle.objects.create(
+            organization_id=self.organization.id, bundle_id=uuid4(), file=file, artifact_count=2
+        )
+
+    def get_archive(self, artifact_bundle):
+        with override_options(
+            {"artifactbundle.cache-path": self.cache_path, "artifactbundle.cache-limit": 0}
+        ):
+            assert ArtifactBundle.cache.should_cache(artifact_bundle)
+            return ArtifactBundle.cache.get_archive(artifact_bundle)
+
+    def test_get_archive(self):
+        artifact_bundle = self.create_artifact_bundle()
+
+        archive = self.get_archive(artifact_bundle)
+        assert isinstance(archive, MappedArtifactBundleArchive)
+
+        fp, headers = archive.get_file_by_url("~/index.js")
+        assert fp.read() == b"function foo() {}"
+        assert headers == {"Sourcemap": "index.js.map", "debug-id": DEBUG_ID}
+
+        fp, headers = archive.get_file_by_debug_id(DEBUG_ID, SourceFileType.SOURCE_MAP)
+        assert fp.read() == b'{"version": 3}'
+        assert headers == {"debug-id": DEBUG_ID}
+
+        assert (
+            archive.get_file_url_by_debug_id(DEBUG_ID, SourceFileType.MINIFIED_SOURCE)
+            == "~/index.js"
+        )
+        assert archive.get_file_url_by_debug_id(DEBUG_ID, SourceFileType.SOURCE) is None
+
+        with self.assertRaises(KeyError):
+            archive.get_file_by_url("~/missing.js")
+
+        archive.close()
+
+        # The bundle and its index are served from disk without downloading it again.
+        base = os.path.join(self.cache_path, str(self.organization.id))
+        assert sorted(os.listdir(base)) == [
+            f"{artifact_bundle.file_id}.index",
+            f"{artifact_bundle.file_id}.zip",
+        ]
+        with mock.patch.object(File, "save_to") as save_to:
+            archive = self.get_archive(artifact_bundle)
+            fp, _ = archive.get_file_by_url("~/index.js")
+            assert fp.read() == b"function foo() {}"
+            archive.close()
+        save_to.assert_not_called()
+
+    def test_get_archive_unmappable(self):
+        compressed = BytesIO()
+        with zipfile.ZipFile(compressed, mode="w") as zip_file:
+            zip_file.writestr("manifest.json", json.dumps({"files": {"index.js": {"url": "a"}}}))
+            zip_file.writestr("index.js", b"foo", compress_type=zipfile.ZIP_BZIP2)
+        artifact_bundle = self.create_artifact_bundle_from_zip(compressed)
+
+        archive = self.get_archive(artifact_bundle)
+        assert isinstance(archive, ArtifactBundleArchive)
+        fp, _ = archive.get_file_by_url("a")
+        assert fp.read() == b"foo"
+        archive.close()
+
+    def test_evict(self):
+        first = self.create_artifact_bundle()
+        second = self.create_artifact_bundle(b"function bar() {}")
+
+        with override_options({"artifactbundle.cache-max-size": first.file.size}):
+            self.get_archive(first).close()
+            # The older bundle is evicted to make space for the new one.
+            self.get_archive(second).close()
+
+        base = os.path.join(self.cache_path, str(self.organization.id))
+        assert sorted(os.listdir(base)) == [
+            f"{second.file_id}.index",
+            f"{second.file_id}.zip",
+        ]
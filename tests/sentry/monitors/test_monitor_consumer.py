@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from unittest import mock
 
 import msgpack
@@ -14,6 +14,8 @@ from sentry.constants import ObjectStatus
 from sentry.db.models import BoundedPositiveIntegerField
 from sentry.monitors.consumers.monitor_consumer import (
     StoreMonitorCheckInStrategyFactory,
+    _ensure_monitor_with_config,
+    _process_batch,
     _process_message,
 )
 from sentry.monitors.models import (
@@ -86,19 +88,31 @@ class MonitorConsumerTest(TestCase):
         }
         return json.dumps(payload)
 
-    def send_message(self, wrapper: Dict[str, Any]) -> None:
+    def send_messages(
+        self,
+        wrappers: List[Dict[str, Any]],
+        factory: Optional[StoreMonitorCheckInStrategyFactory] = None,
+    ) -> None:
         commit = mock.Mock()
         partition = Partition(Topic("test"), 0)
-        StoreMonitorCheckInStrategyFactory().create_with_partitions(commit, {partition: 0}).submit(
-            Message(
-                BrokerValue(
-                    KafkaPayload(b"fake-key", msgpack.packb(wrapper), []),
-                    partition,
-                    1,
-                    datetime.now(),
+        factory = factory or StoreMonitorCheckInStrategyFactory()
+        strategy = factory.create_with_partitions(commit, {partition: 0})
+        for offset, wrapper in enumerate(wrappers, start=1):
+            strategy.submit(
+                Message(
+                    BrokerValue(
+                        KafkaPayload(b"fake-key", msgpack.packb(wrapper), []),
+                        partition,
+                        offset,
+                        datetime.now(),
+                    )
                 )
             )
-        )
+        # Flushes the batch
+        strategy.join()
+
+    def send_message(self, wrapper: Dict[str, Any]) -> None:
+        self.send_messages([wrapper])
 
     def test_payload(self) -> None:
         monitor = self._create_monitor(slug="my-monitor")
@@ -273,6 +287,121 @@ class MonitorConsumerTest(TestCase):
             == monitor_environment.monitor.get_next_scheduled_checkin(checkin.date_added)
         )
 
+    def test_batch(self):
+        monitor = self._create_monitor(slug="my-monitor")
+        other_monitor = self._create_monitor(slug="my-other-monitor")
+
+        in_progress = self.get_message(monitor.slug, status="in_progress")
+        guid = self.guid
+        self.send_messages(
+            [
+                in_progress,
+                self.get_message(other_monitor.slug, status="error"),
+                self.get_message(monitor.slug, guid=guid),
+                self.get_message(monitor.slug, guid=guid, status="error"),
+            ]
+        )
+
+        # Updates of a check-in in the same batch are applied in order
+        checkin = MonitorCheckIn.objects.get(guid=guid)
+        assert checkin.status == CheckInStatus.OK
+        assert checkin.duration is not None
+
+        monitor_environment = MonitorEnvironment.objects.get(id=checkin.monitor_environment_id)
+        assert monitor_environment.status == MonitorStatus.OK
+
+        other_checkin = MonitorCheckIn.objects.get(monitor=other_monitor)
+        assert other_checkin.status == CheckInStatus.ERROR
+        other_monitor_environment = MonitorEnvironment.objects.get(
+            id=other_checkin.monitor_environment_id
+        )
+        assert other_monitor_environment.status == MonitorStatus.ERROR
+
+    def test_batch_status_order(self):
+        monitor = self._create_monitor(slug="my-monitor")
+        _process_batch(
+            [
+                self.get_message(monitor.slug),
+                self.get_message(monitor.slug, status="error"),
+                self.get_message(monitor.slug),
+            ]
+        )
+
+        checkins = MonitorCheckIn.objects.filter(monitor_id=monitor.id).order_by("id")
+        assert [checkin.status for checkin in checkins] == [
+            CheckInStatus.OK,
+            CheckInStatus.ERROR,
+            CheckInStatus.OK,
+        ]
+        # Check-ins after the first one expect the next scheduled check-in
+        assert checkins[0].expected_time is None
+        assert checkins[1].expected_time is not None
+
+        monitor_environment = MonitorEnvironment.objects.get(id=checkins[2].monitor_environment_id)
+        assert monitor_environment.status == MonitorStatus.OK
+        assert monitor_environment.last_checkin == checkins[2].date_updated
+
+    def test_batch_invalid_check_in(self):
+        monitor = self._create_monitor(slug="my-monitor")
+        valid = self.get_message(monitor.slug)
+        guid = self.guid
+        self.send_messages([valid, self.get_message(monitor.slug, check_in_id="invalid")])
+
+        # The valid check-in is still stored
+        assert MonitorCheckIn.objects.filter(guid=guid).exists()
+        assert MonitorCheckIn.objects.filter(monitor_id=monitor.id).count() == 1
+
+    @mock.patch("sentry.monitors.consumers.monitor_consumer.signal_first_checkin")
+    @mock.patch("sentry.coreapi.insert_data_to_database_legacy")
+    def test_batch_failed_status_update(self, mock_insert_data_to_database_legacy, mock_signal):
+        monitor = self._create_monitor(slug="my-monitor")
+        other_monitor = self._create_monitor(slug="my-other-monitor")
+        mock_insert_data_to_database_legacy.side_effect = [Exception("boom"), None]
+
+        self.send_messages(
+            [
+                self.get_message(monitor.slug, status="error"),
+                self.get_message(other_monitor.slug, status="error"),
+            ]
+        )
+
+        # A failed status update doesn't retry the batch, so the failure
+        # events and first check-in signals are only emitted once
+        assert len(mock_insert_data_to_database_legacy.mock_calls) == 2
+        assert len(mock_signal.mock_calls) == 2
+
+        for m in (monitor, other_monitor):
+            checkin = MonitorCheckIn.objects.get(monitor=m)
+            assert checkin.status == CheckInStatus.ERROR
+            monitor_environment = MonitorEnvironment.objects.get(id=checkin.monitor_environment_id)
+            assert monitor_environment.status == MonitorStatus.ERROR
+
+    def test_monitor_cache(self):
+        monitor = self._create_monitor(slug="my-monitor")
+        factory = StoreMonitorCheckInStrategyFactory()
+
+        self.send_messages([self.get_valid_wrapper(monitor.slug)], factory=factory)
+        with mock.patch(
+            "sentry.monitors.consumers.monitor_consumer._ensure_monitor_with_config",
+            wraps=_ensure_monitor_with_config,
+        ) as ensure_monitor:
+            self.send_messages([self.get_valid_wrapper(monitor.slug)], factory=factory)
+            assert not ensure_monitor.called
+
+            # A changed config is applied
+            self.send_messages(
+                [
+                    self.get_message(
+                        monitor.slug,
+                        monitor_config={"schedule": {"type": "crontab", "value": "13 * * * *"}},
+                    )
+                ],
+                factory=factory,
+            )
+            assert ensure_monitor.called
+
+        assert MonitorCheckIn.objects.filter(monitor_id=monitor.id).count() == 3
+
     def test_rate_limit(self):
         monitor = self._create_monitor(slug="my-monitor")
 
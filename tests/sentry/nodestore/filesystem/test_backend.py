@@ -0,0 +1,97 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from sentry.nodestore.filesystem.backend import ZSTD_MAGIC, FileSystemNodeStorage
+from sentry.utils.dates import to_timestamp
+
+
+@contextmanager
+def get_temporary_filesystem_nodestorage() -> FileSystemNodeStorage:
+    with tempfile.TemporaryDirectory() as path:
+        yield FileSystemNodeStorage(path=path)
+
+
+class TestFileSystemNodeStorage:
+    def setup_method(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ns = FileSystemNodeStorage(path=self.tmpdir.name, bucket_size=3600)
+        self.ns.bootstrap()
+
+    def teardown_method(self):
+        self.tmpdir.cleanup()
+
+    def test_set(self):
+        self.ns.set("node_1", {"foo": "bar"})
+
+        path = self.ns.node_path("node_1")
+        assert os.path.relpath(path, self.tmpdir.name).count(os.sep) == 3
+        with open(path, "rb") as f:
+            assert f.read().startswith(ZSTD_MAGIC)
+
+        assert self.ns.get("node_1") == {"foo": "bar"}
+
+    def test_get_legacy(self):
+        with open(self.ns.legacy_node_path("node_1"), "wb") as f:
+            f.write(b'{"foo": "bar"}')
+
+        assert self.ns.get("node_1") == {"foo": "bar"}
+        assert self.ns.get_multi(["node_1", "node_2"]) == {"node_1": {"foo": "bar"}, "node_2": None}
+
+    def test_get_most_recent(self):
+        now = datetime(2023, 5, 1, 12, tzinfo=timezone.utc)
+        with mock.patch("sentry.nodestore.filesystem.backend.time") as time:
+            time.return_value = to_timestamp(now - timedelta(hours=2))
+            self.ns.set("node_1", {"foo": "old"})
+            time.return_value = to_timestamp(now)
+            self.ns.set("node_1", {"foo": "new"})
+
+        assert len(self.ns._get_buckets()) == 2
+        assert self.ns.get("node_1") == {"foo": "new"}
+
+        self.ns.delete("node_1")
+        assert self.ns.get("node_1") is None
+
+    def test_cleanup(self):
+        now = datetime(2023, 5, 1, 12, tzinfo=timezone.utc)
+        with mock.patch("sentry.nodestore.filesystem.backend.time") as time:
+            time.return_value = to_timestamp(now - timedelta(hours=3))
+            self.ns.set("node_1", {"foo": "a"})
+            time.return_value = to_timestamp(now)
+            self.ns.set("node_2", {"foo": "b"})
+
+        self.ns.cleanup(now - timedelta(hours=1))
+
+        assert self.ns._get_buckets() == [str(int(to_timestamp(now)))]
+        assert self.ns.get("node_1") is None
+        assert self.ns.get("node_2") == {"foo": "b"}
+        assert not os.path.lexists(self.ns.index_path("node_1"))
+
+    def test_cleanup_rewritten(self):
+        now = datetime(2023, 5, 1, 12, tzinfo=timezone.utc)
+        with mock.patch("sentry.nodestore.filesystem.backend.time") as time:
+            time.return_value = to_timestamp(now - timedelta(hours=3))
+            self.ns.set("node_1", {"foo": "old"})
+            time.return_value = to_timestamp(now)
+            self.ns.set("node_1", {"foo": "new"})
+
+        self.ns.cleanup(now - timedelta(hours=1))
+
+        assert self.ns._get_buckets() == [str(int(to_timestamp(now)))]
+        assert self.ns.get("node_1") == {"foo": "new"}
+
+    def test_get_single_open(self):
+        for hours in range(48):
+            os.makedirs(os.path.join(self.tmpdir.name, str(hours * 3600)))
+        self.ns.set("node_1", {"foo": "bar"})
+
+        with mock.patch("builtins.open", wraps=open) as opened:
+            assert self.ns.get("node_1") == {"foo": "bar"}
+            assert self.ns.get("node_2") is None
+
+        # A miss checks the index and the legacy layout, whatever the number of buckets.
+        assert opened.call_count == 3
@@ -0,0 +1,125 @@
+import threading
+from unittest import mock
+
+import pytest
+
+from sentry.nodestore.django.models import Node
+from sentry.nodestore.tiered.backend import FORMAT_ZSTD, TieredNodeStorage
+from sentry.testutils.silo import region_silo_test
+from sentry.utils.strings import compress, decompress
+
+
+@pytest.mark.django_db
+class TestTieredNodeStorage:
+    def setup_method(self):
+        self.ns = TieredNodeStorage()
+
+    @region_silo_test(stable=True)
+    def test_set_compressed(self):
+        self.ns.set("d2502ebbd7df41ceba8d3275595cac33", {"foo": "bar"})
+        data = decompress(Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33").data)
+        assert data.startswith(FORMAT_ZSTD)
+
+        self.ns = TieredNodeStorage()
+        assert self.ns.get("d2502ebbd7df41ceba8d3275595cac33") == {"foo": "bar"}
+
+    @region_silo_test(stable=True)
+    def test_get_uncompressed(self):
+        Node.objects.create(id="d2502ebbd7df41ceba8d3275595cac33", data=compress(b'{"foo": "bar"}'))
+        assert self.ns.get("d2502ebbd7df41ceba8d3275595cac33") == {"foo": "bar"}
+
+    @region_silo_test(stable=True)
+    def test_local_cache(self):
+        self.ns.set("node_1", {"foo": "bar"})
+
+        with mock.patch.object(self.ns.backend, "_get_bytes") as get_bytes:
+            assert self.ns.get("node_1") == {"foo": "bar"}
+        get_bytes.assert_not_called()
+
+    @region_silo_test(stable=True)
+    def test_local_cache_evicts(self):
+        self.ns = TieredNodeStorage(compression=None, local_cache_size=100)
+        self.ns.set("node_1", {"foo": "a" * 60})
+        self.ns.set("node_2", {"foo": "b" * 60})
+        assert list(self.ns._local_cache) == ["node_2"]
+        assert self.ns.get("node_1") == {"foo": "a" * 60}
+
+    @region_silo_test(stable=True)
+    def test_write_batch(self):
+        self.ns = TieredNodeStorage(write_batch_size=2, write_batch_window=60)
+
+        with mock.patch.object(
+            self.ns.backend, "_set_bytes_multi", wraps=self.ns.backend._set_bytes_multi
+        ) as set_bytes_multi:
+            self.ns.set("node_1", {"foo": "a"})
+            assert not Node.objects.filter(id="node_1").exists()
+            # Pending writes are visible to reads.
+            assert self.ns.get_multi(["node_1"]) == {"node_1": {"foo": "a"}}
+
+            self.ns.set("node_2", {"foo": "b"})
+            self.ns.set("node_3", {"foo": "c"})
+            assert set_bytes_multi.call_count == 1
+            assert sorted(set_bytes_multi.call_args[0][0]) == ["node_1", "node_2"]
+
+            self.ns.flush()
+            assert set_bytes_multi.call_count == 2
+
+        assert Node.objects.filter(id__in=["node_1", "node_2", "node_3"]).count() == 3
+
+    @region_silo_test(stable=True)
+    def test_write_batch_flush_ids(self):
+        self.ns = TieredNodeStorage(write_batch_size=10, write_batch_window=60)
+        self.ns.set("node_1", {"foo": "a"})
+        self.ns.set("node_2", {"foo": "b"})
+
+        self.ns.flush(["node_1"])
+        assert Node.objects.filter(id="node_1").exists()
+        assert not Node.objects.filter(id="node_2").exists()
+        # The rest of the batch stays pending until its timer or size is reached.
+        assert self.ns._write_batch.count == 1
+        assert self.ns._write_batch.timer is not None
+
+        self.ns.flush()
+        assert Node.objects.filter(id="node_2").exists()
+        assert self.ns._write_batch.timer is None
+
+    @region_silo_test(stable=True)
+    def test_delete_pending(self):
+        self.ns = TieredNodeStorage(write_batch_size=10)
+        self.ns.set("node_1", {"foo": "a"})
+        self.ns.delete("node_1")
+        self.ns.flush()
+
+        assert self.ns.get("node_1") is None
+        assert not Node.objects.filter(id="node_1").exists()
+
+    @region_silo_test(stable=True)
+    def test_write_batch_window(self):
+        self.ns = TieredNodeStorage(write_batch_size=10, write_batch_window=0.5)
+
+        # The wrapped backend is thread local as well, so it's patched on the
+        # class to be seen by the background flush.
+        with mock.patch.object(type(self.ns.backend), "_set_bytes_multi") as set_bytes_multi:
+            self.ns.set("node_1", {"foo": "a"})
+            flush_timer = self.ns._write_batch.timer
+            assert not set_bytes_multi.called
+
+            # The batch is flushed in the background without further writes.
+            flush_timer.join()
+
+        set_bytes_multi.assert_called_once()
+        assert list(set_bytes_multi.call_args[0][0]) == ["node_1"]
+        assert self.ns._write_batch.pending == {}
+
+    @region_silo_test(stable=True)
+    def test_write_batch_threads(self):
+        self.ns = TieredNodeStorage(write_batch_size=10, write_batch_window=60)
+
+        thread = threading.Thread(target=self.ns.set, args=("node_1", {"foo": "a"}))
+        thread.start()
+        thread.join()
+
+        # Writes of other threads are pending in the same batch.
+        assert self.ns.get("node_1") == {"foo": "a"}
+        self.ns.flush()
+        assert Node.objects.filter(id="node_1").exists()
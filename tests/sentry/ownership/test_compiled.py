@@ -0,0 +1,77 @@
+import pytest
+
+from sentry.ownership.compiled import CompiledOwnership, OwnershipEventData, get_compiled_ownership
+from sentry.ownership.grammar import Matcher, Owner, Rule, dump_schema
+
+PATTERNS = [
+    ("path", "*.py"),
+    ("path", "foo/*.py"),
+    ("path", "/usr/local/src/*/app.py"),
+    ("path", "*other*"),
+    ("path", "*oth*"),
+    ("path", "src/[ab]pp/*"),
+    ("path", "*"),
+    ("path", "*.js"),
+    ("codeowners", "*.py"),
+    ("codeowners", "foo/"),
+    ("codeowners", "/usr/local/"),
+    ("codeowners", "**/other/**"),
+    ("codeowners", "docs/"),
+    ("module", "foo.bar"),
+    ("module", "foo.*"),
+    ("module", "bar.*"),
+    ("url", "*.js"),
+    ("url", "http://*.com/foo.js"),
+    ("url", "*.jsx"),
+    ("tags.environment", "prod*"),
+    ("tags.environment", "dev"),
+]
+
+EVENTS = [
+    {},
+    {"request": {"url": "http://example.com/foo.js"}, "tags": [["environment", "production"]]},
+    {
+        "exception": {
+            "values": [
+                {
+                    "stacktrace": {
+                        "frames": [
+                            {"filename": "foo/file.py", "module": "foo.bar"},
+                            {"abs_path": "/usr/local/src/other/app.py", "module": "baz"},
+                        ]
+                    }
+                }
+            ]
+        }
+    },
+    {
+        "platform": "java",
+        "stacktrace": {
+            "frames": [{"module": "bar.Baz", "filename": "Baz.java"}, {"filename": "SRC/APP/x"}]
+        },
+    },
+]
+
+
+def _get_rules():
+    return [Rule(Matcher(type, pattern), [Owner("team", "team")]) for type, pattern in PATTERNS]
+
+
+@pytest.mark.parametrize("data", EVENTS)
+def test_matches_like_rules(data):
+    rules = _get_rules()
+    compiled = CompiledOwnership(rules)
+
+    assert compiled.get_matching_rules(OwnershipEventData(data)) == [
+        rule for rule in rules if rule.test(data)
+    ]
+
+
+def test_get_compiled_ownership():
+    schema = dump_schema(_get_rules())
+
+    compiled = get_compiled_ownership(schema)
+    assert get_compiled_ownership(dump_schema(_get_rules())) is compiled
+
+    schema["rules"].pop()
+    assert get_compiled_ownership(schema) is not compiled
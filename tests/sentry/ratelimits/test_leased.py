@@ -0,0 +1,60 @@
+from unittest import mock
+
+from freezegun import freeze_time
+
+from sentry.ratelimits.leased import LeasedRedisRateLimiter
+from sentry.testutils import TestCase
+from sentry.testutils.silo import region_silo_test
+
+
+@region_silo_test(stable=True)
+class LeasedRedisRateLimiterTest(TestCase):
+    def setUp(self):
+        self.backend = LeasedRedisRateLimiter(lease_size=10, max_lease_ratio=0.1)
+
+    def test_limit(self):
+        with freeze_time("2000-01-01"):
+            for i in range(1, 101):
+                assert self.backend.is_limited_with_value("foo", 100)[:2] == (False, i)
+            assert self.backend.current_value("foo") == 100
+            assert self.backend.is_limited("foo", 100)
+
+    def test_leases_tokens(self):
+        with freeze_time("2000-01-01"), mock.patch.object(
+            self.backend.client, "incrby", wraps=self.backend.client.incrby
+        ) as incrby:
+            for _ in range(25):
+                assert not self.backend.is_limited("foo", 100)
+            assert incrby.call_count == 3
+            assert self.backend.current_value("foo") == 25
+
+            # Once the limit is reached, the key is limited without asking redis.
+            for _ in range(100):
+                self.backend.is_limited("foo", 100)
+            assert incrby.call_count == 11
+
+    def test_leases_are_shared(self):
+        self.backend = LeasedRedisRateLimiter(lease_size=10, max_lease_ratio=0.5)
+        other = LeasedRedisRateLimiter(lease_size=10, max_lease_ratio=0.5)
+        with freeze_time("2000-01-01"):
+            assert not self.backend.is_limited("foo", 20)
+            assert not other.is_limited("foo", 20)
+            # Both processes leased half of the limit.
+            for _ in range(9):
+                assert not self.backend.is_limited("foo", 20)
+            assert self.backend.is_limited("foo", 20)
+            assert not other.is_limited("foo", 20)
+
+    def test_small_limit(self):
+        with freeze_time("2000-01-01"):
+            assert not self.backend.is_limited("foo", 1, self.project)
+            assert self.backend.is_limited("foo", 1, self.project)
+
+    def test_window_reset(self):
+        with freeze_time("2000-01-01") as frozen_time:
+            for _ in range(100):
+                self.backend.is_limited("foo", 100, window=10)
+            assert self.backend.is_limited("foo", 100, window=10)
+
+            frozen_time.tick(10)
+            assert not self.backend.is_limited("foo", 100, window=10)
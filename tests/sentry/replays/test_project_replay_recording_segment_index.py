@@ -1,4 +1,6 @@
 import datetime
+import os
+import tempfile
 import uuid
 import zlib
 from collections import namedtuple
@@ -52,6 +54,35 @@ class ProjectReplayRecordingSegmentIndexMixin:
             response.streaming_content
         )
 
+    def test_index_download_more_segments_than_in_flight(self):
+        for i in range(0, 25):
+            self.save_recording_segment(i, f'[{{"test":"hello {i}"}}]'.encode())
+
+        with self.feature("organizations:session-replay"):
+            response = self.client.get(self.url + "?download&per_page=25")
+
+        assert response.status_code == 200
+        expected = b",".join(f'[{{"test":"hello {i}"}}]'.encode() for i in range(0, 25))
+        assert b"[" + expected + b"]" == b"".join(response.streaming_content)
+
+    def test_index_download_segment_cache(self):
+        for i in range(0, 3):
+            self.save_recording_segment(i, f'[{{"test":"hello {i}"}}]'.encode())
+
+        with tempfile.TemporaryDirectory() as cache_dir, self.settings(
+            SENTRY_REPLAYS_SEGMENT_CACHE_DIR=cache_dir
+        ), self.feature("organizations:session-replay"):
+            response = self.client.get(self.url + "?download=true")
+            assert b'[[{"test":"hello 0"}],[{"test":"hello 1"}],[{"test":"hello 2"}]]' == b"".join(
+                response.streaming_content
+            )
+            assert len(os.listdir(cache_dir)) == 3
+
+            response = self.client.get(self.url + "?download=true")
+            assert b'[[{"test":"hello 0"}],[{"test":"hello 1"}],[{"test":"hello 2"}]]' == b"".join(
+                response.streaming_content
+            )
+
     def test_index_download_paginate(self):
         for i in range(0, 3):
             self.save_recording_segment(i, f'[{{"test":"hello {i}"}}]'.encode())
@@ -0,0 +1,28 @@
+import zlib
+
+import pytest
+
+from sentry.replays.usecases.reader import decompress, iter_decompressed
+
+
+@pytest.mark.parametrize(
+    "buffer",
+    [
+        b'[{"test":"hello"}]',
+        zlib.compress(b'[{"test":"hello"}]'),
+        zlib.compress(b"[" + b",".join(b'{"test":"%d"}' % i for i in range(10000)) + b"]"),
+    ],
+)
+def test_iter_decompressed(buffer):
+    """Test "iter_decompressed" yields the output of "decompress" in chunks."""
+    chunks = list(iter_decompressed(buffer, chunk_size=1024))
+    assert b"".join(chunks) == decompress(buffer)
+    if not buffer.startswith(b"["):
+        assert all(len(chunk) <= 1024 for chunk in chunks)
+
+
+def test_iter_decompressed_truncated():
+    """Test "iter_decompressed" raises on truncated input like "decompress"."""
+    buffer = zlib.compress(b'[{"test":"hello"}]')[:-4]
+    with pytest.raises(zlib.error):
+        list(iter_decompressed(buffer))
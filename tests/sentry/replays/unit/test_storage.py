@@ -1,8 +1,13 @@
+import os
+import time
+
 from django.conf import settings
 
 from sentry import options
 from sentry.replays.lib.storage import (
     FilestoreBlob,
+    RecordingSegmentStorageMeta,
+    SegmentDiskCache,
     StorageBlob,
     _make_storage_driver,
     make_storage_driver,
@@ -67,3 +72,50 @@ def test_make_storage_driver():
     assert isinstance(make_storage_driver(80), FilestoreBlob)
     assert isinstance(make_storage_driver(90), FilestoreBlob)
     assert isinstance(make_storage_driver(100), FilestoreBlob)
+
+
+def _make_segment(segment_id: int) -> RecordingSegmentStorageMeta:
+    return RecordingSegmentStorageMeta(
+        project_id=1, replay_id="a" * 32, segment_id=segment_id, retention_days=30
+    )
+
+
+def test_segment_disk_cache(tmp_path):
+    """Test "SegmentDiskCache" returns the blobs it stored."""
+    cache = SegmentDiskCache(str(tmp_path / "segments"), max_size=1024, ttl=60)
+    assert cache.get(_make_segment(0)) is None
+
+    cache.set(_make_segment(0), b"hello")
+    assert cache.get(_make_segment(0)) == b"hello"
+    assert cache.get(_make_segment(1)) is None
+    assert os.listdir(tmp_path / "segments") == ["30-1-" + "a" * 32 + "-0"]
+
+
+def test_segment_disk_cache_ttl(tmp_path):
+    """Test "SegmentDiskCache" misses and evicts expired blobs."""
+    cache = SegmentDiskCache(str(tmp_path), max_size=1024, ttl=60)
+    cache.set(_make_segment(0), b"hello")
+
+    expired = time.time() - 120
+    os.utime(cache._make_path(_make_segment(0)), (expired, expired))
+    assert cache.get(_make_segment(0)) is None
+
+    cache.evict()
+    assert os.listdir(tmp_path) == []
+
+
+def test_segment_disk_cache_evicts_least_recently_used(tmp_path):
+    """Test "SegmentDiskCache" evicts the least recently read blobs above the maximum size."""
+    cache = SegmentDiskCache(str(tmp_path), max_size=10, ttl=60)
+    for i in range(0, 3):
+        cache.set(_make_segment(i), b"hello")
+        accessed = time.time() - 30 + i
+        os.utime(cache._make_path(_make_segment(i)), (accessed, accessed))
+
+    # Reading the oldest blob makes it the most recently used.
+    assert cache.get(_make_segment(0)) == b"hello"
+
+    cache.evict()
+    assert cache.get(_make_segment(0)) == b"hello"
+    assert cache.get(_make_segment(1)) is None
+    assert cache.get(_make_segment(2)) == b"hello"
@@ -347,6 +347,48 @@ class RuleProcessorTest(TestCase):
         # mock condition first.
         assert passes.call_count == 0
 
+    @patch(
+        "sentry.constants._SENTRY_RULES",
+        [
+            "sentry.mail.actions.NotifyEmailAction",
+            "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+        ],
+    )
+    def test_frequency_conditions_share_queries(self):
+        frequency_condition = {
+            "id": "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+            "value": 1,
+            "interval": "1h",
+        }
+        self.rule.update(
+            data={"conditions": [frequency_condition], "actions": [EMAIL_ACTION_DATA]},
+        )
+        Rule.objects.create(
+            project=self.group_event.project,
+            data={"conditions": [frequency_condition], "actions": [EMAIL_ACTION_DATA]},
+        )
+        with patch("sentry.rules.processor.rules", init_registry()), patch(
+            "sentry.rules.conditions.event_frequency.EventFrequencyCondition.query_hook",
+            return_value=5,
+        ) as query_hook:
+            rp = RuleProcessor(
+                self.group_event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            results = list(rp.apply())
+            assert len(results) == 1
+            assert len(results[0][1]) == 2
+            assert query_hook.call_count == 1
+
+            # The result is shared with other workers processing events of the group.
+            cache.delete_many([rp._build_rule_status_cache_key(rule.id) for rule in rp.get_rules()])
+            GroupRuleStatus.objects.update(last_active=None)
+            rp.apply()
+            assert query_hook.call_count == 1
+
 
 class MockFilterTrue(EventFilter):
     id = "tests.sentry.rules.test_processor.MockFilterTrue"
@@ -12,7 +12,11 @@ import pytest
 
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.indexer.base import FetchType, FetchTypeExt, Metadata
-from sentry.sentry_metrics.indexer.cache import CachingIndexer, StringIndexerCache
+from sentry.sentry_metrics.indexer.cache import (
+    CachingIndexer,
+    LocalStringIndexerCache,
+    StringIndexerCache,
+)
 from sentry.sentry_metrics.indexer.mock import RawSimpleIndexer
 from sentry.sentry_metrics.indexer.postgres.postgres_v2 import PGStringIndexerV2
 from sentry.sentry_metrics.indexer.strings import SHARED_STRINGS, StaticStringIndexer
@@ -300,6 +304,63 @@ def test_already_cached_plus_read_results(
     )
 
 
+def test_local_cache(indexer, indexer_cache, use_case_id) -> None:
+    org_id = 9
+    local_cache = LocalStringIndexerCache(max_size=2, ttl=60, negative_ttl=60)
+    indexer = CachingIndexer(indexer_cache, indexer, local_cache)
+
+    results = indexer.bulk_record({use_case_id: {org_id: {"a", "b"}}})
+    ids = dict(results[use_case_id][org_id])
+
+    # Results are served from the local cache even if the shared cache lost them.
+    indexer_cache.cache.clear()
+    results = indexer.bulk_record({use_case_id: {org_id: {"a", "b"}}})
+    assert results[use_case_id][org_id] == ids
+    assert_fetch_type_for_tag_string_set(
+        results.get_fetch_metadata()[use_case_id][org_id], FetchType.CACHE_HIT, {"a", "b"}
+    )
+    assert indexer.resolve(use_case_id, org_id, "a") == ids["a"]
+
+    # Unknown strings are cached as negative entries by resolve, but are
+    # still recorded.
+    assert indexer.resolve(use_case_id, org_id, "c") is None
+    results = indexer.bulk_record({use_case_id: {org_id: {"c"}}})
+    assert results[use_case_id][org_id]["c"] is not None
+
+    # The cache is bounded.
+    assert len(local_cache.get_many([f"{use_case_id.value}:{org_id}:{s}" for s in "abc"])) == 2
+
+
+def test_local_cache_rate_limited(indexer, indexer_cache, use_case_id, writes_limiter_option_name):
+    if isinstance(indexer, RawSimpleIndexer):
+        pytest.skip("mock indexer does not support rate limiting")
+
+    local_cache = LocalStringIndexerCache(max_size=100, ttl=60, negative_ttl=60)
+    indexer = CachingIndexer(indexer_cache, indexer, local_cache)
+
+    with override_options(
+        {
+            f"{writes_limiter_option_name}.per-org": [
+                {"window_seconds": 10, "granularity_seconds": 10, "limit": 1}
+            ],
+        }
+    ):
+        results = indexer.bulk_record({use_case_id: {1: {"a", "b"}}})
+
+    limited = {string for string, id in results[use_case_id][1].items() if id is None}
+    assert len(limited) == 1
+
+    # Rate limited strings are not retried until their negative entry expires.
+    results = indexer.bulk_record({use_case_id: {1: {"a", "b"}}})
+    for string in limited:
+        assert results[use_case_id][1][string] is None
+        assert results.get_fetch_metadata()[use_case_id][1][string] == Metadata(
+            id=None,
+            fetch_type=FetchType.RATE_LIMITED,
+            fetch_type_ext=FetchTypeExt(is_global=False),
+        )
+
+
 def test_read_when_bulk_record(indexer, use_case_id):
     strings = {
         use_case_id: {
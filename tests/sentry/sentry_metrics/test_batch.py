@@ -432,6 +432,45 @@ def test_extract_strings_with_invalid_mri():
     }
 
 
+@patch("sentry.sentry_metrics.consumers.indexer.batch.UseCaseID", MockUseCaseID)
+def test_extract_strings_with_invalid_payload():
+    """
+    Verify that payloads that are not valid JSON or UTF-8 are skipped
+    """
+    counter_payload = {
+        "name": "c:use_case_1/session@none",
+        "tags": {"environment": "production"},
+        "timestamp": ts,
+        "type": "c",
+        "value": 1,
+        "org_id": 1,
+        "retention_days": 90,
+        "project_id": 3,
+    }
+
+    message_batch = _construct_messages([(counter_payload, [])])
+    for offset, value in enumerate([b"{not json", b'{"name": "\xff"}'], start=1):
+        message_batch.append(
+            Message(
+                BrokerValue(
+                    KafkaPayload(None, value, []),
+                    Partition(Topic("topic"), 0),
+                    offset,
+                    BROKER_TIMESTAMP,
+                )
+            )
+        )
+    outer_message = Message(Value(message_batch, message_batch[-1].committable))
+
+    batch = IndexerBatch(outer_message, True, False, input_codec=_INGEST_CODEC)
+    assert batch.skipped_offsets == {PartitionIdxOffset(0, 1), PartitionIdxOffset(0, 2)}
+    assert batch.extract_strings() == {
+        MockUseCaseID.USE_CASE_1: {
+            1: {"c:use_case_1/session@none", "environment", "production"},
+        },
+    }
+
+
 @patch("sentry.sentry_metrics.consumers.indexer.batch.UseCaseID", MockUseCaseID)
 def test_extract_strings_with_multiple_use_case_ids_and_org_ids():
     """
@@ -1664,3 +1703,118 @@ def test_cardinality_limiter(caplog, settings):
             ],
         )
     ]
+
+
+@patch("sentry.sentry_metrics.consumers.indexer.batch.UseCaseID", MockUseCaseID)
+def test_columns():
+    """
+    Test that the messages of a batch are kept in columnar form, with the tags
+    of all messages in flat lists indexed by per-message offsets.
+    """
+    no_tags_payload = {**counter_payload, "tags": {}}
+    no_retention_payload = {**set_payload}
+    del no_retention_payload["retention_days"]
+
+    outer_message = _construct_outer_message(
+        [
+            (counter_payload, []),
+            (no_tags_payload, []),
+            (distribution_payload, []),
+            (no_retention_payload, []),
+        ]
+    )
+    batch = IndexerBatch(outer_message, True, False, input_codec=_INGEST_CODEC)
+    columns = batch.columns
+
+    assert columns.rows == {PartitionIdxOffset(0, i): i for i in range(4)}
+    assert columns.names == [
+        "c:sessions/session@none",
+        "c:sessions/session@none",
+        "d:sessions/duration@second",
+        "s:sessions/error@none",
+    ]
+    assert columns.types == ["c", "c", "d", "s"]
+    assert columns.org_ids == [1, 1, 1, 1]
+    assert columns.use_case_ids == [MockUseCaseID.SESSIONS] * 4
+    assert columns.tag_offsets == [0, 2, 2, 4, 6]
+    assert columns.get_tags(0) == (
+        ["environment", "session.status"],
+        ["production", "init"],
+    )
+    assert columns.get_tags(1) == ([], [])
+    assert columns.get_tags(3) == (
+        ["environment", "session.status"],
+        ["production", "errored"],
+    )
+
+    assert [json.loads(b"{%s}" % fields) for fields in columns.passthrough] == [
+        {
+            "org_id": 1,
+            "project_id": 3,
+            "timestamp": ts,
+            "type": "c",
+            "value": 1,
+            "use_case_id": "sessions",
+            "retention_days": 90,
+        },
+        {
+            "org_id": 1,
+            "project_id": 3,
+            "timestamp": ts,
+            "type": "c",
+            "value": 1,
+            "use_case_id": "sessions",
+            "retention_days": 90,
+        },
+        {
+            "org_id": 1,
+            "project_id": 3,
+            "timestamp": ts,
+            "type": "d",
+            "value": [4, 5, 6],
+            "use_case_id": "sessions",
+            "retention_days": 90,
+        },
+        {
+            "org_id": 1,
+            "project_id": 3,
+            "timestamp": ts,
+            "type": "s",
+            "value": [3],
+            "use_case_id": "sessions",
+            "retention_days": 90,
+        },
+    ]
+
+
+@patch("sentry.sentry_metrics.consumers.indexer.batch.UseCaseID", MockUseCaseID)
+def test_extract_strings_with_missing_field(caplog):
+    """
+    Test that a message without a field that is copied to the output message
+    is skipped instead of failing the whole batch.
+    """
+    missing_field_payload = {**distribution_payload}
+    del missing_field_payload["project_id"]
+
+    outer_message = _construct_outer_message(
+        [
+            (counter_payload, []),
+            (missing_field_payload, []),
+        ]
+    )
+    batch = IndexerBatch(outer_message, True, False, input_codec=None)
+
+    assert batch.extract_strings() == {
+        MockUseCaseID.SESSIONS: {
+            1: {
+                "c:sessions/session@none",
+                "environment",
+                "init",
+                "production",
+                "session.status",
+            }
+        }
+    }
+    assert list(batch.columns.rows) == [PartitionIdxOffset(0, 0)]
+    assert PartitionIdxOffset(0, 1) in batch.skipped_offsets
+    assert [rec.message for rec in caplog.records] == ["process_messages.missing_field"]
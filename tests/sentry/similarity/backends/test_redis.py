@@ -209,6 +209,25 @@ class RedisScriptMinHashIndexBackendTestCase(TestCase):
         self.index.merge("example", "2", [("index", "1")])
         assert self.index.classify("example", [("index", 0, ["foo", "bar"])]) == [("2", [0.5])]
 
+    def test_record_multi(self):
+        self.index.record_multi(
+            "example",
+            [
+                ("1", [("index:a", "hello world"), ("index:b", "hello world")]),
+                ("2", [("index:a", "hello world")]),
+                ("3", []),
+            ],
+        )
+        self.index.record("other", "1", [("index:a", "hello world"), ("index:b", "hello world")])
+        self.index.record("other", "2", [("index:a", "hello world")])
+
+        items = [("index:a", 0), ("index:b", 0)]
+        assert (
+            self.index.compare("example", "1", items)
+            == self.index.compare("other", "1", items)
+            == [("1", [1.0, 1.0]), ("2", [1.0, 0.0])]
+        )
+
     def test_flush_scoped(self):
         self.index.record("example", "1", [("index", ["foo", "bar"])])
         assert self.index.classify("example", [("index", 0, ["foo", "bar"])]) == [("1", [1.0])]
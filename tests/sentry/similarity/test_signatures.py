@@ -28,3 +28,7 @@ class MinHashSignatureBuilderTestCase(TestCase):
         self.assertAlmostEqual(
             similarity, estimation, delta=0.1  # totally made up constant, seems reasonable
         )
+
+    def test_duplicate_features(self):
+        get_signature = MinHashSignatureBuilder(16, 0xFFFF)
+        assert get_signature(["foo", "bar", "foo"]) == get_signature(["bar", "foo"])
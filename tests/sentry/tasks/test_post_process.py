@@ -55,6 +55,7 @@ from sentry.testutils.cases import BaseTestCase, PerformanceIssueTestCase
 from sentry.testutils.helpers import with_feature
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.testutils.helpers.eventprocessing import write_event_to_cache
+from sentry.testutils.helpers.options import override_options
 from sentry.testutils.performance_issues.store_transaction import PerfIssueTransactionTestMixin
 from sentry.testutils.silo import region_silo_test
 from sentry.types.activity import ActivityType
@@ -1481,6 +1482,42 @@ class SnoozeTestMixin(BasePostProgressGroupMixin):
         ).exists()
 
 
+class GroupCoalescingTestMixin(BasePostProgressGroupMixin):
+    @patch("sentry.rules.processor.RuleProcessor")
+    @patch("sentry.tasks.post_process.should_issue_owners_ratelimit", return_value=True)
+    def test_coalesces_group_steps(self, mock_ratelimit, mock_processor):
+        event = self.create_event(data={"message": "testing"}, project_id=self.project.id)
+
+        with override_options({"post-process.group-coalescing-window": 60}):
+            for _ in range(3):
+                self.call_post_process_group(
+                    is_new=False,
+                    is_regression=False,
+                    is_new_group_environment=False,
+                    event=event,
+                )
+
+        # Owner assignment runs for the first event only, rules for every event.
+        assert mock_ratelimit.call_count == 1
+        assert mock_processor.call_count == 3
+        assert not mock_processor.call_args[0][4]
+
+    @patch("sentry.tasks.post_process.should_issue_owners_ratelimit", return_value=True)
+    def test_does_not_coalesce_new_groups(self, mock_ratelimit):
+        event = self.create_event(data={"message": "testing"}, project_id=self.project.id)
+
+        with override_options({"post-process.group-coalescing-window": 60}):
+            for _ in range(2):
+                self.call_post_process_group(
+                    is_new=True,
+                    is_regression=False,
+                    is_new_group_environment=True,
+                    event=event,
+                )
+
+        assert mock_ratelimit.call_count == 2
+
+
 @region_silo_test
 class PostProcessGroupErrorTest(
     TestCase,
@@ -1488,6 +1525,7 @@ class PostProcessGroupErrorTest(
     ProcessCommitsTestMixin,
     CorePostProcessGroupTestMixin,
     DeriveCodeMappingsProcessGroupTestMixin,
+    GroupCoalescingTestMixin,
     InboxTestMixin,
     ResourceChangeBoundsTestMixin,
     RuleProcessorTestMixin,
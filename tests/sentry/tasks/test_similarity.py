@@ -0,0 +1,57 @@
+from unittest import mock
+
+from sentry.tasks.similarity import buffer_similarity_event, record_similarity
+from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
+from sentry.testutils.helpers.datetime import before_now, iso_format
+from sentry.testutils.silo import region_silo_test
+
+
+@region_silo_test(stable=True)
+class RecordSimilarityTest(TestCase):
+    def store_event(self, fingerprint, project=None):
+        return super().store_event(
+            data={"timestamp": iso_format(before_now(minutes=1)), "fingerprint": [fingerprint]},
+            project_id=(project or self.project).id,
+        )
+
+    @mock.patch("sentry.similarity.record")
+    def test_records_buffered_events(self, record):
+        other_project = self.create_project()
+        events = [
+            self.store_event("group-1"),
+            self.store_event("group-2"),
+            self.store_event("group-1", project=other_project),
+        ]
+
+        with self.feature("projects:similarity-indexing"), override_options(
+            {"similarity.record.group-sample-window": 0, "similarity.record.batch-size": 2}
+        ):
+            for event in events:
+                assert buffer_similarity_event(event)
+            record_similarity()
+
+        recorded = {
+            (project.id, tuple(event.event_id for event in project_events))
+            for (project, project_events), _ in record.call_args_list
+        }
+        # The first batch has both events of the first project.
+        assert recorded == {
+            (self.project.id, (events[0].event_id, events[1].event_id)),
+            (other_project.id, (events[2].event_id,)),
+        }
+
+    @mock.patch("sentry.similarity.record")
+    def test_samples_hot_groups(self, record):
+        events = [self.store_event("group-1") for _ in range(3)]
+
+        with self.feature("projects:similarity-indexing"), override_options(
+            {"similarity.record.group-sample-window": 60}
+        ):
+            assert [buffer_similarity_event(event) for event in events] == [True, False, False]
+            record_similarity()
+
+        assert record.call_count == 1
+
+    def test_disabled(self):
+        assert not buffer_similarity_event(self.store_event("group-1"))
@@ -11,6 +11,7 @@ from sentry.tasks.store import (
     preprocess_event,
     process_event,
     save_event,
+    save_event_batch,
     time_synthetic_monitoring_event,
 )
 
@@ -232,6 +233,71 @@ def test_hash_discarded_raised(default_project, mock_refund, register_plugin):
         # should be caught
 
 
+@pytest.mark.django_db
+def test_save_event_batch(default_project, mock_event_processing_store):
+    events = []
+    for message in ("foo", "foo", "bar"):
+        manager = EventManager({"message": message, "platform": "python"})
+        manager.normalize()
+        events.append(
+            {
+                "data": dict(manager.get_data().items()),
+                "start_time": time(),
+                "project_id": default_project.id,
+            }
+        )
+
+    with mock.patch("sentry.event_manager.eventstream.insert") as eventstream_insert:
+        save_event_batch(events=events)
+
+    assert eventstream_insert.call_count == 3
+    assert mock_event_processing_store.store.call_count == 3
+    group_ids = [call.kwargs["event"].group_id for call in eventstream_insert.call_args_list]
+    assert group_ids[0] == group_ids[1] != group_ids[2]
+
+
+@pytest.mark.django_db
+def test_save_event_batch_empty_cached_payload(default_project, mock_event_processing_store):
+    mock_event_processing_store.get.return_value = {}
+
+    with mock.patch("sentry.event_manager.save_error_events") as save_error_events:
+        save_event_batch(
+            events=[{"cache_key": "e:1", "event_id": EVENT_ID, "project_id": default_project.id}]
+        )
+
+    assert not save_error_events.called
+
+
+@pytest.mark.django_db
+def test_save_event_batch_cleanup(default_project, mock_event_processing_store):
+    events = []
+    for project_id in (default_project.id, default_project.id + 1000):
+        manager = EventManager({"message": "foo", "platform": "python"})
+        manager.normalize()
+        events.append(
+            {
+                "data": dict(manager.get_data().items()),
+                "cache_key": f"e:{project_id}",
+                "start_time": time(),
+                "project_id": project_id,
+            }
+        )
+
+    with mock.patch("sentry.event_manager.save_error_events", side_effect=ValueError), mock.patch(
+        "sentry.tasks.store.attachment_cache"
+    ) as attachment_cache, mock.patch(
+        "sentry.reprocessing2.mark_event_reprocessed"
+    ) as mark_event_reprocessed:
+        with pytest.raises(ValueError):
+            save_event_batch(events=events)
+
+    # The event of the deleted project and the failed event are both cleaned up.
+    assert mark_event_reprocessed.call_count == 2
+    assert sorted(call.args[0] for call in attachment_cache.delete.call_args_list) == sorted(
+        event["cache_key"] for event in events
+    )
+
+
 @pytest.fixture(params=["org", "project"])
 def options_model(request, default_organization, default_project):
     if request.param == "org":
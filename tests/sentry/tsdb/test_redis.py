@@ -1,13 +1,20 @@
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from unittest import mock
 
 import pytest
 import pytz
 from django.test import override_settings
+from freezegun import freeze_time
 
 from sentry.testutils import TestCase
 from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
-from sentry.tsdb.redis import CountMinScript, RedisTSDB, SuppressionWrapper
+from sentry.tsdb.redis import (
+    COMPACTED_MARKER_FIELD,
+    CountMinScript,
+    RedisTSDB,
+    SuppressionWrapper,
+)
 from sentry.utils.dates import to_datetime, to_timestamp
 
 
@@ -188,6 +195,155 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_get_range_matrix(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        self.db.incr(TSDBModel.group, 1, dts[0])
+        self.db.incr(TSDBModel.group, 1, dts[2], count=2)
+        self.db.incr(TSDBModel.group, 65, dts[3], count=3)
+        self.db.incr(TSDBModel.group, 1, dts[3], environment_id=1)
+
+        with mock.patch.object(self.db.cluster, "map", wraps=self.db.cluster.map) as cluster_map:
+            series, matrix = self.db.get_range_matrix(
+                TSDBModel.group, [1, 2, 65], dts[0], dts[-1], rollup=3600
+            )
+        assert cluster_map.call_count == 1
+        assert len(series) == 4
+        # Keys 1 and 65 share a vnode.
+        assert matrix == [[1, 0, 2, 0], [0, 0, 0, 0], [0, 0, 0, 3]]
+
+        _, matrix = self.db.get_range_matrix(
+            TSDBModel.group, [1, 2], dts[0], dts[-1], rollup=3600, environment_id=1
+        )
+        assert matrix == [[0, 0, 0, 1], [0, 0, 0, 0]]
+
+    def test_compact_rollups(self):
+        self.db.compact = True
+        self.db.compaction_delay = 0
+        now = datetime(2023, 5, 1, 12, 0, 5, tzinfo=pytz.UTC)
+
+        def get_hourly():
+            return self.db.get_range(
+                TSDBModel.project, [1], now - timedelta(hours=3), now, rollup=ONE_HOUR
+            )[1]
+
+        def get_stored(rollup):
+            hash_key, hash_field = self.db.make_counter_key(TSDBModel.project, rollup, now, 1, None)
+            with self.db.cluster.map() as client:
+                result = client.hget(hash_key, hash_field)
+            return int(result.value or 0)
+
+        with freeze_time(now) as frozen_time:
+            # Compaction ran up to the current bucket.
+            with self.db.cluster.map() as client:
+                client.set(self.db.make_compaction_watermark_key(), int(to_timestamp(now)) - 5)
+
+            self.db.incr(TSDBModel.project, 1, now, count=2)
+            # Increments of compacted buckets go to the coarser rollups directly.
+            self.db.incr(TSDBModel.project, 1, now - timedelta(hours=2))
+
+            assert get_stored(10) == 2
+            assert get_stored(ONE_HOUR) == 0
+            assert [count for _, count in get_hourly()] == [0, 1, 0, 2]
+
+            # The bucket is compacted once increments had `compaction_margin`
+            # seconds to be written.
+            frozen_time.tick(10)
+            self.db.compact_rollups()
+            assert get_stored(ONE_HOUR) == 0
+
+            frozen_time.tick(10)
+            assert self.db.compact_rollups() == int(to_timestamp(now)) + 5
+
+            assert get_stored(ONE_MINUTE) == 2
+            assert get_stored(ONE_HOUR) == 2
+            assert get_stored(ONE_DAY) == 2
+            assert [count for _, count in get_hourly()] == [0, 1, 0, 2]
+
+            # Compacting again doesn't count the increments twice.
+            frozen_time.tick(10)
+            self.db.compact_rollups()
+            assert get_stored(ONE_HOUR) == 2
+
+    def test_compact_rollups_repeated(self):
+        self.db.compact = True
+        self.db.compaction_delay = 0
+        now = datetime(2023, 5, 1, 12, 0, 5, tzinfo=pytz.UTC)
+        hash_key, hash_field = self.db.make_counter_key(TSDBModel.project, ONE_HOUR, now, 1, None)
+
+        with freeze_time(now) as frozen_time:
+            epoch = self.db.normalize_to_rollup(now, self.db.compaction_rollup)
+            with self.db.cluster.map() as client:
+                client.set(
+                    self.db.make_compaction_watermark_key(), epoch * self.db.compaction_rollup
+                )
+
+            self.db.incr(TSDBModel.project, 1, now, count=2)
+            vnode = self.db.get_counter_vnode(1)
+            with self.db.cluster.map() as client:
+                compaction_set = client.smembers(self.db.make_compaction_set_key(epoch, vnode))
+
+            frozen_time.tick(20)
+            self.db.compact_rollups()
+
+            # A compaction that failed before deleting the compaction set and
+            # advancing the watermark is repeated by the next run.
+            with self.db.cluster.map() as client:
+                client.sadd(self.db.make_compaction_set_key(epoch, vnode), *compaction_set.value)
+                client.set(
+                    self.db.make_compaction_watermark_key(), epoch * self.db.compaction_rollup
+                )
+            self.db.compact_rollups()
+
+            with self.db.cluster.map() as client:
+                result = client.hgetall(hash_key)
+            # The hash only stores the epoch of the last bucket compacted into it.
+            assert result.value == {hash_field: "2", COMPACTED_MARKER_FIELD: str(epoch)}
+
+    def test_compact_rollups_late_increments(self):
+        now = datetime(2023, 5, 1, 12, 0, 5, tzinfo=pytz.UTC)
+
+        def get_sum(rollup):
+            return self.db.get_sums(
+                TSDBModel.project, [1], now - timedelta(minutes=1), now, rollup=rollup
+            )[1]
+
+        with freeze_time(now) as frozen_time:
+            # Written to all rollups before compaction was enabled.
+            self.db.incr(TSDBModel.project, 1, now)
+            self.db.compact = True
+            self.db.compaction_delay = 0
+            assert self.db.get_compaction_watermark(self.db.cluster) is None
+            assert get_sum(10) == 1
+            assert get_sum(ONE_HOUR) == 1
+
+            # The first increment initializes the watermark to the end of the
+            # current bucket, which is never compacted. The increment goes to
+            # the coarser rollups directly and stays visible in the finest one.
+            self.db.incr(TSDBModel.project, 1, now)
+            watermark = int(to_timestamp(now)) + 5
+            assert self.db.get_compaction_watermark(self.db.cluster) == watermark
+            assert get_sum(10) == 2
+            assert get_sum(ONE_HOUR) == 2
+
+            frozen_time.tick(60)
+            assert self.db.compact_rollups() == watermark + 40
+            assert get_sum(10) == 2
+            assert get_sum(ONE_HOUR) == 2
+
+            # Late increments of buckets that weren't compacted yet are not
+            # compacted either.
+            self.db.incr(TSDBModel.project, 1, now + timedelta(seconds=50))
+            frozen_time.tick(60)
+            self.db.compact_rollups()
+            assert (
+                self.db.get_sums(
+                    TSDBModel.project, [1], now, now + timedelta(minutes=1), rollup=ONE_HOUR
+                )[1]
+                == 3
+            )
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -37,10 +37,10 @@ from sentry.search.snuba.backend import (
 )
 from sentry.search.snuba.executors import InvalidQueryForExecutor, PrioritySortWeights
 from sentry.testutils import SnubaTestCase, TestCase, xfail_if_not_postgres
-from sentry.testutils.helpers import Feature
+from sentry.testutils.helpers import Feature, override_options
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.types.group import GroupSubStatus
-from sentry.utils.snuba import SENTRY_SNUBA_MAP, SnubaError
+from sentry.utils.snuba import SENTRY_SNUBA_MAP, SnubaError, bulk_raw_query
 from tests.sentry.issues.test_utils import OccurrenceTestMixin
 
 
@@ -1396,6 +1396,23 @@ class EventsSnubaSearchTest(SharedSnubaTest):
         finally:
             options.set("snuba.search.max-pre-snuba-candidates", prev_max_pre)
 
+    def test_result_cache(self):
+        with override_options({"snuba.search.result-cache-ttl": 60}), mock.patch(
+            "sentry.search.snuba.executors.bulk_raw_query", wraps=bulk_raw_query
+        ) as query_mock:
+            results = self.make_query(search_filter_query="foo", sort_by="freq")
+            assert set(results) == {self.group1}
+            assert query_mock.call_count == 1
+
+            # The same search is answered from the cache.
+            results = self.make_query(search_filter_query="foo", sort_by="freq")
+            assert set(results) == {self.group1}
+            assert query_mock.call_count == 1
+
+            results = self.make_query(search_filter_query="bar", sort_by="freq")
+            assert set(results) == {self.group2}
+            assert query_mock.call_count == 2
+
     def test_optimizer_enabled(self):
         prev_optimizer_enabled = options.get("snuba.search.pre-snuba-candidates-optimizer")
         options.set("snuba.search.pre-snuba-candidates-optimizer", True)